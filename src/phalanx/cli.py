@@ -7,7 +7,9 @@ import os
 import re
 import shutil
 import sys
-from collections.abc import Callable
+from collections import Counter
+from collections.abc import Callable, Iterable
+from contextlib import suppress
 from datetime import timedelta
 from functools import wraps
 from pathlib import Path
@@ -15,21 +17,24 @@ from typing import ParamSpec
 
 import click
 import yaml
-from pydantic import TypeAdapter
+from pydantic import TypeAdapter, ValidationError
 from safir.click import display_help
 
-from .constants import VAULT_WRITE_TOKEN_LIFETIME
+from .constants import (
+    HELM_REPO_REFRESH_INTERVAL,
+    VAULT_CONCURRENCY,
+    VAULT_WRITE_TOKEN_LIFETIME,
+)
 from .exceptions import UsageError
 from .factory import Factory
 from .models.applications import Project
-from .models.environments import EnvironmentConfig
-from .models.helm import HelmStarter
+from .models.helm import HelmLintReport, HelmLintShard, HelmStarter
 from .models.secrets import ConditionalSecretConfig, StaticSecrets
-from .models.vault import (
-    VaultAppRoleCredentials,
-    VaultCredentials,
-    VaultTokenCredentials,
-)
+
+# Only modules needed to define the command-line interface are imported here.
+# Anything else is imported by the command that needs it, and the factory
+# imports services only when they are created, so that commands start quickly.
+# tests/cli/startup_test.py enforces this.
 
 P = ParamSpec("P")
 
@@ -39,12 +44,17 @@ __all__ = [
     "application_create",
     "application_lint",
     "application_lint_all",
+    "application_lint_merge",
+    "application_lint_stats",
     "application_template",
+    "client",
     "environment",
     "environment_install",
     "environment_lint",
     "environment_schema",
     "environment_template",
+    "helm",
+    "helm_mirror",
     "help",
     "main",
     "secrets",
@@ -53,6 +63,7 @@ __all__ = [
     "secrets_onepassword_secrets",
     "secrets_schema",
     "secrets_static_template",
+    "serve",
     "vault",
     "vault_audit",
     "vault_copy_secrets",
@@ -77,6 +88,47 @@ with kubectl config set-context before continuing.
 """Warning message displayed by :command:`phalanx environment install`."""
 
 
+def _check_lint_shards(reports: list[HelmLintReport]) -> None:
+    """Check that sharded lint reports together lint each pair once.
+
+    Parameters
+    ----------
+    reports
+        Reports written by ``lint-all --shard``.
+
+    Raises
+    ------
+    click.UsageError
+        Raised if the reports are from different shardings or different sets
+        of pairs, do not cover every shard exactly once, or do not together
+        lint every pair exactly once.
+    """
+    shards = [r.shard for r in reports]
+    counts = {s.count for s in shards if s}
+    indices = sorted(s.index for s in shards if s)
+    if None in shards or len(counts) != 1:
+        raise click.UsageError("Reports are from different shardings")
+    count = counts.pop()
+    if indices != list(range(1, count + 1)):
+        msg = f"Reports must cover shards 1/{count} to {count}/{count} once"
+        raise click.UsageError(msg)
+    pairs = reports[0].pairs
+    if pairs is None or any(r.pairs != pairs for r in reports):
+        raise click.UsageError("Reports are from different sets of charts")
+
+    # Shards that computed different assignments, such as from different
+    # --timings, may have linted some pairs twice and others not at all.
+    linted = Counter(
+        (t.application, t.environment) for r in reports for t in r.results
+    )
+    bad = [p for p in pairs if linted[p] != 1]
+    bad.extend(sorted(set(linted) - set(pairs)))
+    if bad:
+        charts = ", ".join(f"{a} (environment {e})" for a, e in bad)
+        msg = f"Reports do not lint each chart exactly once: {charts}"
+        raise click.UsageError(msg)
+
+
 def _find_config() -> Path:
     """Find the root of the Phalanx configuration tree.
 
@@ -106,6 +158,42 @@ def _find_config() -> Path:
     return current
 
 
+def _parse_shard(
+    ctx: click.Context, param: click.Parameter, value: str | None
+) -> HelmLintShard | None:
+    """Parse the argument to ``--shard``."""
+    if value is None:
+        return None
+    try:
+        return HelmLintShard.from_str(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e), ctx=ctx, param=param) from e
+
+
+def _read_lint_report(path: Path) -> HelmLintReport:
+    """Read a report written by ``lint-all --report``.
+
+    Parameters
+    ----------
+    path
+        Path to the report.
+
+    Returns
+    -------
+    HelmLintReport
+        Parsed report.
+
+    Raises
+    ------
+    click.UsageError
+        Raised if the report could not be parsed.
+    """
+    try:
+        return HelmLintReport.model_validate_json(path.read_text())
+    except ValidationError as e:
+        raise click.UsageError(f"Invalid lint report {path}: {e}") from e
+
+
 def _report_usage_errors(f: Callable[P, None]) -> Callable[P, None]:
     """Convert `~phalanx.exceptions.UsageError` to `click.UsageError`."""
 
@@ -157,6 +245,31 @@ def _require_env(variable: str, alternative: str | None = None) -> None:
             raise click.UsageError(f"{name} must be set in the environment")
 
 
+def _watch_config(config: Path) -> Iterable[set[Path]]:
+    """Start watching the Phalanx configuration for changes.
+
+    Helm repositories are also registered at most once and refreshed only
+    periodically from then on, since the same repositories will be needed
+    each time something changes.
+
+    Parameters
+    ----------
+    config
+        Root of the Phalanx configuration tree.
+
+    Returns
+    -------
+    Iterable of set of pathlib.Path
+        Batches of changed files.
+    """
+    from .storage.helm import HelmStorage
+    from .storage.watch import FileWatcher
+
+    HelmStorage.remember_repositories(HELM_REPO_REFRESH_INTERVAL)
+    paths = [config / d for d in ("applications", "charts", "environments")]
+    return FileWatcher(paths)
+
+
 @click.group(context_settings={"help_option_names": ["-h", "--help"]})
 @click.version_option(message="%(version)s")
 def main() -> None:
@@ -172,6 +285,102 @@ def help(ctx: click.Context, topic: str | None, subtopic: str | None) -> None:
     display_help(main, ctx, topic, subtopic)
 
 
+@main.command(
+    context_settings={
+        "ignore_unknown_options": True,
+        "allow_interspersed_args": False,
+    }
+)
+@click.argument("args", nargs=-1, type=click.UNPROCESSED)
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(path_type=Path),
+    default=None,
+    envvar="PHALANX_SOCKET",
+    show_envvar=True,
+    help="Path to the Unix socket of the Phalanx server.",
+)
+def client(args: tuple[str, ...], *, socket_path: Path | None) -> None:
+    """Run a command using the Phalanx server if it is running.
+
+    Takes the same arguments as phalanx and forwards them to the server
+    started by phalanx serve, which keeps the Phalanx configuration and Helm
+    repositories warm between commands. If the server is not running, or if
+    the command is not one the server runs, the command is run normally.
+    """
+    from .server import forward_command, get_socket_path, is_server_command
+
+    if not socket_path:
+        socket_path = get_socket_path()
+    if is_server_command(list(args)):
+        response = forward_command(socket_path, list(args))
+        if response:
+            sys.stdout.write(response.stdout)
+            sys.stderr.write(response.stderr)
+            sys.exit(response.exit_code)
+    main.main(args=list(args), prog_name="phalanx")
+
+
+@main.command()
+@click.option(
+    "-c",
+    "--config",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Path to root of Phalanx configuration to load at startup.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    envvar="PHALANX_NO_CACHE",
+    show_envvar=True,
+    help="Do not use or update the local cache of Helm results.",
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(path_type=Path),
+    default=None,
+    envvar="PHALANX_SOCKET",
+    show_envvar=True,
+    help="Path to the Unix socket on which to listen.",
+)
+@_report_usage_errors
+def serve(
+    *, config: Path | None, no_cache: bool = False, socket_path: Path | None
+) -> None:
+    """Run a server that keeps Phalanx state warm between commands.
+
+    Listens on a Unix socket for commands sent by phalanx client and runs
+    them, keeping the parsed Phalanx configuration and prepared Helm
+    repositories in memory. Only commands that lint or template charts or
+    list secrets are run by the server. Stop the server with Ctrl-C.
+    """
+    from .server import PhalanxServer, get_socket_path
+
+    if not config:
+        config = _find_config()
+    if not socket_path:
+        socket_path = get_socket_path()
+
+    # Parse the whole configuration up front so that the first command is
+    # also fast.
+    config_storage = Factory(
+        config, use_cache=not no_cache
+    ).create_config_storage()
+    for environment in config_storage.list_environments():
+        config_storage.load_environment(environment)
+    try:
+        server = PhalanxServer(socket_path)
+    except RuntimeError as e:
+        raise click.UsageError(str(e)) from e
+    print(f"Listening on {socket_path}", flush=True)
+    with server, suppress(KeyboardInterrupt):
+        server.serve_forever()
+
+
 @main.group()
 def application() -> None:
     """Commands for Phalanx application configuration."""
@@ -186,14 +395,26 @@ def application() -> None:
     default=None,
     help="Path to root of Phalanx configuration.",
 )
+@click.option(
+    "--repo-ttl",
+    type=click.IntRange(min=0),
+    metavar="SECONDS",
+    default=int(HELM_REPO_REFRESH_INTERVAL.total_seconds()),
+    show_default=True,
+    envvar="PHALANX_HELM_REPO_TTL",
+    show_envvar=True,
+    help="Refresh Helm repository indices older than this.",
+)
 @_report_usage_errors
 def application_add_helm_repos(
-    name: str | None = None, *, config: Path | None
+    name: str | None = None, *, config: Path | None, repo_ttl: int
 ) -> None:
     """Configure dependency Helm repositories in Helm.
 
     Add all third-party Helm chart repositories used by Phalanx applications
-    to the local Helm cache.
+    to the local Helm cache. Repositories Helm already knows about are not
+    added again, and only repository indices older than --repo-ttl are
+    refreshed.
 
     This will also be done as necessary by lint commands, so using this
     command is not necessary. It is provided as a convenience for helping to
@@ -202,7 +423,7 @@ def application_add_helm_repos(
     _require_command("helm")
     if not config:
         config = _find_config()
-    factory = Factory(config)
+    factory = Factory(config, helm_repo_ttl=timedelta(seconds=repo_ttl))
     application_service = factory.create_application_service()
     application_service.add_helm_repositories([name] if name else None)
 
@@ -300,12 +521,48 @@ def application_create(
     default=None,
     help="Only lint this environment.",
 )
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    envvar="PHALANX_NO_CACHE",
+    show_envvar=True,
+    help="Do not use or update the local cache of Helm results.",
+)
+@click.option(
+    "--no-history",
+    is_flag=True,
+    default=False,
+    envvar="PHALANX_NO_HISTORY",
+    show_envvar=True,
+    help="Do not record lint durations in the local lint history.",
+)
+@click.option(
+    "--repo-ttl",
+    type=click.IntRange(min=0),
+    metavar="SECONDS",
+    default=int(HELM_REPO_REFRESH_INTERVAL.total_seconds()),
+    show_default=True,
+    envvar="PHALANX_HELM_REPO_TTL",
+    show_envvar=True,
+    help="Refresh Helm repository indices older than this.",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="Lint again whenever the configuration changes.",
+)
 @_report_usage_errors
 def application_lint(
     applications: list[str],
     *,
     environment: str | None = None,
     config: Path | None,
+    no_cache: bool = False,
+    no_history: bool = False,
+    repo_ttl: int,
+    watch: bool = False,
 ) -> None:
     """Lint the Helm charts for applications.
 
@@ -313,13 +570,26 @@ def application_lint(
     Helm chart for the given applications. If no environment is specified,
     each chart is linted for all environments for which it has a
     configuration.
+
+    If --watch is given, keep running after the initial lint and lint again
+    each application and environment pair that may be affected by changes to
+    the configuration, until interrupted.
     """
     _require_command("helm")
     if not config:
         config = _find_config()
-    factory = Factory(config)
+    factory = Factory(
+        config,
+        use_cache=not no_cache,
+        use_history=not no_history,
+        helm_repo_ttl=timedelta(seconds=repo_ttl),
+    )
     application_service = factory.create_application_service()
-    if not application_service.lint(applications, environment):
+    if watch:
+        watcher = _watch_config(config)
+        with suppress(KeyboardInterrupt):
+            application_service.lint_watch(applications, environment, watcher)
+    elif not application_service.lint(applications, environment):
         sys.exit(1)
 
 
@@ -346,25 +616,216 @@ def application_lint(
     envvar="GITHUB_BASE_REF",
     help="Base Git branch against which to compare.",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of charts to lint in parallel.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    envvar="PHALANX_NO_CACHE",
+    show_envvar=True,
+    help="Do not use or update the local cache of Helm results.",
+)
+@click.option(
+    "--no-history",
+    is_flag=True,
+    default=False,
+    envvar="PHALANX_NO_HISTORY",
+    show_envvar=True,
+    help="Do not record lint durations in the local lint history.",
+)
+@click.option(
+    "--repo-ttl",
+    type=click.IntRange(min=0),
+    metavar="SECONDS",
+    default=int(HELM_REPO_REFRESH_INTERVAL.total_seconds()),
+    show_default=True,
+    envvar="PHALANX_HELM_REPO_TTL",
+    show_envvar=True,
+    help="Refresh Helm repository indices older than this.",
+)
+@click.option(
+    "--report",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Write a report of results and durations to this file.",
+)
+@click.option(
+    "--shard",
+    type=str,
+    metavar="K/N",
+    default=None,
+    callback=_parse_shard,
+    help="Only lint shard K of N shards of the charts.",
+)
+@click.option(
+    "--timings",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    multiple=True,
+    help="Report from a previous run used to balance shards.",
+)
 @_report_usage_errors
 def application_lint_all(
-    *, config: Path | None, git: bool = False, git_branch: str
+    *,
+    config: Path | None,
+    git: bool = False,
+    git_branch: str,
+    jobs: int,
+    no_cache: bool = False,
+    no_history: bool = False,
+    repo_ttl: int,
+    report: Path | None,
+    shard: HelmLintShard | None,
+    timings: tuple[Path, ...],
 ) -> None:
     """Lint the Helm charts for every application and environment.
 
     Update and download any third-party dependency charts and then lint the
     Helm charts for each application and environment combination.
+
+    If --jobs is greater than one, that many charts will be linted in
+    parallel. The output for each chart is buffered and printed in the same
+    order as when linting serially.
+
+    If --shard is given, the charts are divided into N shards expected to
+    take about the same time, and only shard K is linted. The durations in
+    any --timings reports are used to divide the charts, and every shard
+    must be given the same reports. Use --report to save the results of each
+    shard and lint-merge to combine them.
     """
     _require_command("helm")
     if not config:
         config = _find_config()
-    factory = Factory(config)
+    factory = Factory(
+        config,
+        use_cache=not no_cache,
+        use_history=not no_history,
+        helm_repo_ttl=timedelta(seconds=repo_ttl),
+    )
     application_service = factory.create_application_service()
     branch = git_branch if git else None
-    if not application_service.lint_all(only_changes_from_branch=branch):
+    previous = None
+    if timings:
+        previous = HelmLintReport.merge(
+            [_read_lint_report(t) for t in timings]
+        )
+    result = application_service.lint_all(
+        only_changes_from_branch=branch,
+        jobs=jobs,
+        shard=shard,
+        timings=previous,
+    )
+    if report:
+        report.write_text(result.model_dump_json(indent=2) + "\n")
+    if not result.success:
         sys.exit(1)
 
 
+@application.command("lint-merge")
+@click.argument(
+    "reports",
+    metavar="REPORT ...",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--report",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Write the merged report to this file.",
+)
+@_report_usage_errors
+def application_lint_merge(
+    reports: tuple[Path, ...], *, report: Path | None
+) -> None:
+    """Combine the reports from sharded runs of lint-all.
+
+    Prints the outcome and duration of each lint and a summary, and exits
+    with a failure status if any lint failed. The reports must cover every
+    shard exactly once, and together must lint each chart exactly once.
+    """
+    parsed = [_read_lint_report(r) for r in reports]
+    if any(r.shard for r in parsed):
+        _check_lint_shards(parsed)
+    merged = HelmLintReport.merge(parsed)
+    for timing in merged.results:
+        status = "PASS" if timing.success else "FAIL"
+        seconds = timing.duration.total_seconds()
+        pair = f"{timing.application} (environment {timing.environment})"
+        print(f"{status} {pair} in {seconds:.2f}s")
+    failed = len([t for t in merged.results if not t.success])
+    total = sum(t.duration.total_seconds() for t in merged.results)
+    print(
+        f"Linted {len(merged.results)} charts in {total:.2f}s, {failed} failed"
+    )
+    if report:
+        report.write_text(merged.model_dump_json(indent=2) + "\n")
+    if failed:
+        sys.exit(1)
+
+
+@application.command("lint-stats")
+@click.option(
+    "-c",
+    "--config",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Path to root of Phalanx configuration.",
+)
+@click.option(
+    "-n",
+    "--limit",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="Number of charts to show.",
+)
+def application_lint_stats(*, config: Path | None, limit: int) -> None:
+    """Show the charts that take longest to lint.
+
+    Lints that run Helm are recorded in a local history unless --no-history
+    is given, even if the cache is disabled. For each of the slowest charts
+    by median duration, prints the number of recorded lints, the duration of
+    the last lint, the median duration, how much the median changed between
+    the older and newer half of the recorded lints, the outcome of the last
+    lint, and the version of Helm that ran it.
+    """
+    if not config:
+        config = _find_config()
+    factory = Factory(config)
+    stats = factory.create_lint_history().get_stats()[:limit]
+    if not stats:
+        print("No lints have been recorded")
+        return
+    header = ["APPLICATION", "ENVIRONMENT", "RUNS", "LAST", "MEDIAN", "TREND"]
+    rows = [[*header, "STATUS", "HELM"]]
+    for stat in stats:
+        trend = "-" if stat.trend is None else f"{stat.trend:+.0%}"
+        rows.append(
+            [
+                stat.application or "(top-level)",
+                stat.environment,
+                str(stat.runs),
+                f"{stat.last.total_seconds():.2f}s",
+                f"{stat.median.total_seconds():.2f}s",
+                trend,
+                "PASS" if stat.success else "FAIL",
+                stat.helm_version,
+            ]
+        )
+    widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        line = "  ".join(c.ljust(w) for c, w in zip(row, widths, strict=True))
+        print(line.rstrip())
+
+
 @application.command("template")
 @click.argument("name")
 @click.argument("environment")
@@ -375,9 +836,32 @@ def application_lint_all(
     default=None,
     help="Path to root of Phalanx configuration.",
 )
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    envvar="PHALANX_NO_CACHE",
+    show_envvar=True,
+    help="Do not use or update the local cache of Helm results.",
+)
+@click.option(
+    "--repo-ttl",
+    type=click.IntRange(min=0),
+    metavar="SECONDS",
+    default=int(HELM_REPO_REFRESH_INTERVAL.total_seconds()),
+    show_default=True,
+    envvar="PHALANX_HELM_REPO_TTL",
+    show_envvar=True,
+    help="Refresh Helm repository indices older than this.",
+)
 @_report_usage_errors
 def application_template(
-    name: str, environment: str, *, config: Path | None
+    name: str,
+    environment: str,
+    *,
+    config: Path | None,
+    no_cache: bool = False,
+    repo_ttl: int,
 ) -> None:
     """Expand the chart of an application for an environment.
 
@@ -388,7 +872,11 @@ def application_template(
     _require_command("helm")
     if not config:
         config = _find_config()
-    factory = Factory(config)
+    factory = Factory(
+        config,
+        use_cache=not no_cache,
+        helm_repo_ttl=timedelta(seconds=repo_ttl),
+    )
     application_service = factory.create_application_service()
     sys.stdout.write(application_service.template(name, environment))
 
@@ -445,6 +933,22 @@ def environment() -> None:
     is_flag=True,
     help="Force installation without a prompt.",
 )
+@click.option(
+    "--repo-ttl",
+    type=click.IntRange(min=0),
+    metavar="SECONDS",
+    default=int(HELM_REPO_REFRESH_INTERVAL.total_seconds()),
+    show_default=True,
+    envvar="PHALANX_HELM_REPO_TTL",
+    show_envvar=True,
+    help="Refresh Helm repository indices older than this.",
+)
+@click.option(
+    "--resume/--no-resume",
+    default=True,
+    show_default=True,
+    help="Skip steps completed by a previous install that still hold.",
+)
 @click.option(
     "--vault-role-id",
     default=None,
@@ -470,6 +974,8 @@ def environment_install(
     config: Path | None,
     force_noninteractive: bool = False,
     git_branch: str | None = None,
+    repo_ttl: int,
+    resume: bool = True,
     vault_role_id: str | None = None,
     vault_secret_id: str | None = None,
     vault_token: str | None = None,
@@ -483,13 +989,22 @@ def environment_install(
     Read-only Vault credentials must be supplied by either setting the
     environment variables VAULT_ROLE_ID and VAULT_SECRET_ID to the credentials
     of a Vault AppRole, or setting VAULT_TOKEN to a read-only Vault token.
+
+    Each completed step is recorded locally. If the install fails, running
+    it again skips the steps that were completed and whose results are still
+    present in the cluster, unless --no-resume is given.
     """
-    _require_command("argocd")
     _require_command("kubectl")
     _require_command("helm")
     if not config:
         config = _find_config()
-    factory = Factory(config)
+    from .models.vault import (
+        VaultAppRoleCredentials,
+        VaultCredentials,
+        VaultTokenCredentials,
+    )
+
+    factory = Factory(config, helm_repo_ttl=timedelta(seconds=repo_ttl))
     if vault_role_id and vault_secret_id:
         vault_credentials: VaultCredentials = VaultAppRoleCredentials(
             role_id=vault_role_id, secret_id=vault_secret_id
@@ -516,7 +1031,9 @@ def environment_install(
 
     # Do the installation.
     environment_service = factory.create_environment_service()
-    environment_service.install(environment, vault_credentials, git_branch)
+    environment_service.install(
+        environment, vault_credentials, git_branch, resume=resume
+    )
 
 
 @environment.command("lint")
@@ -528,22 +1045,75 @@ def environment_install(
     default=None,
     help="Path to root of Phalanx configuration.",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of environments to lint in parallel.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    envvar="PHALANX_NO_CACHE",
+    show_envvar=True,
+    help="Do not use or update the local cache of Helm results.",
+)
+@click.option(
+    "--no-history",
+    is_flag=True,
+    default=False,
+    envvar="PHALANX_NO_HISTORY",
+    show_envvar=True,
+    help="Do not record lint durations in the local lint history.",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="Lint again whenever the configuration changes.",
+)
 @_report_usage_errors
 def environment_lint(
-    environment: str | None = None, *, config: Path | None, git: bool = False
+    environment: str | None = None,
+    *,
+    config: Path | None,
+    git: bool = False,
+    jobs: int,
+    no_cache: bool = False,
+    no_history: bool = False,
+    watch: bool = False,
 ) -> None:
     """Lint the top-level Helm chart for an environment.
 
     Lint the parent Argo CD Helm chart that installs the Argo CD applications
     for an environment. If the environment is not given, lints the
     instantiation of that chart for each environment.
+
+    If --jobs is greater than one, that many environments will be linted in
+    parallel. The output for each environment is buffered and printed in the
+    same order as when linting serially. Environments that linted
+    successfully are not linted again until the top-level chart or their
+    values file changes, unless --no-cache is given.
+
+    If --watch is given, keep running after the initial lint and lint again
+    each environment that may be affected by changes to the configuration,
+    until interrupted. Results are printed as each lint finishes.
     """
     _require_command("helm")
     if not config:
         config = _find_config()
-    factory = Factory(config)
+    factory = Factory(
+        config, use_cache=not no_cache, use_history=not no_history
+    )
     environment_service = factory.create_environment_service()
-    if not environment_service.lint(environment):
+    if watch:
+        watcher = _watch_config(config)
+        with suppress(KeyboardInterrupt):
+            environment_service.lint_watch(environment, watcher, jobs=jobs)
+    elif not environment_service.lint(environment, jobs=jobs):
         sys.exit(1)
 
 
@@ -567,6 +1137,8 @@ def environment_schema(*, output: Path | None) -> None:
     schema file in the Phalanx repository, which is used by a pre-commit hook
     to validate environment configuration files before committing them.
     """
+    from .models.environments import EnvironmentConfig
+
     schema = EnvironmentConfig.model_json_schema()
     json_schema = json.dumps(schema, indent=2) + "\n"
     if output:
@@ -600,6 +1172,51 @@ def environment_template(environment: str, *, config: Path | None) -> None:
     sys.stdout.write(environment_service.template(environment))
 
 
+@main.group()
+def helm() -> None:
+    """Commands for Helm charts used by Phalanx."""
+
+
+@helm.command("mirror")
+@click.option(
+    "-c",
+    "--config",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Path to root of Phalanx configuration.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of charts to download in parallel.",
+)
+@_report_usage_errors
+def helm_mirror(*, config: Path | None, jobs: int) -> None:
+    """Download all third-party charts into a local mirror.
+
+    Every third-party chart used as a dependency by an application or
+    shared chart is downloaded into a mirror in the Phalanx cache directory,
+    along with a generated index.yaml. Charts already in the mirror are not
+    downloaded again.
+
+    Afterwards, the dependencies of any application whose third-party
+    charts are all in the mirror are installed from the mirror by the lint,
+    template, and install commands, without network access.
+    """
+    _require_command("helm")
+    if not config:
+        config = _find_config()
+    factory = Factory(config)
+    application_service = factory.create_application_service()
+    for chart in application_service.mirror_charts(jobs=jobs):
+        print(
+            f"Downloaded {chart.name} {chart.version} from {chart.repository}"
+        )
+
+
 @main.group()
 def secrets() -> None:
     """Secret manipulation commands."""
@@ -620,9 +1237,22 @@ def secrets() -> None:
     default=None,
     help="YAML file containing static secrets for this environment.",
 )
+@click.option(
+    "--vault-concurrency",
+    type=click.IntRange(min=1),
+    default=VAULT_CONCURRENCY,
+    envvar="PHALANX_VAULT_CONCURRENCY",
+    show_default=True,
+    show_envvar=True,
+    help="Maximum number of concurrent requests to Vault.",
+)
 @_report_usage_errors
 def secrets_audit(
-    environment: str, *, config: Path | None, secrets: Path | None
+    environment: str,
+    *,
+    config: Path | None,
+    secrets: Path | None,
+    vault_concurrency: int,
 ) -> None:
     """Audit secrets for an environment.
 
@@ -642,7 +1272,7 @@ def secrets_audit(
     if not config:
         config = _find_config()
     static_secrets = StaticSecrets.from_path(secrets) if secrets else None
-    factory = Factory(config)
+    factory = Factory(config, vault_concurrency=vault_concurrency)
     secrets_service = factory.create_secrets_service()
     report = secrets_service.audit(environment, static_secrets)
     if report:
@@ -810,6 +1440,15 @@ def secrets_static_template(environment: str, *, config: Path | None) -> None:
     default=None,
     help="YAML file containing static secrets for this environment.",
 )
+@click.option(
+    "--vault-concurrency",
+    type=click.IntRange(min=1),
+    default=VAULT_CONCURRENCY,
+    envvar="PHALANX_VAULT_CONCURRENCY",
+    show_default=True,
+    show_envvar=True,
+    help="Maximum number of concurrent requests to Vault.",
+)
 @_report_usage_errors
 def secrets_sync(
     environment: str,
@@ -818,6 +1457,7 @@ def secrets_sync(
     delete: bool,
     regenerate: bool,
     secrets: Path | None,
+    vault_concurrency: int,
 ) -> None:
     """Synchronize environment secrets with Vault.
 
@@ -837,7 +1477,7 @@ def secrets_sync(
     if not config:
         config = _find_config()
     static_secrets = StaticSecrets.from_path(secrets) if secrets else None
-    factory = Factory(config)
+    factory = Factory(config, vault_concurrency=vault_concurrency)
     secrets_service = factory.create_secrets_service()
     secrets_service.sync(
         environment, static_secrets, regenerate=regenerate, delete=delete
@@ -9,18 +9,77 @@ from __future__ import annotations
 from datetime import timedelta
 
 __all__ = [
+    "ARGOCD_POLL_INTERVAL",
+    "ARGOCD_RECONNECT_DELAY",
+    "ARGOCD_RECONNECT_TIMEOUT",
+    "CACHE_MAX_SIZE",
     "HELM_DOCLINK_ANNOTATION",
+    "HELM_REPO_CONCURRENCY",
+    "HELM_REPO_REFRESH_INTERVAL",
+    "INFRASTRUCTURE_APPLICATIONS",
+    "LINT_HISTORY_MAX_RUNS",
+    "ONEPASSWORD_CONCURRENCY",
     "ONEPASSWORD_ENCODED_WARNING",
     "PULL_SECRET_DESCRIPTION",
     "VAULT_APPROLE_SECRET_TEMPLATE",
+    "VAULT_CONCURRENCY",
     "VAULT_TOKEN_SECRET_TEMPLATE",
     "VAULT_WRITE_TOKEN_LIFETIME",
     "VAULT_WRITE_TOKEN_WARNING_LIFETIME",
+    "WATCH_INTERVAL",
 ]
 
+ARGOCD_POLL_INTERVAL = timedelta(seconds=1)
+"""How often to check whether an Argo CD sync has finished."""
+
+ARGOCD_RECONNECT_DELAY = timedelta(seconds=5)
+"""Longest delay between attempts to reconnect to Argo CD.
+
+The delay starts short and doubles after each failed attempt up to this.
+"""
+
+ARGOCD_RECONNECT_TIMEOUT = timedelta(minutes=2)
+"""How long to try to reach Argo CD for a request with no deadline of its own.
+
+Requests made while waiting for a sync keep trying until the sync times out
+instead.
+"""
+
+CACHE_MAX_SIZE = 256 * 1024 * 1024
+"""Maximum size in bytes of each on-disk cache of results.
+
+The least-recently-used entries are evicted once this size is exceeded.
+"""
+
 HELM_DOCLINK_ANNOTATION = "phalanx.lsst.io/docs"
 """Annotation in :file:`Chart.yaml` for application documentation links."""
 
+HELM_REPO_CONCURRENCY = 8
+"""Number of Helm repository indices to refresh in parallel."""
+
+HELM_REPO_REFRESH_INTERVAL = timedelta(minutes=10)
+"""How long a downloaded Helm repository index is considered current."""
+
+INFRASTRUCTURE_APPLICATIONS: dict[str, tuple[str, ...]] = {
+    "cert-manager": (),
+    "ingress-nginx": (),
+    "postgres": (),
+    "gafaelfawr": ("cert-manager", "ingress-nginx", "postgres"),
+}
+"""Applications synced before all others when installing an environment.
+
+Each is mapped to the other infrastructure applications that must be synced
+before it. Applications that do not depend on each other are synced at the
+same time. Dependencies on applications not enabled in the environment are
+ignored.
+"""
+
+LINT_HISTORY_MAX_RUNS = 20
+"""Number of recent lints of each chart kept in the local lint history."""
+
+ONEPASSWORD_CONCURRENCY = 16
+"""Number of concurrent requests to make to 1Password Connect."""
+
 ONEPASSWORD_ENCODED_WARNING = (
     "If you store this secret in a 1Password item, encode it with base64"
     " first."
@@ -48,6 +107,13 @@ type: Opaque
 """
 """Template for a ``Secret`` containing AppRole credentials."""
 
+VAULT_CONCURRENCY = 16
+"""Default number of concurrent requests to make to Vault.
+
+Used when reading or writing the secrets for every application in an
+environment.
+"""
+
 VAULT_TOKEN_SECRET_TEMPLATE = """\
 apiVersion: v1
 kind: Secret
@@ -65,3 +131,6 @@ VAULT_WRITE_TOKEN_LIFETIME = "3650d"
 
 VAULT_WRITE_TOKEN_WARNING_LIFETIME = timedelta(days=7)
 """Remaining lifetime at which to warn that a token is about to expire."""
+
+WATCH_INTERVAL = timedelta(milliseconds=500)
+"""How often to poll for changed files when watching the configuration."""
@@ -3,18 +3,20 @@
 from __future__ import annotations
 
 import subprocess
-from collections.abc import Iterable
+from collections.abc import Iterable, Mapping
 
 from .models.secrets import Secret
 
 __all__ = [
     "ApplicationExistsError",
+    "ArgoCDError",
     "CommandFailedError",
     "CommandTimedOutError",
     "GitRemoteError",
     "InvalidApplicationConfigError",
     "InvalidEnvironmentConfigError",
     "InvalidSecretConfigError",
+    "KubernetesError",
     "MalformedOnepasswordSecretError",
     "MissingOnepasswordSecretsError",
     "NoOnepasswordConfigError",
@@ -28,6 +30,10 @@ __all__ = [
 ]
 
 
+class ArgoCDError(Exception):
+    """An Argo CD operation failed or did not finish in time."""
+
+
 class CommandFailedError(Exception):
     """Execution of a command failed.
 
@@ -98,6 +104,10 @@ class GitRemoteError(Exception):
     """Unable to get necessary information from a Git remote."""
 
 
+class KubernetesError(Exception):
+    """A Kubernetes operation failed or did not finish in time."""
+
+
 class NoOnepasswordConfigError(Exception):
     """Environment does not use 1Password."""
 
@@ -219,7 +229,7 @@ class MissingOnepasswordSecretsError(UsageError):
 
     def __init__(self, secrets: Iterable[str]) -> None:
         self.secrets = list(secrets)
-        msg = f'Missing 1Password items or fields: {", ".join(self.secrets)}'
+        msg = f"Missing 1Password items or fields: {', '.join(self.secrets)}"
         super().__init__(msg)
 
 
@@ -242,15 +252,37 @@ class NoVaultCredentialsError(UsageError):
 class UnresolvedSecretsError(UsageError):
     """Some secrets could not be resolved.
 
+    Secrets are identified by strings of the form ``application/key``.
+
     Parameters
     ----------
     secrets
         Secrets that could not be resolved.
+    missing
+        Mapping of secrets to the secrets they are copied or generated from,
+        for secrets whose source does not exist.
+    cycles
+        Dependency cycles among the secrets. Each cycle is a list of secrets,
+        each of which is copied or generated from the next, ending with the
+        first secret again.
     """
 
-    def __init__(self, secrets: Iterable[Secret]) -> None:
+    def __init__(
+        self,
+        secrets: Iterable[Secret],
+        *,
+        missing: Mapping[str, str] | None = None,
+        cycles: Iterable[list[str]] = (),
+    ) -> None:
         self.secrets = [f"{u.application}/{u.key}" for u in secrets]
-        msg = f'Some secrets could not be resolved: {", ".join(self.secrets)}'
+        self.missing = dict(missing) if missing else {}
+        self.cycles = list(cycles)
+        msg = f"Some secrets could not be resolved: {', '.join(self.secrets)}"
+        if self.missing:
+            sources = (f"{s} (for {k})" for k, s in self.missing.items())
+            msg += f"; missing sources: {', '.join(sources)}"
+        for cycle in self.cycles:
+            msg += f"; dependency cycle: {' -> '.join(cycle)}"
         super().__init__(msg)
 
 
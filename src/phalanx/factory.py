@@ -2,18 +2,29 @@
 
 from __future__ import annotations
 
+import hashlib
+from datetime import timedelta
 from pathlib import Path
-
-from .services.application import ApplicationService
-from .services.environment import EnvironmentService
-from .services.secrets import SecretsService
-from .services.vault import VaultService
-from .storage.argocd import ArgoCDStorage
-from .storage.config import ConfigStorage
-from .storage.helm import HelmStorage
-from .storage.kubernetes import KubernetesStorage
-from .storage.onepassword import OnepasswordStorage
-from .storage.vault import VaultStorage
+from typing import TYPE_CHECKING
+
+from .constants import HELM_REPO_REFRESH_INTERVAL, VAULT_CONCURRENCY
+from .storage.cache import ResultCache, get_cache_path
+
+# Services and storage modules pull in large third-party libraries, such as
+# the Vault and 1Password clients and GitPython, so they are imported only
+# when a component that needs them is created. This keeps the command-line
+# interface fast to start.
+if TYPE_CHECKING:
+    from .services.application import ApplicationService
+    from .services.environment import EnvironmentService
+    from .services.secrets import SecretsService
+    from .services.vault import VaultService
+    from .storage.config import ConfigStorage
+    from .storage.helm import HelmStorage
+    from .storage.history import LintHistory
+    from .storage.kubernetes import KubernetesStorage
+    from .storage.onepassword import OnepasswordStorage
+    from .storage.vault import VaultStorage
 
 __all__ = ["Factory"]
 
@@ -25,10 +36,35 @@ class Factory:
     ----------
     path
         Path to the root of the Phalanx configuration tree.
+    use_cache
+        Whether to cache the results of expensive operations on local disk.
+        This includes a snapshot of the parsed Phalanx configuration.
+    use_history
+        Whether to record the duration of each lint in the local lint history.
+        This is independent of ``use_cache``, since the history holds timings
+        rather than results.
+    vault_concurrency
+        Maximum number of concurrent requests to make to Vault when reading
+        or writing the secrets for all applications in an environment.
+    helm_repo_ttl
+        How long a downloaded Helm repository index is considered current
+        before it is refreshed.
     """
 
-    def __init__(self, path: Path) -> None:
+    def __init__(
+        self,
+        path: Path,
+        *,
+        use_cache: bool = False,
+        use_history: bool = True,
+        vault_concurrency: int = VAULT_CONCURRENCY,
+        helm_repo_ttl: timedelta = HELM_REPO_REFRESH_INTERVAL,
+    ) -> None:
         self._path = path
+        self._use_cache = use_cache
+        self._use_history = use_history
+        self._vault_concurrency = vault_concurrency
+        self._helm_repo_ttl = helm_repo_ttl
 
     def create_application_service(self) -> ApplicationService:
         """Create service for manipulating Phalanx applications.
@@ -38,9 +74,14 @@ class Factory:
         ApplicationService
             Service for manipulating applications.
         """
+        from .services.application import ApplicationService
+
         config_storage = self.create_config_storage()
-        helm_storage = HelmStorage(config_storage)
-        return ApplicationService(self._path, config_storage, helm_storage)
+        helm_storage = self.create_helm_storage(config_storage)
+        history = self.create_lint_history() if self._use_history else None
+        return ApplicationService(
+            self._path, config_storage, helm_storage, lint_history=history
+        )
 
     def create_config_storage(self) -> ConfigStorage:
         """Create storage layer for the Phalanx configuration.
@@ -50,7 +91,14 @@ class Factory:
         ConfigStorage
             Storage service for loading the Phalanx configuration.
         """
-        return ConfigStorage(self._path)
+        from .storage.config import ConfigStorage
+
+        if not self._use_cache:
+            return ConfigStorage(self._path)
+        root = str(self._path.resolve()).encode()
+        name = hashlib.sha256(root).hexdigest() + ".pickle"
+        snapshot = get_cache_path() / "config" / name
+        return ConfigStorage(self._path, snapshot=snapshot)
 
     def create_environment_service(self) -> EnvironmentService:
         """Create service for manipulating Phalanx environments.
@@ -60,13 +108,48 @@ class Factory:
         EnvironmentService
             Service for manipulating environments.
         """
+        from .services.environment import EnvironmentService
+        from .storage.argocd import ArgoCDStorage
+
         config_storage = self.create_config_storage()
         return EnvironmentService(
             config_storage=config_storage,
             argocd_storage=ArgoCDStorage(),
             kubernetes_storage=self.create_kubernetes_storage(),
-            helm_storage=HelmStorage(config_storage),
-            vault_storage=VaultStorage(),
+            helm_storage=self.create_helm_storage(config_storage),
+            vault_storage=self.create_vault_storage(),
+            checkpoint_path=get_cache_path() / "install",
+        )
+
+    def create_helm_storage(
+        self, config_storage: ConfigStorage
+    ) -> HelmStorage:
+        """Create storage object for running Helm.
+
+        Parameters
+        ----------
+        config_storage
+            Storage object for the Phalanx configuration.
+
+        Returns
+        -------
+        HelmStorage
+            Storage object for running Helm.
+        """
+        from .storage.helm import HelmStorage
+
+        cache = None
+        history = None
+        if self._use_cache:
+            cache = ResultCache(get_cache_path() / "helm")
+        if self._use_history:
+            history = self.create_lint_history()
+        return HelmStorage(
+            config_storage,
+            cache=cache,
+            history=history,
+            repo_ttl=self._helm_repo_ttl,
+            mirror=get_cache_path() / "helm-mirror",
         )
 
     def create_kubernetes_storage(self) -> KubernetesStorage:
@@ -77,8 +160,22 @@ class Factory:
         KubernetesStorage
             Storage object for interacting with Kubernetes.
         """
+        from .storage.kubernetes import KubernetesStorage
+
         return KubernetesStorage()
 
+    def create_lint_history(self) -> LintHistory:
+        """Create storage object for the history of Helm lints.
+
+        Returns
+        -------
+        LintHistory
+            History of the duration and outcome of previous lints.
+        """
+        from .storage.history import LintHistory
+
+        return LintHistory(get_cache_path() / "lint-history.sqlite")
+
     def create_onepassword_storage(self) -> OnepasswordStorage:
         """Create storage object for interacting with 1Password.
 
@@ -87,6 +184,8 @@ class Factory:
         OnepasswordStorage
             Storage object for interacting with 1Password.
         """
+        from .storage.onepassword import OnepasswordStorage
+
         return OnepasswordStorage()
 
     def create_secrets_service(self) -> SecretsService:
@@ -97,10 +196,12 @@ class Factory:
         SecretsService
             Service for manipulating secrets.
         """
+        from .services.secrets import SecretsService
+
         return SecretsService(
             self.create_config_storage(),
             self.create_onepassword_storage(),
-            VaultStorage(),
+            self.create_vault_storage(),
         )
 
     def create_vault_service(self) -> VaultService:
@@ -111,6 +212,20 @@ class Factory:
         VaultService
             Service for managing Vault tokens and policies.
         """
+        from .services.vault import VaultService
+
         config_storage = self.create_config_storage()
-        vault_storage = VaultStorage()
+        vault_storage = self.create_vault_storage()
         return VaultService(config_storage, vault_storage)
+
+    def create_vault_storage(self) -> VaultStorage:
+        """Create storage object for creating Vault clients.
+
+        Returns
+        -------
+        VaultStorage
+            Storage object for creating Vault clients.
+        """
+        from .storage.vault import VaultStorage
+
+        return VaultStorage(concurrency=self._vault_concurrency)
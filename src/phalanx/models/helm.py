@@ -2,9 +2,190 @@
 
 from __future__ import annotations
 
+import re
+from datetime import timedelta
 from enum import Enum
+from typing import Self
 
-__all__ = ["HelmStarter"]
+from pydantic import BaseModel, ConfigDict, Field
+
+__all__ = [
+    "HelmDependency",
+    "HelmLintReport",
+    "HelmLintResult",
+    "HelmLintShard",
+    "HelmLintStats",
+    "HelmLintTiming",
+    "HelmStarter",
+]
+
+
+class HelmDependency(BaseModel):
+    """Third-party chart used as a dependency of a Phalanx chart."""
+
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    """Name of the chart."""
+
+    version: str
+    """Version of the chart."""
+
+    repository: str
+    """URL of the Helm repository from which the chart is downloaded."""
+
+
+class HelmLintTiming(BaseModel):
+    """Outcome and duration of linting one application chart."""
+
+    model_config = ConfigDict(ser_json_timedelta="float")
+
+    application: str
+    """Name of the application."""
+
+    environment: str
+    """Name of the environment for which the chart was linted."""
+
+    success: bool
+    """Whether linting passed."""
+
+    duration: timedelta
+    """How long linting took, serialized as seconds."""
+
+
+class HelmLintShard(BaseModel):
+    """One of several shards into which linting is split."""
+
+    index: int = Field(..., ge=1)
+    """Number of this shard, starting from 1."""
+
+    count: int = Field(..., ge=1)
+    """Total number of shards."""
+
+    @classmethod
+    def from_str(cls, shard: str) -> Self:
+        """Parse a shard specification.
+
+        Parameters
+        ----------
+        shard
+            Shard in the form :samp:`{K}/{N}`.
+
+        Returns
+        -------
+        HelmLintShard
+            Corresponding shard.
+
+        Raises
+        ------
+        ValueError
+            Raised if the shard specification is invalid.
+        """
+        m = re.fullmatch(r"(\d+)/(\d+)", shard)
+        if not m or not 1 <= int(m.group(1)) <= int(m.group(2)):
+            raise ValueError(f"Invalid shard {shard}, must be K/N with K <= N")
+        return cls(index=int(m.group(1)), count=int(m.group(2)))
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+class HelmLintReport(BaseModel):
+    """Mergeable report of the results of linting application charts."""
+
+    shard: HelmLintShard | None = None
+    """Shard of the lint pairs covered by this report, if sharded."""
+
+    pairs: list[tuple[str, str]] | None = None
+    """All application and environment pairs divided among the shards.
+
+    Set only if sharded. Every shard of the same run should record the same
+    pairs, sorted by application and environment.
+    """
+
+    results: list[HelmLintTiming] = []
+    """Outcome and duration of each lint."""
+
+    @property
+    def success(self) -> bool:
+        """Whether every lint passed."""
+        return all(r.success for r in self.results)
+
+    @classmethod
+    def merge(cls, reports: list[Self]) -> Self:
+        """Merge the reports from several shards.
+
+        Parameters
+        ----------
+        reports
+            Reports to merge.
+
+        Returns
+        -------
+        HelmLintReport
+            Unsharded report containing the results from all reports, sorted
+            by application and environment.
+        """
+        results = [r for report in reports for r in report.results]
+        results.sort(key=lambda r: (r.application, r.environment))
+        return cls(results=results)
+
+
+class HelmLintResult(BaseModel):
+    """Result of linting a single chart with Helm.
+
+    The output of :command:`helm lint` is held here rather than printed
+    directly so that several charts can be linted in parallel without their
+    output interleaving.
+    """
+
+    application: str | None
+    """Name of the application, or `None` for the top-level chart."""
+
+    environment: str
+    """Name of the environment for which the chart was linted."""
+
+    success: bool
+    """Whether linting passed."""
+
+    output: str = ""
+    """Filtered standard output from :command:`helm lint`."""
+
+    errors: str = ""
+    """Standard error from :command:`helm lint` and any failure message."""
+
+
+class HelmLintStats(BaseModel):
+    """Summary of the recorded lints of one chart."""
+
+    application: str | None
+    """Name of the application, or `None` for the top-level chart."""
+
+    environment: str
+    """Name of the environment for which the chart was linted."""
+
+    runs: int
+    """Number of recorded lints."""
+
+    last: timedelta
+    """Duration of the most recent lint."""
+
+    median: timedelta
+    """Median duration of the recorded lints."""
+
+    trend: float | None
+    """Relative change in median duration from older to newer lints.
+
+    Compares the older half of the recorded lints with the newer half, so
+    0.5 means the chart now takes half again as long to lint. `None` if
+    there are too few recorded lints to compare.
+    """
+
+    success: bool
+    """Whether the most recent lint passed."""
+
+    helm_version: str
+    """Version of Helm used for the most recent lint."""
 
 
 class HelmStarter(Enum):
@@ -10,12 +10,7 @@ from enum import Enum
 from pathlib import Path
 from typing import Any, Literal, Self
 
-import bcrypt
 import yaml
-from cryptography.fernet import Fernet
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
 from pydantic import BaseModel, ConfigDict, Field, SecretStr, model_validator
 
 from ..constants import PULL_SECRET_DESCRIPTION
@@ -106,14 +101,22 @@ class SimpleSecretGenerateRules(BaseModel):
 
     def generate(self) -> SecretStr:
         """Generate a new secret following these rules."""
+        # The cryptography libraries are slow to import and only needed when
+        # generating secrets, so they are imported only when needed.
         match self.type:
             case SecretGenerateType.password:
                 return SecretStr(secrets.token_hex(32))
             case SecretGenerateType.gafaelfawr_token:
                 return SecretStr(str(Token()))
             case SecretGenerateType.fernet_key:
+                from cryptography.fernet import Fernet
+
                 return SecretStr(Fernet.generate_key().decode())
             case SecretGenerateType.rsa_private_key:
+                from cryptography.hazmat.backends import default_backend
+                from cryptography.hazmat.primitives import serialization
+                from cryptography.hazmat.primitives.asymmetric import rsa
+
                 private_key = rsa.generate_private_key(
                     backend=default_backend(),
                     public_exponent=65537,
@@ -153,6 +156,8 @@ class SourceSecretGenerateRules(BaseModel):
     def generate(self, source: SecretStr) -> SecretStr:
         match self.type:
             case SecretGenerateType.bcrypt_password_hash:
+                import bcrypt
+
                 password_hash = bcrypt.hashpw(
                     source.get_secret_value().encode(),
                     bcrypt.gensalt(rounds=15),
@@ -0,0 +1,38 @@
+"""Models for the protocol spoken by the Phalanx server."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from pydantic import BaseModel
+
+__all__ = [
+    "ServerRequest",
+    "ServerResponse",
+]
+
+
+class ServerRequest(BaseModel):
+    """Request to run a Phalanx command in the Phalanx server."""
+
+    args: list[str]
+    """Arguments to :command:`phalanx`, not including the program name."""
+
+    cwd: Path
+    """Working directory in which to run the command."""
+
+    environment: dict[str, str]
+    """Environment variables with which to run the command."""
+
+
+class ServerResponse(BaseModel):
+    """Result of running a Phalanx command in the Phalanx server."""
+
+    exit_code: int
+    """Exit status of the command."""
+
+    stdout: str = ""
+    """Standard output of the command."""
+
+    stderr: str = ""
+    """Standard error of the command."""
@@ -0,0 +1,104 @@
+"""Capture the output of tasks running in worker threads.
+
+Output of code running in one thread, including the output of external
+commands that it runs, can be captured into a buffer while other threads
+continue to write to the real standard output and error. This allows the
+output of concurrent tasks to be printed separately once each task finishes,
+rather than interleaved.
+"""
+
+from __future__ import annotations
+
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from io import StringIO
+from typing import Any, TextIO
+
+__all__ = [
+    "capture_output",
+    "get_output_capture",
+    "redirect_captured_output",
+]
+
+_capture: ContextVar[StringIO | None] = ContextVar("_capture", default=None)
+"""Buffer capturing the output of the current context, if any."""
+
+
+class _CapturingStream:
+    """Stream that writes to the output capture of the current context.
+
+    Parameters
+    ----------
+    stream
+        Stream to write to when output is not being captured.
+    """
+
+    def __init__(self, stream: TextIO) -> None:
+        self._stream = stream
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    def flush(self) -> None:
+        if _capture.get() is None:
+            self._stream.flush()
+
+    def write(self, text: str) -> int:
+        capture = _capture.get()
+        if capture is None:
+            return self._stream.write(text)
+        return capture.write(text)
+
+
+@contextmanager
+def capture_output() -> Iterator[StringIO]:
+    """Capture the output of the current thread.
+
+    Output written to `sys.stdout` and `sys.stderr` is only captured while
+    `redirect_captured_output` is also active. Both are captured into the
+    same buffer, as is the output of external commands run with
+    `~phalanx.storage.command.Command.run`. Threads started by the current
+    thread do not inherit the capture unless they are run in a copy of its
+    context.
+
+    Yields
+    ------
+    io.StringIO
+        Buffer holding the captured output.
+    """
+    buffer = StringIO()
+    token = _capture.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _capture.reset(token)
+
+
+def get_output_capture() -> StringIO | None:
+    """Get the buffer capturing the output of the current thread.
+
+    Returns
+    -------
+    io.StringIO or None
+        Buffer capturing output, or `None` if output is not being captured.
+    """
+    return _capture.get()
+
+
+@contextmanager
+def redirect_captured_output() -> Iterator[None]:
+    """Send output written to standard output and error to captures.
+
+    While active, anything written to `sys.stdout` or `sys.stderr` by a
+    thread inside `capture_output` goes to its buffer instead. Output from
+    all other threads is passed through unchanged.
+    """
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = _CapturingStream(stdout)
+    sys.stderr = _CapturingStream(stderr)
+    try:
+        yield
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
@@ -0,0 +1,268 @@
+"""Long-running server that runs Phalanx commands with warm state.
+
+Developers run commands such as :command:`phalanx application template`
+repeatedly while editing charts. Each run pays for Python startup, parsing
+the Phalanx configuration, and registering and refreshing Helm repositories.
+The server started by :command:`phalanx serve` runs those commands itself,
+so the parsed configuration and prepared Helm repositories are kept in
+memory between commands. :command:`phalanx client` forwards a command to the
+server if it is running and otherwise runs the command directly.
+
+Only commands that do not prompt for input and do not change anything
+outside of the local configuration tree and Helm caches are run by the
+server. Commands are run one at a time.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import socketserver
+import sys
+import traceback
+from collections.abc import Iterator
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from pathlib import Path
+from tempfile import TemporaryFile
+from typing import TextIO
+
+from .constants import HELM_REPO_REFRESH_INTERVAL
+from .models.server import ServerRequest, ServerResponse
+from .storage.cache import get_cache_path
+from .storage.helm import HelmStorage
+
+__all__ = [
+    "PhalanxServer",
+    "forward_command",
+    "get_socket_path",
+    "is_server_command",
+]
+
+_SERVER_COMMANDS = {
+    ("application", "lint"),
+    ("application", "lint-all"),
+    ("application", "template"),
+    ("environment", "lint"),
+    ("environment", "template"),
+    ("secrets", "list"),
+}
+"""Commands that may be run by the server."""
+
+
+def forward_command(
+    socket_path: Path, args: list[str]
+) -> ServerResponse | None:
+    """Run a command in the Phalanx server if it is running.
+
+    The command is run with the current working directory and environment.
+
+    Parameters
+    ----------
+    socket_path
+        Path to the Unix socket on which the server listens.
+    args
+        Arguments to :command:`phalanx`, not including the program name.
+
+    Returns
+    -------
+    ServerResponse or None
+        Result of the command, or `None` if no server is listening on that
+        socket.
+    """
+    request = ServerRequest(
+        args=args, cwd=Path.cwd(), environment=dict(os.environ)
+    )
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        try:
+            conn.connect(str(socket_path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            return None
+        conn.sendall(request.model_dump_json().encode())
+        conn.shutdown(socket.SHUT_WR)
+        data = b""
+        while chunk := conn.recv(65536):
+            data += chunk
+    return ServerResponse.model_validate_json(data)
+
+
+def get_socket_path() -> Path:
+    """Determine the default path to the Phalanx server socket.
+
+    Uses ``XDG_RUNTIME_DIR`` if that environment variable is set, since that
+    directory is private to the user, and otherwise the Phalanx cache
+    directory.
+
+    Returns
+    -------
+    pathlib.Path
+        Default path to the socket.
+    """
+    if runtime_dir := os.getenv("XDG_RUNTIME_DIR"):
+        return Path(runtime_dir) / "phalanx.sock"
+    return get_cache_path() / "server.sock"
+
+
+def is_server_command(args: list[str]) -> bool:
+    """Determine whether a command may be run by the Phalanx server.
+
+    Parameters
+    ----------
+    args
+        Arguments to :command:`phalanx`, not including the program name.
+
+    Returns
+    -------
+    bool
+        Whether the server will run this command. Watching for changes never
+        finishes, so is always run locally.
+    """
+    return tuple(args[:2]) in _SERVER_COMMANDS and "--watch" not in args
+
+
+@contextmanager
+def _capture_output(stdout: TextIO, stderr: TextIO) -> Iterator[None]:
+    """Send all output of this process to the given files.
+
+    Output is redirected at the file descriptor level as well, so that the
+    output of Helm and other subprocesses is captured.
+
+    Parameters
+    ----------
+    stdout
+        File to which to send standard output.
+    stderr
+        File to which to send standard error.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    try:
+        os.dup2(stdout.fileno(), 1)
+        os.dup2(stderr.fileno(), 2)
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            yield
+    finally:
+        stdout.flush()
+        stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in saved:
+            os.close(fd)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handle a single request to the Phalanx server."""
+
+    server: PhalanxServer
+
+    def handle(self) -> None:
+        request = ServerRequest.model_validate_json(self.rfile.read())
+        response = self.server.run_command(request)
+        self.wfile.write(response.model_dump_json().encode())
+
+
+class PhalanxServer(socketserver.UnixStreamServer):
+    """Server that runs Phalanx commands received on a Unix socket.
+
+    The socket is only accessible by the user running the server, since
+    commands are run with the environment of the client, which may contain
+    credentials. Helm repositories are registered at most once and refreshed
+    at most every `~phalanx.constants.HELM_REPO_REFRESH_INTERVAL`.
+
+    Parameters
+    ----------
+    socket_path
+        Path to the Unix socket on which to listen.
+
+    Raises
+    ------
+    RuntimeError
+        Raised if another server is already listening on that socket.
+    """
+
+    def __init__(self, socket_path: Path) -> None:
+        if socket_path.exists():
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                try:
+                    conn.connect(str(socket_path))
+                except ConnectionRefusedError:
+                    socket_path.unlink()
+                else:
+                    msg = f"Phalanx server already running on {socket_path}"
+                    raise RuntimeError(msg)
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.socket_path = socket_path
+        old_umask = os.umask(0o077)
+        try:
+            super().__init__(str(socket_path), _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        HelmStorage.remember_repositories(HELM_REPO_REFRESH_INTERVAL)
+
+    def run_command(self, request: ServerRequest) -> ServerResponse:
+        """Run a Phalanx command.
+
+        Parameters
+        ----------
+        request
+            Command to run.
+
+        Returns
+        -------
+        ServerResponse
+            Result of the command.
+        """
+        if not is_server_command(request.args):
+            command = " ".join(request.args[:2])
+            msg = f"Error: phalanx {command} cannot be run by the server\n"
+            return ServerResponse(exit_code=2, stderr=msg)
+
+        # Commands read their configuration from the environment and the
+        # working directory, so switch to those of the client while the
+        # command runs. This is safe because commands are run one at a time.
+        # External commands such as Helm may write output that is not valid
+        # UTF-8, which is replaced rather than failing the request.
+        saved_cwd = Path.cwd()
+        saved_environment = dict(os.environ)
+        with (
+            TemporaryFile(
+                "w+", buffering=1, encoding="utf-8", errors="replace"
+            ) as stdout,
+            TemporaryFile(
+                "w+", buffering=1, encoding="utf-8", errors="replace"
+            ) as stderr,
+        ):
+            try:
+                os.chdir(request.cwd)
+                os.environ.clear()
+                os.environ.update(request.environment)
+                with _capture_output(stdout, stderr):
+                    exit_code = self._invoke(request.args)
+            finally:
+                os.chdir(saved_cwd)
+                os.environ.clear()
+                os.environ.update(saved_environment)
+            stdout.seek(0)
+            stderr.seek(0)
+            return ServerResponse(
+                exit_code=exit_code, stdout=stdout.read(), stderr=stderr.read()
+            )
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+    def _invoke(self, args: list[str]) -> int:
+        """Run the command-line interface and return its exit status."""
+        from .cli import main
+
+        try:
+            main.main(args=args, prog_name="phalanx")
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                return e.code or 0
+            sys.stderr.write(f"{e.code}\n")
+            return 1
+        except Exception:
+            traceback.print_exc()
+            return 1
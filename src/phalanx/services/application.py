@@ -4,18 +4,34 @@ from __future__ import annotations
 
 import base64
 import json
-from collections.abc import Iterable
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import cached_property
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import jinja2
-
-from ..exceptions import ApplicationExistsError
+from ..exceptions import ApplicationExistsError, UnknownEnvironmentError
 from ..models.applications import Project
 from ..models.environments import Environment
-from ..models.helm import HelmStarter
+from ..models.helm import (
+    HelmDependency,
+    HelmLintReport,
+    HelmLintResult,
+    HelmLintShard,
+    HelmLintTiming,
+    HelmStarter,
+)
 from ..storage.config import ConfigStorage
 from ..storage.helm import HelmStorage
+from ..storage.history import LintHistory
+
+if TYPE_CHECKING:
+    import jinja2
 
 __all__ = ["ApplicationService"]
 
@@ -31,6 +47,9 @@ class ApplicationService:
         Storage object for the Phalanx configuration.
     helm_storage
         Interface to Helm actions.
+    lint_history
+        If given, history of previous lints used to start the slowest charts
+        first when linting in parallel.
     """
 
     def __init__(
@@ -38,25 +57,25 @@ class ApplicationService:
         path: Path,
         config_storage: ConfigStorage,
         helm_storage: HelmStorage,
+        *,
+        lint_history: LintHistory | None = None,
     ) -> None:
         self._path = path
         self._config = config_storage
         self._helm = helm_storage
-        self._templates = jinja2.Environment(
-            loader=jinja2.PackageLoader("phalanx", "data"),
-            undefined=jinja2.StrictUndefined,
-            autoescape=jinja2.select_autoescape(disabled_extensions=["jinja"]),
-        )
+        self._history = lint_history
 
     def add_helm_repositories(
         self, applications: Iterable[str] | None = None, *, quiet: bool = False
-    ) -> bool:
+    ) -> None:
         """Add all Helm repositories used by any application to Helm's cache.
 
         To perform other Helm operations, such as downloading third-party
         charts in order to run :command:`helm lint`, all third-party Helm
-        chart repositories have to be added to Helm's cache. This does that
-        for every application in the Phalanx configuration.
+        chart repositories have to be added to Helm's cache and their indices
+        must be current. This does that for every application in the Phalanx
+        configuration. Repositories Helm already knows about are not added
+        again, and only indices that are out of date are refreshed.
 
         Consistent names for the Helm repositories are used so that this
         command can be run repeatedly.
@@ -65,27 +84,21 @@ class ApplicationService:
         ----------
         applications
             If given, only add Helm repositories required by these
-            applications.
+            applications. Repositories are not needed by applications whose
+            dependencies are all in the local chart mirror.
         quiet
             Whether to suppress Helm's standard output.
-
-        Returns
-        -------
-        bool
-            Whether any Helm repositories were added. If there were none, the
-            caller should not call :command:`helm update`, because it fails
-            if there are no repositories.
         """
         if applications:
             repo_urls = set()
             for application in applications:
+                if self._helm.is_mirrored(application):
+                    continue
                 urls = self._config.get_dependency_repositories(application)
                 repo_urls.update(urls)
         else:
             repo_urls = self._config.get_all_dependency_repositories()
-        for url in sorted(repo_urls):
-            self._helm.repo_add(url, quiet=quiet)
-        return bool(repo_urls)
+        self._helm.prepare_repositories(repo_urls, quiet=quiet)
 
     def create(
         self,
@@ -125,6 +138,45 @@ class ApplicationService:
         # Add the documentation.
         self._create_application_docs(name, description, project)
 
+    def get_modified_applications(self, branch: str) -> dict[str, list[str]]:
+        """Get the application and environment pairs affected by Git changes.
+
+        In addition to changes to application charts and the shared charts
+        they use, changes to the environment configuration and to application
+        :file:`values.yaml` files are considered. The injected values and the
+        merged values referenced by the chart are gathered for each pair from
+        the configuration on that branch and from the current configuration,
+        and the pair is included only if they differ.
+
+        Parameters
+        ----------
+        branch
+            Git branch against which to compare to see what modifications
+            have been made.
+
+        Returns
+        -------
+        dict of list of str
+            Dictionary of all affected applications to the list of
+            environments configured for that application that may have been
+            affected.
+        """
+        result = self._config.get_modified_applications(branch)
+        if not self._config.has_modified_values(branch):
+            return result
+        targets = self._config.list_application_environments()
+        inputs = self._build_lint_inputs(self._config, targets)
+        with self._config.load_revision(branch) as old_config:
+            old_inputs = self._build_lint_inputs(old_config, targets)
+        for application, envs in targets.items():
+            for env in envs:
+                if env in result.get(application, []):
+                    continue
+                pair = (application, env)
+                if inputs.get(pair) != old_inputs.get(pair):
+                    result[application] = [*result.get(application, []), env]
+        return result
+
     def lint(self, app_names: list[str], env_name: str | None) -> bool:
         """Lint an application with Helm.
 
@@ -145,8 +197,7 @@ class ApplicationService:
         bool
             Whether linting passed.
         """
-        if self.add_helm_repositories(app_names):
-            self._helm.repo_update()
+        self.add_helm_repositories(app_names)
         environments: dict[str, Environment] = {}
         if env_name:
             environments[env_name] = self._config.load_environment(env_name)
@@ -165,7 +216,14 @@ class ApplicationService:
                 success &= self._helm.lint_application(app_name, env, values)
         return success
 
-    def lint_all(self, *, only_changes_from_branch: str | None = None) -> bool:
+    def lint_all(
+        self,
+        *,
+        only_changes_from_branch: str | None = None,
+        jobs: int = 1,
+        shard: HelmLintShard | None = None,
+        timings: HelmLintReport | None = None,
+    ) -> HelmLintReport:
         """Lint all applications with Helm.
 
         Registers any required Helm repositories, refreshes them, downloads
@@ -180,36 +238,154 @@ class ApplicationService:
             In other words, assume all application chart configurations
             identical to the given branch are uninteresting, and only lint the
             ones that have changed.
+        jobs
+            Number of Helm commands to run in parallel. If greater than one,
+            dependencies for all applications are downloaded in parallel
+            before linting starts, and the output of each lint is buffered
+            and printed after all linting is complete, in the same order as a
+            serial run. The charts that took longest to lint in previous runs
+            are started first so that they do not delay the end of the run.
+        shard
+            If given, only lint this shard of the application and environment
+            pairs. Pairs are divided so that each shard should take about the
+            same time, using the durations in ``timings`` where available and
+            otherwise the size of each chart. The division is deterministic
+            as long as every shard is given the same ``timings``.
+        timings
+            Report from a previous lint used to estimate how long each pair
+            takes to lint when dividing pairs into shards.
 
         Returns
         -------
-        bool
-            Whether linting passed.
+        HelmLintReport
+            Outcome and duration of each lint.
         """
         if only_changes_from_branch:
             branch = only_changes_from_branch
-            to_lint = self._config.get_modified_applications(branch)
+            to_lint = self.get_modified_applications(branch)
         else:
             to_lint = self._config.list_application_environments()
-        if self.add_helm_repositories(to_lint.keys()):
-            self._helm.repo_update()
-        environments: dict[str, Environment] = {}
-        success = True
-        for app_name, app_envs in sorted(to_lint.items()):
-            if not app_envs:
-                continue
-            self._helm.dependency_update(app_name, quiet=True)
-            for env_name in app_envs:
-                if env_name in environments:
-                    environment = environments[env_name]
-                else:
-                    environment = self._config.load_environment(env_name)
-                    environments[env_name] = environment
-                values = self._build_injected_values(app_name, environment)
-                success &= self._helm.lint_application(
-                    app_name, env_name, values
+        report = HelmLintReport(shard=shard)
+        if shard:
+            all_pairs = ((a, e) for a, envs in to_lint.items() for e in envs)
+            report.pairs = sorted(all_pairs)
+            to_lint = self._select_shard(report.pairs, shard, timings)
+        self.add_helm_repositories(to_lint.keys())
+        if jobs == 1:
+            for pair in self._prepare_lint_pairs(to_lint):
+                result, timing = self._capture_lint_timed(*pair)
+                self._helm.print_lint_result(result)
+                report.results.append(timing)
+            return report
+
+        # Linting of each application and environment pair is independent
+        # once dependencies have been downloaded, so hand them off to a pool
+        # of threads (each of which spends its time waiting for Helm) and
+        # then print the results in the same order as a serial run. Pairs are
+        # submitted longest first so that a slow chart started last doesn't
+        # leave the other threads idle at the end.
+        applications = sorted(a for a, envs in to_lint.items() if envs)
+        self._helm.prepare_dependencies(applications, jobs=jobs)
+        pairs = list(
+            self._prepare_lint_pairs(to_lint, update_dependencies=False)
+        )
+        durations: dict[tuple[str, str], float] = {}
+        if self._history:
+            try:
+                history = self._history.get_durations()
+            except (OSError, sqlite3.Error) as e:
+                msg = f"Warning: Cannot read lint history: {e}\n"
+                sys.stderr.write(msg)
+                history = {}
+            durations = {
+                (a, e): d.total_seconds()
+                for (a, e), d in history.items()
+                if a is not None
+            }
+        costs = self._estimate_lint_costs(
+            [(a, e) for a, e, _ in pairs], durations
+        )
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                (a, e): pool.submit(self._capture_lint_timed, a, e, values)
+                for a, e, values in sorted(
+                    pairs, key=lambda p: -costs[p[0], p[1]]
                 )
-        return success
+            }
+            for app_name, env_name, _ in pairs:
+                result, timing = futures[app_name, env_name].result()
+                self._helm.print_lint_result(result)
+                report.results.append(timing)
+        return report
+
+    def lint_watch(
+        self,
+        app_names: list[str],
+        env_name: str | None,
+        changes: Iterable[Iterable[Path]],
+    ) -> None:
+        """Lint applications and lint them again whenever they change.
+
+        After an initial lint, each batch of changed files is mapped to the
+        application and environment pairs that it may affect, and only those
+        pairs are linted again. Changes to the environment configuration or
+        to :file:`values.yaml` only cause a pair to be linted again if they
+        changed its injected values or the merged values its chart references.
+        The results of each lint and the time it took are printed as soon as
+        it finishes.
+
+        Parameters
+        ----------
+        app_names
+            Names of the applications to lint.
+        env_name
+            Name of the environment. If not given, lint all environments for
+            which each application has a configuration.
+        changes
+            Batches of changed files, normally from a
+            `~phalanx.storage.watch.FileWatcher`. Returns when this is
+            exhausted.
+        """
+        targets = self._get_lint_targets(app_names, env_name)
+        inputs = self._build_lint_inputs(self._config, targets)
+        self._lint_timed(targets)
+        for paths in changes:
+            affected = self._config.get_affected_applications(paths)
+            targets = self._get_lint_targets(app_names, env_name)
+            old_inputs = inputs
+            inputs = self._build_lint_inputs(self._config, targets)
+            to_lint = {
+                a: [
+                    e
+                    for e in envs
+                    if e in affected.get(a, [])
+                    or inputs.get((a, e)) != old_inputs.get((a, e))
+                ]
+                for a, envs in targets.items()
+            }
+            if any(to_lint.values()):
+                self._lint_timed(to_lint)
+
+    def mirror_charts(self, *, jobs: int = 1) -> list[HelmDependency]:
+        """Download every third-party chart into the local chart mirror.
+
+        Once the mirror holds every third-party dependency of an application,
+        its dependencies are installed from the mirror and linting or
+        expanding its chart doesn't need the network.
+
+        Parameters
+        ----------
+        jobs
+            Maximum number of charts to download in parallel.
+
+        Returns
+        -------
+        list of HelmDependency
+            Charts that were downloaded because they were not already in the
+            mirror.
+        """
+        dependencies = self._config.get_all_remote_dependencies()
+        return self._helm.mirror_charts(dependencies, jobs=jobs)
 
     def template(self, app_name: str, env_name: str) -> str:
         """Expand the templates of an application chart.
@@ -235,13 +411,27 @@ class ApplicationService:
         CommandFailedError
             Raised if Helm fails.
         """
-        if self.add_helm_repositories([app_name], quiet=True):
-            self._helm.repo_update(quiet=True)
+        self.add_helm_repositories([app_name], quiet=True)
         self._helm.dependency_update(app_name, quiet=True)
         environment = self._config.load_environment(env_name)
         values = self._build_injected_values(app_name, environment)
         return self._helm.template_application(app_name, env_name, values)
 
+    @cached_property
+    def _templates(self) -> jinja2.Environment:
+        """Templates used to create new applications.
+
+        Jinja is only needed when creating applications, so it is imported
+        when the templates are first used.
+        """
+        import jinja2
+
+        return jinja2.Environment(
+            loader=jinja2.PackageLoader("phalanx", "data"),
+            undefined=jinja2.StrictUndefined,
+            autoescape=jinja2.select_autoescape(disabled_extensions=["jinja"]),
+        )
+
     def _build_injected_values(
         self, application: str, environment: Environment
     ) -> dict[str, str]:
@@ -327,6 +517,81 @@ class ApplicationService:
 
         return values
 
+    def _build_lint_inputs(
+        self, config: ConfigStorage, to_lint: dict[str, list[str]]
+    ) -> dict[tuple[str, str], tuple[dict[str, str], dict[str, Any]]]:
+        """Gather the configuration that determines the result of each lint.
+
+        Two application and environment pairs with the same inputs lint the
+        same way, provided that the application chart itself is unchanged.
+
+        Parameters
+        ----------
+        config
+            Phalanx configuration from which to gather the inputs, which need
+            not be the current configuration.
+        to_lint
+            Mapping of application names to environments.
+
+        Returns
+        -------
+        dict of tuple
+            Mapping from application and environment pairs to their injected
+            values and the merged values that their chart references. Pairs
+            for applications or environments that do not exist in that
+            configuration are omitted.
+        """
+        environments: dict[str, Environment | None] = {}
+        result = {}
+        for app_name, app_envs in to_lint.items():
+            if not config.get_application_chart_path(app_name).exists():
+                continue
+            for env_name in app_envs:
+                if env_name not in environments:
+                    try:
+                        environment = config.load_environment(env_name)
+                    except UnknownEnvironmentError:
+                        environment = None
+                    environments[env_name] = environment
+            referenced = config.get_referenced_values(app_name, app_envs)
+            for env_name in app_envs:
+                if environment := environments[env_name]:
+                    values = self._build_injected_values(app_name, environment)
+                    result[app_name, env_name] = (values, referenced[env_name])
+        return result
+
+    def _capture_lint_timed(
+        self, app_name: str, env_name: str, values: dict[str, str]
+    ) -> tuple[HelmLintResult, HelmLintTiming]:
+        """Lint an application chart with Helm, measuring how long it takes.
+
+        Parameters
+        ----------
+        app_name
+            Name of the application.
+        env_name
+            Name of the environment.
+        values
+            Extra key/value pairs to set, reflecting the settings injected by
+            Argo CD.
+
+        Returns
+        -------
+        tuple
+            Results of the lint and its outcome and duration.
+        """
+        start = time.monotonic()
+        result = self._helm.capture_lint_application(
+            app_name, env_name, values
+        )
+        timing = HelmLintTiming(
+            application=app_name,
+            environment=env_name,
+            success=result.success,
+            duration=timedelta(seconds=time.monotonic() - start),
+        )
+        return result, timing
+
     def _create_application_template(
         self, name: str, project: Project
     ) -> None:
@@ -404,6 +669,173 @@ class ApplicationService:
         index.insert(line, new_line)
         index_path.write_text("\n".join(index))
 
+    def _estimate_lint_costs(
+        self,
+        pairs: list[tuple[str, str]],
+        durations: dict[tuple[str, str], float],
+    ) -> dict[tuple[str, str], float]:
+        """Estimate how long each application and environment pair will take.
+
+        Pairs without a known duration are estimated from the size of the
+        chart, converted to seconds using the average time per unit of size
+        of the pairs whose durations are known.
+
+        Parameters
+        ----------
+        pairs
+            Application and environment pairs to estimate.
+        durations
+            Known durations of pairs in seconds.
+
+        Returns
+        -------
+        dict of float
+            Estimated duration of each pair in seconds.
+        """
+        sizes = {a: self._config.get_chart_size(a) for a, _ in pairs}
+        timed = [p for p in pairs if p in durations]
+        rate = 1.0
+        if timed:
+            total_size = sum(sizes[a] for a, _ in timed)
+            rate = sum(durations[p] for p in timed) / total_size
+        return {p: durations.get(p, sizes[p[0]] * rate) for p in pairs}
+
+    def _get_lint_targets(
+        self, app_names: list[str], env_name: str | None
+    ) -> dict[str, list[str]]:
+        """Determine the environments in which to lint applications.
+
+        Parameters
+        ----------
+        app_names
+            Names of the applications to lint.
+        env_name
+            Name of the environment. If not given, use all environments for
+            which each application has a configuration.
+
+        Returns
+        -------
+        dict of list of str
+            Mapping of application names to the environments in which to lint
+            that application.
+        """
+        if env_name:
+            return {a: [env_name] for a in app_names}
+        return {
+            a: self._config.get_application_environments(a) for a in app_names
+        }
+
+    def _lint_timed(self, to_lint: dict[str, list[str]]) -> bool:
+        """Lint application and environment pairs, reporting timing.
+
+        Parameters
+        ----------
+        to_lint
+            Mapping of application names to the environments in which to lint
+            that application.
+
+        Returns
+        -------
+        bool
+            Whether linting passed.
+        """
+        self.add_helm_repositories(to_lint.keys(), quiet=True)
+        success = True
+        for pair in self._prepare_lint_pairs(to_lint):
+            result, timing = self._capture_lint_timed(*pair)
+            self._helm.print_lint_result(result, elapsed=timing.duration)
+            success &= result.success
+        return success
+
+    def _select_shard(
+        self,
+        pairs: list[tuple[str, str]],
+        shard: HelmLintShard,
+        timings: HelmLintReport | None,
+    ) -> dict[str, list[str]]:
+        """Select the application and environment pairs for one shard.
+
+        Pairs are assigned longest first to whichever shard has the least
+        total estimated time so far, with ties broken by name and shard
+        number so that every shard computes the same assignment.
+
+        Parameters
+        ----------
+        pairs
+            All application and environment pairs to divide among the
+            shards, sorted.
+        shard
+            Shard to select.
+        timings
+            Report from a previous lint giving the duration of pairs.
+
+        Returns
+        -------
+        dict of list of str
+            Mapping of application names to the environments in which to lint
+            that application, for the pairs assigned to that shard.
+        """
+        durations = {}
+        if timings:
+            durations = {
+                (t.application, t.environment): t.duration.total_seconds()
+                for t in timings.results
+            }
+        costs = self._estimate_lint_costs(pairs, durations)
+        loads = [0.0] * shard.count
+        assigned: list[list[tuple[str, str]]] = [[] for _ in loads]
+        for pair in sorted(pairs, key=lambda p: (-costs[p], p)):
+            index = min(range(shard.count), key=lambda i: (loads[i], i))
+            loads[index] += costs[pair]
+            assigned[index].append(pair)
+        result: defaultdict[str, list[str]] = defaultdict(list)
+        for app_name, env_name in sorted(assigned[shard.index - 1]):
+            result[app_name].append(env_name)
+        return dict(result)
+
+    def _prepare_lint_pairs(
+        self,
+        to_lint: dict[str, list[str]],
+        *,
+        update_dependencies: bool = True,
+    ) -> Iterator[tuple[str, str, dict[str, str]]]:
+        """Prepare application and environment pairs for linting.
+
+        Dependencies for each application are downloaded just before the
+        first pair for that application is returned, so iterating over this
+        generator and linting each pair as it is returned preserves the order
+        of Helm commands in a serial lint.
+
+        Parameters
+        ----------
+        to_lint
+            Mapping of application names to the environments in which to lint
+            that application.
+        update_dependencies
+            Whether to download dependencies for each application. Set to
+            `False` if they have already been downloaded.
+
+        Yields
+        ------
+        tuple
+            Application name, environment name, and the extra values to
+            inject for that pair, in sorted order by application.
+        """
+        environments: dict[str, Environment] = {}
+        for app_name, app_envs in sorted(to_lint.items()):
+            if not app_envs:
+                continue
+            if update_dependencies:
+                self._helm.dependency_update(app_name, quiet=True)
+            for env_name in app_envs:
+                if env_name in environments:
+                    environment = environments[env_name]
+                else:
+                    environment = self._config.load_environment(env_name)
+                    environments[env_name] = environment
+                values = self._build_injected_values(app_name, environment)
+                yield app_name, env_name, values
+
 
 def _json_and_base64_encode(obj: Any) -> str:
     """Encode an object into a JSON string, then base64 encode it. This helps
@@ -2,20 +2,31 @@
 
 from __future__ import annotations
 
+import hashlib
+import sys
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import timedelta
+from functools import partial
+from pathlib import Path
 
 from pydantic import SecretStr
 
+from ..constants import INFRASTRUCTURE_APPLICATIONS
 from ..exceptions import VaultNotFoundError
 from ..github import action_group, add_mask
 from ..models.applications import Project
 from ..models.environments import Environment
+from ..models.helm import HelmLintResult
 from ..models.vault import VaultCredentials
 from ..storage.argocd import ArgoCDStorage
+from ..storage.checkpoint import InstallCheckpoint
 from ..storage.config import ConfigStorage
 from ..storage.helm import HelmStorage
 from ..storage.kubernetes import KubernetesStorage
 from ..storage.vault import VaultClient, VaultStorage
+from ..taskgraph import Task, TaskGraph, TaskResult
 
 __all__ = ["EnvironmentService"]
 
@@ -35,6 +46,9 @@ class EnvironmentService:
         Interface to Helm actions.
     vault_storage
         Factory class for Vault clients.
+    checkpoint_path
+        Directory in which to record the completed steps of installations so
+        that a failed installation can be resumed.
     """
 
     def __init__(
@@ -45,8 +59,10 @@ class EnvironmentService:
         kubernetes_storage: KubernetesStorage,
         helm_storage: HelmStorage,
         vault_storage: VaultStorage,
+        checkpoint_path: Path,
     ) -> None:
         self._config = config_storage
+        self._checkpoint_path = checkpoint_path
         self._argocd = argocd_storage
         self._kubernetes = kubernetes_storage
         self._helm = helm_storage
@@ -57,9 +73,30 @@ class EnvironmentService:
         environment_name: str,
         vault_credentials: VaultCredentials,
         git_branch: str | None = None,
+        *,
+        resume: bool = True,
     ) -> None:
         """Install a Phalanx environment.
 
+        The installation is a graph of steps, each of which starts as soon as
+        the steps it depends on have finished. The infrastructure
+        applications in `~phalanx.constants.INFRASTRUCTURE_APPLICATIONS` are
+        synced once Argo CD is running, each at the same time as any others
+        it does not depend on, and all other applications are synced after
+        them. Preparation that does not change the cluster, such as reading
+        the Argo CD password from Vault and downloading charts, runs
+        concurrently before the first change, except that the Argo CD chart
+        is prepared while vault-secrets-operator is being installed. The
+        start of each step is reported as it happens. The output of each step
+        is captured and printed once the step finishes, followed by how long
+        it took, in its own GitHub Actions group.
+
+        Each completed step is recorded in a checkpoint file specific to the
+        environment and Kubernetes cluster. When resuming, a step completed
+        by a previous installation is skipped if its result can still be
+        seen: Helm releases must be deployed from the same inputs, and Argo
+        CD applications must be synced and healthy.
+
         Parameters
         ----------
         environment_name
@@ -70,50 +107,69 @@ class EnvironmentService:
         git_branch
             Git branch to point Argo CD at. If not given, defaults to the
             current branch.
+        resume
+            Whether to skip steps completed by a previous installation. If
+            `False`, all steps are run.
 
         Raises
         ------
+        ArgoCDError
+            Raised if an Argo CD operation fails.
         CommandFailedError
             Raised if one of the underlying commands fails.
+        KubernetesError
+            Raised if the Argo CD rollout fails or does not finish in time.
         ValueError
-            Raised if ``appOfAppsName`` is not set in the environment
-            configuration.
+            Raised if ``appOfAppsName`` or ``vaultUrl`` is not set in the
+            environment configuration.
         VaultNotFoundError
             Raised if a necessary secret was not found in Vault.
         """
         environment = self._config.load_environment(environment_name)
-        vault = self._vault_storage.get_vault_client(
-            environment, credentials=vault_credentials
-        )
+        if not environment.vault_url:
+            raise ValueError(f"vaultUrl not set for {environment.name}")
 
         # Get information about the local repository.
         if not git_branch:
             git_branch = self._config.get_git_branch()
 
-        # Get the plain-text Argo CD admin password from Vault and tell GitHub
-        # Actions to mask it.
-        argocd_password = self._get_argocd_password(vault)
-
-        # Update Helm dependencies.
-        self._update_helm_dependencies(["vault-secrets-operator", "argocd"])
+        # Find the record of any previous installation into this cluster.
+        context = self._kubernetes.get_current_context()
+        context_hash = hashlib.sha256(context.encode()).hexdigest()[:16]
+        checkpoint = InstallCheckpoint(
+            self._checkpoint_path / f"{environment.name}-{context_hash}.json"
+        )
+        if not resume:
+            checkpoint.clear()
 
         # Perform the installation.
-        self._install_vault_secrets_operator(
-            environment, vault_credentials, vault.url
+        graph = self._build_install_graph(
+            environment,
+            vault_credentials,
+            git_branch,
+            checkpoint=checkpoint,
         )
-        self._install_argocd(environment)
-        self._install_app_of_apps(environment, git_branch, argocd_password)
-        self._sync_argocd()
-        self._sync_infrastructure_applications(environment)
-        self._sync_remaining_applications(environment)
+        try:
+            graph.run(
+                capture=True,
+                started=self._report_step_started,
+                finished=self._report_step_finished,
+            )
+        finally:
+            self._argocd.close()
+            self._kubernetes.close()
 
-    def lint(self, environment: str | None = None) -> bool:
+    def lint(self, environment: str | None = None, *, jobs: int = 1) -> bool:
         """Lint the Helm chart for environments.
 
         Parameters
         ----------
         environment
             If given, lint only the specified environment.
+        jobs
+            Number of environments to lint in parallel. If greater than one,
+            the output of each lint is buffered and printed in the same order
+            as a serial run.
 
         Returns
         -------
@@ -122,11 +178,65 @@ class EnvironmentService:
         """
         if environment:
             return self._helm.lint_environment(environment)
-        success = True
-        for env in self._config.list_environments():
-            success &= self._helm.lint_environment(env)
+        environments = self._config.list_environments()
+        if jobs == 1:
+            success = True
+            for env in environments:
+                success &= self._helm.lint_environment(env)
+            return success
+
+        # Each lint is independent, so hand them off to a pool of threads
+        # (each of which spends its time waiting for Helm) and then print the
+        # results in the order in which they were submitted.
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = [
+                pool.submit(self._helm.capture_lint_environment, e)
+                for e in environments
+            ]
+            success = True
+            for future in futures:
+                result = future.result()
+                self._helm.print_lint_result(result)
+                success &= result.success
         return success
 
+    def lint_watch(
+        self,
+        environment: str | None,
+        changes: Iterable[Iterable[Path]],
+        *,
+        jobs: int = 1,
+    ) -> None:
+        """Lint environments and lint them again whenever they change.
+
+        After an initial lint, each batch of changed files is mapped to the
+        environments whose top-level chart it may affect, and only those
+        environments are linted again. The results of each lint and the time
+        it took are printed as soon as it finishes.
+
+        Parameters
+        ----------
+        environment
+            If given, lint and watch only the specified environment.
+        changes
+            Batches of changed files, normally from a
+            `~phalanx.storage.watch.FileWatcher`. Returns when this is
+            exhausted.
+        jobs
+            Number of environments to lint in parallel.
+        """
+        environments = [environment] if environment else None
+        self._lint_timed(
+            environments or self._config.list_environments(), jobs
+        )
+        for paths in changes:
+            self._helm.forget_chart_digests()
+            affected = self._config.get_affected_environments(paths)
+            if environments:
+                affected = [e for e in affected if e in environments]
+            if affected:
+                self._lint_timed(affected, jobs)
+
     def template(self, environment_name: str) -> str:
         """Expand the templates of the top-level chart.
 
@@ -158,6 +268,136 @@ class EnvironmentService:
             environment.name, environment.app_of_apps_name
         )
 
+    def _build_install_graph(
+        self,
+        environment: Environment,
+        vault_credentials: VaultCredentials,
+        git_branch: str,
+        *,
+        checkpoint: InstallCheckpoint,
+    ) -> TaskGraph:
+        """Build the graph of installation steps.
+
+        Parameters
+        ----------
+        environment
+            The environment configuration object.
+        vault_credentials
+            Credentials to use for Vault access.
+        git_branch
+            The branch of the Git repository to use.
+        checkpoint
+            Record of completed installation steps.
+
+        Returns
+        -------
+        TaskGraph
+            Steps of the installation and their dependencies.
+        """
+        source = f"{self._config.get_git_url()}@{git_branch}"
+        vault_url = str(environment.vault_url)
+        argocd_password: Future[SecretStr] = Future()
+
+        def get_argocd_password() -> None:
+            vault = self._vault_storage.get_vault_client(
+                environment, credentials=vault_credentials
+            )
+            argocd_password.set_result(self._get_argocd_password(vault))
+
+        def install_app_of_apps() -> None:
+            self._install_app_of_apps(
+                environment, git_branch, argocd_password.result(), checkpoint
+            )
+
+        # Preparation that does not change the cluster.
+        graph = TaskGraph()
+        graph.add(
+            "argocd-password",
+            get_argocd_password,
+            title="Get Argo CD admin password",
+        )
+        graph.add(
+            "helm-repositories",
+            partial(
+                self._prepare_helm_repositories,
+                ["vault-secrets-operator", "argocd"],
+            ),
+            title="Prepare Helm repositories",
+        )
+        for application in ("vault-secrets-operator", "argocd"):
+            graph.add(
+                f"chart-{application}",
+                partial(self._helm.dependency_update, application, quiet=True),
+                after=["helm-repositories"],
+                title=f"Prepare {application} chart",
+            )
+
+        # Bootstrap Argo CD.
+        graph.add(
+            "vault-secrets-operator",
+            partial(
+                self._install_vault_secrets_operator,
+                environment,
+                vault_credentials,
+                vault_url,
+                checkpoint,
+            ),
+            after=["argocd-password", "chart-vault-secrets-operator"],
+            title="Install vault-secrets-operator",
+        )
+        graph.add(
+            "argocd",
+            partial(self._install_argocd, environment, checkpoint),
+            after=["vault-secrets-operator", "chart-argocd"],
+            title="Install Argo CD",
+        )
+        graph.add(
+            "app-of-apps",
+            install_app_of_apps,
+            after=["argocd"],
+            title=f"Install {environment.app_of_apps_name} app-of-apps",
+        )
+
+        # Sync applications through Argo CD.
+        graph.add(
+            "sync-argocd",
+            partial(self._sync_argocd, checkpoint, source),
+            after=["app-of-apps"],
+            title="Sync Argo CD",
+        )
+        infrastructure = [
+            a
+            for a in INFRASTRUCTURE_APPLICATIONS
+            if a in environment.applications
+        ]
+        for application in infrastructure:
+            dependencies = INFRASTRUCTURE_APPLICATIONS[application]
+            graph.add(
+                f"sync-{application}",
+                partial(
+                    self._sync_infrastructure_application,
+                    application,
+                    checkpoint,
+                    source,
+                ),
+                after=[
+                    "sync-argocd",
+                    *(
+                        f"sync-{a}"
+                        for a in dependencies
+                        if a in infrastructure
+                    ),
+                ],
+                title=f"Sync {application}",
+            )
+        graph.add(
+            "sync-remaining",
+            partial(self._sync_remaining_applications, environment),
+            after=["sync-argocd", *(f"sync-{a}" for a in infrastructure)],
+            title="Sync remaining applications",
+        )
+        return graph
+
     @staticmethod
     def _get_argocd_password(vault: VaultClient) -> SecretStr:
         """Retrieve the Argo CD admin password from Vault.
@@ -191,6 +431,7 @@ class EnvironmentService:
         environment: Environment,
         vault_credentials: VaultCredentials,
         vault_url: str,
+        checkpoint: InstallCheckpoint,
     ) -> None:
         """Install the vault-secrets-operator application.
 
@@ -205,8 +446,13 @@ class EnvironmentService:
             Credentials to use for Vault access.
         vault_url
             URL of the Vault server.
+        checkpoint
+            Record of completed installation steps.
         """
-        with action_group("Install vault-secrets-operator"):
+        values = {"vault-secrets-operator.vault.address": vault_url}
+        secret = vault_credentials.to_kubernetes_secret("vault-credentials")
+
+        def install() -> None:
             self._kubernetes.create_namespace(
                 "vault-secrets-operator", ignore_fail=True
             )
@@ -215,34 +461,60 @@ class EnvironmentService:
                 "vault-secrets-operator",
                 vault_credentials,
             )
-            self._helm.dependency_update("vault-secrets-operator")
             self._helm.upgrade_application(
+                "vault-secrets-operator", environment.name, values
+            )
+
+        self._run_step(
+            checkpoint,
+            "vault-secrets-operator",
+            install,
+            key=hashlib.sha256(secret.encode()).hexdigest(),
+            is_done=partial(
+                self._helm.is_release_current,
                 "vault-secrets-operator",
                 environment.name,
-                {"vault-secrets-operator.vault.address": vault_url},
-            )
+                values,
+            ),
+        )
 
-    def _install_argocd(self, environment: Environment) -> None:
+    def _install_argocd(
+        self, environment: Environment, checkpoint: InstallCheckpoint
+    ) -> None:
         """Install the Argo CD application.
 
         Parameters
         ----------
         environment
             The environment configuration object.
+        checkpoint
+            Record of completed installation steps.
         """
-        with action_group("Install Argo CD"):
-            self._helm.dependency_update("argocd")
-            self._helm.upgrade_application(
+        values = {"global.vaultSecretsPath": environment.vault_path_prefix}
+        self._run_step(
+            checkpoint,
+            "argocd",
+            partial(
+                self._helm.upgrade_application,
                 "argocd",
                 environment.name,
-                {"global.vaultSecretsPath": environment.vault_path_prefix},
-            )
+                values,
+            ),
+            key="",
+            is_done=partial(
+                self._helm.is_release_current,
+                "argocd",
+                environment.name,
+                values,
+            ),
+        )
 
     def _install_app_of_apps(
         self,
         environment: Environment,
         git_branch: str,
         argocd_password: SecretStr,
+        checkpoint: InstallCheckpoint,
     ) -> None:
         """Create and sync the top-level Argo CD application.
 
@@ -254,56 +526,162 @@ class EnvironmentService:
             The branch of the Git repository to use.
         argocd_password
             The plain-text Argo CD admin password.
+        checkpoint
+            Record of completed installation steps.
         """
         app_of_apps = environment.app_of_apps_name
         if not app_of_apps:
             raise ValueError(f"appOfAppsName not set for {environment.name}")
-        with action_group(f"Install {app_of_apps} app-of-apps"):
-            self._argocd.login("admin", argocd_password)
+        git_url = self._config.get_git_url()
+
+        def install() -> None:
             self._argocd.create_environment(
                 environment.name,
                 app_of_apps,
-                git_url=self._config.get_git_url(),
+                git_url=git_url,
                 git_branch=git_branch,
             )
             self._argocd.sync(app_of_apps)
             project = Project.infrastructure
             self._argocd.set_project(app_of_apps, project)
 
-    def _sync_argocd(self) -> None:
+        self._argocd.login("admin", argocd_password)
+        self._run_step(
+            checkpoint,
+            "app-of-apps",
+            install,
+            key=f"{git_url}@{git_branch}",
+            is_done=partial(self._argocd.is_synced, app_of_apps),
+        )
+
+    def _report_rollout(self, name: str, status: str) -> None:
+        """Report progress of a Kubernetes rollout.
+
+        Parameters
+        ----------
+        name
+            Name of the rollout.
+        status
+            Description of its status.
+        """
+        print(f"{name}: {status}", flush=True)
+
+    def _report_step_finished(self, result: TaskResult) -> None:
+        """Print the captured output and status of an installation step.
+
+        Called from the main thread as each step finishes, so that the output
+        of steps that ran concurrently is not interleaved and each is in its
+        own GitHub Actions group.
+
+        Parameters
+        ----------
+        result
+            Result of the step.
+        """
+        with action_group(result.task.title):
+            sys.stdout.write(result.output)
+            print(f"{result.task.title}: {result.status}", flush=True)
+
+    def _report_step_started(self, task: Task) -> None:
+        """Report that an installation step has started.
+
+        Called from the main thread, outside of any GitHub Actions group.
+
+        Parameters
+        ----------
+        task
+            Step that started.
+        """
+        print(f"{task.title}: Started", flush=True)
+
+    def _run_step(
+        self,
+        checkpoint: InstallCheckpoint,
+        step: str,
+        run: Callable[[], None],
+        *,
+        key: str,
+        is_done: Callable[[], bool],
+    ) -> None:
+        """Run an installation step unless it was already completed.
+
+        Parameters
+        ----------
+        checkpoint
+            Record of completed installation steps.
+        step
+            Name of the step.
+        run
+            Function that performs the step.
+        key
+            Description of the inputs to the step. The step is only skipped if
+            a previous installation completed it with the same key.
+        is_done
+            Function that checks whether the result of the step can still be
+            seen in the cluster. The step is only skipped if this returns
+            `True`.
+        """
+        if checkpoint.get(step) == key and is_done():
+            print(f"Skipping {step}, already completed", flush=True)
+            return
+        run()
+        checkpoint.record(step, key)
+
+    def _sync_argocd(self, checkpoint: InstallCheckpoint, key: str) -> None:
         """Sync the Argo CD application.
 
         Sync and wait for it to finish syncing so that the pods don't restart
         in the middle of proxying another Argo CD operation.
+
+        Parameters
+        ----------
+        checkpoint
+            Record of completed installation steps.
+        key
+            Description of the source of the Argo CD applications.
         """
-        with action_group("Sync Argo CD"):
+
+        def sync() -> None:
             self._argocd.sync("argocd")
-            for deployment in (
-                "deployment/argocd-server",
-                "deployment/argocd-repo-server",
-                "statefulset/argocd-application-controller",
-            ):
-                self._kubernetes.wait_for_rollout(deployment, "argocd")
-
-    def _sync_infrastructure_applications(
-        self, environment: Environment
+            self._kubernetes.wait_for_rollouts(
+                [
+                    "deployment/argocd-server",
+                    "deployment/argocd-repo-server",
+                    "statefulset/argocd-application-controller",
+                ],
+                "argocd",
+                progress=self._report_rollout,
+            )
+
+        self._run_step(
+            checkpoint,
+            "sync-argocd",
+            sync,
+            key=key,
+            is_done=partial(self._argocd.is_synced, "argocd"),
+        )
+
+    def _sync_infrastructure_application(
+        self, application: str, checkpoint: InstallCheckpoint, key: str
     ) -> None:
-        """Sync infrastructure applications that other applications depend on.
+        """Sync an infrastructure application that others depend on.
 
         Parameters
         ----------
-        environment
-            The environment configuration object.
+        application
+            Name of the application.
+        checkpoint
+            Record of completed installation steps.
+        key
+            Description of the source of the Argo CD applications.
         """
-        with action_group("Sync infrastructure applications"):
-            for application in (
-                "ingress-nginx",
-                "cert-manager",
-                "postgres",
-                "gafaelfawr",
-            ):
-                if application in environment.applications:
-                    self._argocd.sync(application)
+        self._run_step(
+            checkpoint,
+            f"sync-{application}",
+            partial(self._argocd.sync, application),
+            key=key,
+            is_done=partial(self._argocd.is_synced, application),
+        )
 
     def _sync_remaining_applications(self, environment: Environment) -> None:
         """Sync remaining applications that were not already synced.
@@ -316,24 +694,53 @@ class EnvironmentService:
         app_of_apps = environment.app_of_apps_name
         if not app_of_apps:
             raise ValueError(f"appOfAppsName not set for {environment.name}")
-        with action_group("Sync remaining applications"):
-            self._argocd.sync_all(app_of_apps, timeout=timedelta(minutes=5))
+        self._argocd.sync_all(app_of_apps, timeout=timedelta(minutes=5))
+
+    def _lint_timed(self, environments: list[str], jobs: int) -> bool:
+        """Lint environments, reporting results as each lint finishes.
+
+        Parameters
+        ----------
+        environments
+            Environments to lint.
+        jobs
+            Number of environments to lint in parallel.
+
+        Returns
+        -------
+        bool
+            Whether linting passed.
+        """
+
+        def lint(environment: str) -> tuple[HelmLintResult, timedelta]:
+            start = time.monotonic()
+            result = self._helm.capture_lint_environment(environment)
+            return result, timedelta(seconds=time.monotonic() - start)
+
+        success = True
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(lint, e) for e in environments]
+            for future in as_completed(futures):
+                result, elapsed = future.result()
+                self._helm.print_lint_result(result, elapsed=elapsed)
+                success &= result.success
+        return success
 
-    def _update_helm_dependencies(self, app_names: list[str]) -> None:
-        """Update Helm dependencies for the specified applications.
+    def _prepare_helm_repositories(self, app_names: list[str]) -> None:
+        """Prepare the Helm repositories for the specified applications.
 
         Parameters
         ----------
         app_names
-            List of application names whose dependencies should be updated.
+            List of application names whose dependency repositories should be
+            prepared.
         """
         # Add the dependency repositories of the applications we're installing
-        # directly with Helm, and refresh the Helm dependency cache.
-        with action_group("Update Helm dependencies"):
-            repo_urls = set()
-            for app_name in app_names:
-                app_urls = self._config.get_dependency_repositories(app_name)
-                repo_urls.update(app_urls)
-            for url in sorted(repo_urls):
-                self._helm.repo_add(url)
-            self._helm.repo_update()
+        # directly with Helm, and refresh any out-of-date indices.
+        repo_urls = set()
+        for app_name in app_names:
+            if self._helm.is_mirrored(app_name):
+                continue
+            app_urls = self._config.get_dependency_repositories(app_name)
+            repo_urls.update(app_urls)
+        self._helm.prepare_repositories(repo_urls)
@@ -6,6 +6,15 @@ import binascii
 import os
 from base64 import b64decode
 from collections import defaultdict
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import nullcontext
 from dataclasses import dataclass, field
 
 import yaml
@@ -25,6 +34,8 @@ from ..models.secrets import (
     PullSecret,
     ResolvedSecrets,
     Secret,
+    SecretGenerateRules,
+    SecretGenerateType,
     SourceSecretGenerateRules,
     StaticSecret,
     StaticSecrets,
@@ -40,6 +51,38 @@ __all__ = [
     "SecretsService",
 ]
 
+_SLOW_GENERATE_TYPES = {
+    SecretGenerateType.bcrypt_password_hash,
+    SecretGenerateType.rsa_private_key,
+}
+"""Types of generated secrets that are slow enough to generate in parallel."""
+
+
+def _generate_secret(
+    rules: SecretGenerateRules, source: SecretStr | None
+) -> SecretStr:
+    """Generate a secret.
+
+    This is a separate function so that it can be run in a process pool.
+
+    Parameters
+    ----------
+    rules
+        Rules for generating the secret.
+    source
+        Value of the secret it is generated from, if any.
+
+    Returns
+    -------
+    SecretStr
+        Generated secret.
+    """
+    if isinstance(rules, SourceSecretGenerateRules):
+        if not source:
+            raise ValueError("Source secret for generated secret not set")
+        return rules.generate(source)
+    return rules.generate()
+
 
 @dataclass
 class SecretsAuditReport:
@@ -74,6 +117,78 @@ class SecretsAuditReport:
         return report
 
 
+@dataclass
+class _VaultWrite:
+    """Planned write of the secret for one application to Vault."""
+
+    values: dict[str, SecretStr] | None
+    """New secret keys and values, or `None` to delete the secret."""
+
+    patch: bool = False
+    """Whether to update only the given keys rather than replace the secret."""
+
+
+@dataclass
+class _VaultWritePlan:
+    """Planned changes to the secrets for an environment in Vault.
+
+    All changes to the secret for a given application are merged into a
+    single write so that each application's secret is written at most once.
+    """
+
+    writes: dict[str, _VaultWrite] = field(default_factory=dict)
+    """Writes to perform, keyed by application."""
+
+    report: list[tuple[str, str]] = field(default_factory=list)
+    """Application and line of the report of each change, in planned order."""
+
+    def create(self, application: str, values: dict[str, SecretStr]) -> None:
+        """Plan creation of the secret for an application."""
+        self.writes[application] = _VaultWrite(values)
+        self._report(application, f"Created Vault secret for {application}")
+
+    def delete(self, application: str) -> None:
+        """Plan deletion of the secret for an application."""
+        self.writes[application] = _VaultWrite(None)
+        self._report(application, f"Deleted Vault secret for {application}")
+
+    def delete_keys(
+        self,
+        application: str,
+        current: dict[str, SecretStr],
+        keys: set[str],
+    ) -> None:
+        """Plan deletion of some keys of the secret for an application."""
+        values = current.copy()
+        if write := self.writes.get(application):
+            values.update(write.values or {})
+        for key in keys:
+            del values[key]
+        self.writes[application] = _VaultWrite(values)
+        for key in sorted(keys):
+            line = f"Deleted Vault secret for {application} {key}"
+            self._report(application, line)
+
+    def replace(self, application: str, values: dict[str, SecretStr]) -> None:
+        """Plan replacement of the secret for an application."""
+        self.writes[application] = _VaultWrite(values)
+        self._report(application, f"Updated Vault secret for {application}")
+
+    def update(self, application: str, key: str, value: SecretStr) -> None:
+        """Plan an update to one key of the secret for an application."""
+        write = self.writes.get(application)
+        if write and write.values is not None:
+            write.values[key] = value
+        else:
+            self.writes[application] = _VaultWrite({key: value}, patch=True)
+        line = f"Updated Vault secret for {application} {key}"
+        self._report(application, line)
+
+    def _report(self, application: str, line: str) -> None:
+        """Add a line to the report of changes to an application's secret."""
+        self.report.append((application, line))
+
+
 class SecretsService:
     """Service to manipulate Phalanx secrets.
 
@@ -147,7 +262,16 @@ class SecretsService:
                 static_secrets=static_secrets,
             )
         except UnresolvedSecretsError as e:
-            return "Unresolved secrets:\n• " + "\n• ".join(e.secrets) + "\n"
+            text = "Unresolved secrets:\n• " + "\n• ".join(e.secrets) + "\n"
+            if e.missing:
+                heading = "Missing sources of secrets:"
+                missing = (f"{s} (for {k})" for k, s in e.missing.items())
+                text += f"\n{heading}\n• " + "\n• ".join(missing) + "\n"
+            if e.cycles:
+                cycles = (" -> ".join(c) for c in e.cycles)
+                heading = "Dependency cycles:"
+                text += f"\n{heading}\n• " + "\n• ".join(cycles) + "\n"
+            return text
 
         # Compare the resolved secrets to the Vault data.
         report = self._audit_secrets(
@@ -282,26 +406,27 @@ class SecretsService:
             regenerate=regenerate,
         )
 
-        # Replace any Vault secrets that are incorrect. If there are no static
-        # secrets, tell _clean_vault_secrets that we have a pull secret to
-        # ensure that it doesn't delete any pull secret stored directly in
-        # Vault.
-        self._sync_application_secrets(vault_client, vault_secrets, resolved)
+        # Plan replacement of any Vault secrets that are incorrect. If there
+        # are no static secrets, tell _plan_vault_cleanup that we have a pull
+        # secret to ensure that it doesn't delete any pull secret stored
+        # directly in Vault.
+        plan = _VaultWritePlan()
+        self._plan_application_secrets(plan, vault_secrets, resolved)
         has_pull_secret = bool(not static_secrets)
         if resolved.pull_secret and resolved.pull_secret.registries:
             has_pull_secret = True
             pull_secret = resolved.pull_secret
-            self._sync_pull_secret(vault_client, vault_secrets, pull_secret)
+            self._plan_pull_secret(plan, vault_secrets, pull_secret)
 
         # Optionally delete any unrecognized Vault secrets.
         if delete:
-            self._clean_vault_secrets(
-                vault_client,
-                vault_secrets,
-                resolved,
-                has_pull_secret=has_pull_secret,
+            self._plan_vault_cleanup(
+                plan, vault_secrets, resolved, has_pull_secret=has_pull_secret
             )
 
+        # Make all of the changes and report them.
+        self._write_vault_secrets(vault_client, plan)
+
     def _audit_secrets(
         self,
         resolved: ResolvedSecrets,
@@ -364,43 +489,6 @@ class SecretsService:
             missing=missing, mismatch=mismatch, unknown=unknown
         )
 
-    def _clean_vault_secrets(
-        self,
-        vault_client: VaultClient,
-        vault_secrets: dict[str, dict[str, SecretStr]],
-        resolved: ResolvedSecrets,
-        *,
-        has_pull_secret: bool,
-    ) -> None:
-        """Delete any unrecognized Vault secrets.
-
-        Parameters
-        ----------
-        vault_client
-            Client for talking to Vault for this environment.
-        vault_secrets
-            Current secrets in Vault for this environment.
-        resolved
-            Resolved secrets for this environment.
-        has_pull_secret
-            Whether there should be a pull secret for this environment.
-        """
-        for application, values in sorted(vault_secrets.items()):
-            if application not in resolved.applications:
-                if application == "pull-secret" and has_pull_secret:
-                    continue
-                print("Deleted Vault secret for", application)
-                vault_client.delete_application_secret(application)
-                continue
-            expected = resolved.applications[application]
-            to_delete = set(values.keys()) - set(expected.keys())
-            if to_delete:
-                for key in to_delete:
-                    del values[key]
-                vault_client.store_application_secret(application, values)
-                for key in sorted(to_delete):
-                    print("Deleted Vault secret for", application, key)
-
     def _decode_base64_secret(
         self, application: str, key: str, value: SecretStr
     ) -> SecretStr:
@@ -484,6 +572,42 @@ class SecretsService:
                     )
         return result
 
+    def _get_secret_source(
+        self,
+        config: Secret,
+        current_value: SecretStr | None,
+        *,
+        regenerate: bool = False,
+    ) -> tuple[str, str] | None:
+        """Determine which other secret a secret depends on, if any.
+
+        Parameters
+        ----------
+        config
+            Configuration of the secret.
+        current_value
+            Current secret value in Vault, if known.
+        regenerate
+            Whether to regenerate any generated secrets.
+
+        Returns
+        -------
+        tuple of str or None
+            Application and key of the secret from which this secret is copied
+            or generated, or `None` if its value does not depend on another
+            secret.
+        """
+        if config.value:
+            return None
+        elif config.copy_rules:
+            return (config.copy_rules.application, config.copy_rules.key)
+        elif config.generate:
+            if current_value and not regenerate:
+                return None
+            elif isinstance(config.generate, SourceSecretGenerateRules):
+                return (config.application, config.generate.source)
+        return None
+
     def _get_vault_client(
         self,
         environment: EnvironmentBaseConfig,
@@ -520,6 +644,36 @@ class SecretsService:
             environment, credentials=credentials
         )
 
+    def _is_slow_to_generate(
+        self,
+        config: Secret,
+        current_value: SecretStr | None,
+        *,
+        regenerate: bool = False,
+    ) -> bool:
+        """Determine whether a secret will be generated slowly.
+
+        Parameters
+        ----------
+        config
+            Configuration of the secret.
+        current_value
+            Current secret value in Vault, if known.
+        regenerate
+            Whether to regenerate any generated secrets.
+
+        Returns
+        -------
+        bool
+            `True` if a new value for the secret will be generated and that
+            generation is slow, `False` otherwise.
+        """
+        if config.value or config.copy_rules or not config.generate:
+            return False
+        if current_value and not regenerate:
+            return False
+        return config.generate.type in _SLOW_GENERATE_TYPES
+
     def _resolve_secrets(
         self,
         *,
@@ -561,33 +715,48 @@ class SecretsService:
         """
         if not static_secrets:
             static_secrets = StaticSecrets()
+
+        # Build the dependency graph of the secrets. Each secret depends on at
+        # most one other secret: the one it is copied from or, if it will be
+        # generated, the source of its generated value.
+        configs = {(s.application, s.key): s for s in secrets}
+        sources = {}
+        for node, config in configs.items():
+            vault_values = vault_secrets.get(config.application, {})
+            source = self._get_secret_source(
+                config, vault_values.get(config.key), regenerate=regenerate
+            )
+            if source:
+                sources[node] = source
+
+        # Determine the order in which to resolve the secrets, finding any
+        # missing sources and dependency cycles along the way.
+        order, missing, cycles = self._sort_secrets(list(configs), sources)
+
+        # Resolve the secrets in dependency order. If a secret cannot be
+        # resolved, any secret that depends on it will also fail.
+        values = self._resolve_sorted_secrets(
+            order,
+            configs,
+            sources,
+            vault_secrets=vault_secrets,
+            static_secrets=static_secrets,
+            regenerate=regenerate,
+        )
+
+        # Put the resolved secrets in dependency order so that reports of
+        # changes are stable.
         resolved: defaultdict[str, dict[str, SecretStr]] = defaultdict(dict)
-        unresolved = list(secrets)
-        left = len(unresolved)
-        while unresolved:
-            secrets = unresolved
-            unresolved = []
-            for config in secrets:
-                app_name = config.application
-                vault_values = vault_secrets.get(app_name, {})
-                static_values = static_secrets.for_application(app_name)
-                static_value = None
-                if config.key in static_values:
-                    static_value = static_values[config.key].value
-                secret = self._resolve_secret(
-                    config=config,
-                    resolved=resolved,
-                    current_value=vault_values.get(config.key),
-                    static_value=static_value,
-                    regenerate=regenerate,
-                )
-                if secret:
-                    resolved[config.application][config.key] = secret
-                else:
-                    unresolved.append(config)
-            if len(unresolved) >= left:
-                raise UnresolvedSecretsError(unresolved)
-            left = len(unresolved)
+        for app_name, key in order:
+            if key in values.get(app_name, {}):
+                resolved[app_name][key] = values[app_name][key]
+        unresolved = [
+            c for c in secrets if c.key not in resolved.get(c.application, {})
+        ]
+        if unresolved:
+            raise UnresolvedSecretsError(
+                unresolved, missing=missing, cycles=cycles
+            )
         return ResolvedSecrets(
             applications=resolved, pull_secret=static_secrets.pull_secret
         )
@@ -657,21 +826,230 @@ class SecretsService:
         # Return the resolved secret.
         return value
 
-    def _sync_application_secrets(
+    def _resolve_sorted_secrets(
         self,
-        vault_client: VaultClient,
+        order: list[tuple[str, str]],
+        configs: dict[tuple[str, str], Secret],
+        sources: dict[tuple[str, str], tuple[str, str]],
+        *,
+        vault_secrets: dict[str, dict[str, SecretStr]],
+        static_secrets: StaticSecrets,
+        regenerate: bool = False,
+    ) -> dict[str, dict[str, SecretStr]]:
+        """Resolve secrets that have been sorted in dependency order.
+
+        Secrets that are slow to generate are generated in a process pool if
+        there is more than one of them. Secrets that depend on them are
+        deferred until their values are available.
+
+        Parameters
+        ----------
+        order
+            Secrets to resolve, in dependency order.
+        configs
+            Configuration of each secret.
+        sources
+            Mapping of secrets to the secret they depend on.
+        vault_secrets
+            Current values from Vault.
+        static_secrets
+            User-provided static secrets.
+        regenerate
+            Whether to regenerate any generated secrets.
+
+        Returns
+        -------
+        dict of dict
+            Resolved secrets by application and key. Secrets that could not
+            be resolved are omitted.
+        """
+        values: defaultdict[str, dict[str, SecretStr]] = defaultdict(dict)
+        slow = {
+            n
+            for n in order
+            if self._is_slow_to_generate(
+                configs[n],
+                vault_secrets.get(n[0], {}).get(n[1]),
+                regenerate=regenerate,
+            )
+        }
+        pending: dict[tuple[str, str], Future[SecretStr]] = {}
+        pool = None
+        if len(slow) > 1:
+            workers = min(len(slow), os.cpu_count() or 1)
+            pool = ProcessPoolExecutor(max_workers=workers)
+        with pool or nullcontext():
+            waiting = order
+            while waiting:
+                # A modification time should not predate the password hash
+                # generated from the same source, so also defer it until that
+                # hash is available.
+                deferred = []
+                for node in waiting:
+                    config = configs[node]
+                    app_name = config.application
+                    static_values = static_secrets.for_application(app_name)
+                    static = static_values.get(config.key)
+                    is_mtime = bool(
+                        config.generate
+                        and config.generate.type == SecretGenerateType.mtime
+                    )
+                    source = sources.get(node)
+                    if source in pending or (
+                        is_mtime
+                        and any(sources.get(n) == source for n in pending)
+                    ):
+                        deferred.append(node)
+                    elif pool and node in slow:
+                        future = self._submit_generate_secret(
+                            pool, config, source, values
+                        )
+                        if future:
+                            pending[node] = future
+                    elif secret := self._resolve_secret(
+                        config=config,
+                        resolved=values,
+                        current_value=vault_secrets.get(app_name, {}).get(
+                            config.key
+                        ),
+                        static_value=static.value if static else None,
+                        regenerate=regenerate,
+                    ):
+                        values[app_name][config.key] = secret
+
+                # Wait for at least one pending secret if other secrets are
+                # waiting for it, and otherwise for all of them.
+                when = FIRST_COMPLETED if deferred else ALL_COMPLETED
+                done, _ = wait(pending.values(), return_when=when)
+                for node, future in list(pending.items()):
+                    if future in done:
+                        values[node[0]][node[1]] = future.result()
+                        del pending[node]
+                waiting = deferred
+        return values
+
+    def _submit_generate_secret(
+        self,
+        pool: ProcessPoolExecutor,
+        config: Secret,
+        source: tuple[str, str] | None,
+        resolved: dict[str, dict[str, SecretStr]],
+    ) -> Future[SecretStr] | None:
+        """Start generating a secret in a process pool.
+
+        Parameters
+        ----------
+        pool
+            Process pool in which to generate the secret.
+        config
+            Configuration of the secret, which must have generate rules.
+        source
+            Application and key of the secret it is generated from, if any.
+        resolved
+            Other secrets for that environment that have already been
+            resolved.
+
+        Returns
+        -------
+        concurrent.futures.Future or None
+            Future for the generated secret, or `None` if the secret cannot be
+            generated because its source could not be resolved.
+        """
+        if not config.generate:
+            raise ValueError(
+                f"{config.application}/{config.key} not generated"
+            )
+        source_value = None
+        if source:
+            source_value = resolved.get(source[0], {}).get(source[1])
+            if not source_value:
+                return None
+        return pool.submit(_generate_secret, config.generate, source_value)
+
+    def _sort_secrets(
+        self,
+        nodes: list[tuple[str, str]],
+        sources: dict[tuple[str, str], tuple[str, str]],
+    ) -> tuple[list[tuple[str, str]], dict[str, str], list[list[str]]]:
+        """Sort secrets so that every secret follows the one it depends on.
+
+        Secrets that do not depend on another secret, or that depend on a
+        secret that appears earlier in the configuration, keep their relative
+        order. A secret that depends on a secret appearing later in the
+        configuration is moved after all secrets that precede that one.
+
+        Parameters
+        ----------
+        nodes
+            Application and key of every secret, in configuration order.
+        sources
+            Mapping of secrets to the secret they depend on.
+
+        Returns
+        -------
+        tuple
+            Three-item tuple of the sorted secrets, excluding those that can
+            never be resolved; a mapping of secrets to missing sources, using
+            the ``application/key`` form; and a list of dependency cycles,
+            each a list of secrets in ``application/key`` form.
+        """
+        index = {n: i for i, n in enumerate(nodes)}
+        depth: dict[tuple[str, str], int] = {}
+        blocked: set[tuple[str, str]] = set()
+        missing: dict[str, str] = {}
+        cycles: list[list[str]] = []
+
+        # Walk the chain of dependencies from each secret until reaching a
+        # secret that has already been analyzed or that has no dependencies,
+        # noting missing sources and cycles, and then assign depths back down
+        # the chain. The depth of a secret is the number of times its chain of
+        # dependencies refers forward in the configuration.
+        for start in nodes:
+            chain: list[tuple[str, str]] = []
+            node: tuple[str, str] | None = start
+            while node and node not in depth and node not in blocked:
+                if node in chain:
+                    cycle = chain[chain.index(node) :]
+                    blocked.update(cycle)
+                    cycles.append(["/".join(n) for n in [*cycle, node]])
+                    break
+                chain.append(node)
+                node = sources.get(node)
+                if node and node not in index:
+                    missing["/".join(chain[-1])] = "/".join(node)
+                    blocked.add(chain.pop())
+                    break
+            for node in reversed(chain):
+                if node in blocked:
+                    continue
+                source = sources.get(node)
+                if not source:
+                    depth[node] = 0
+                elif source in depth:
+                    forward = index[source] > index[node]
+                    depth[node] = depth[source] + int(forward)
+                else:
+                    blocked.add(node)
+
+        # Return the results.
+        order = sorted(depth, key=lambda n: (depth[n], index[n]))
+        return order, missing, cycles
+
+    def _plan_application_secrets(
+        self,
+        plan: _VaultWritePlan,
         vault_secrets: dict[str, dict[str, SecretStr]],
         resolved: ResolvedSecrets,
     ) -> None:
-        """Sync the application secrets for an environment to Vault.
+        """Plan the sync of the application secrets for an environment.
 
-        Changes made to Vault will be reported to standard output. This will
-        not delete any stray secrets in Vault, only add any missing ones.
+        This will not delete any stray secrets in Vault, only add any missing
+        ones and correct any incorrect ones.
 
         Parameters
         ----------
-        vault_client
-            Client for talking to Vault for this environment.
+        plan
+            Plan of changes to Vault, which will be updated.
         vault_secrets
             Current secrets in Vault for this environment.
         resolved
@@ -679,29 +1057,25 @@ class SecretsService:
         """
         for application, values in resolved.applications.items():
             if application not in vault_secrets:
-                vault_client.store_application_secret(application, values)
-                print("Created Vault secret for", application)
+                plan.create(application, values)
                 continue
             vault_app_secrets = vault_secrets[application]
             for key, secret in values.items():
                 if secret != vault_app_secrets.get(key):
-                    vault_client.update_application_secret(
-                        application, key, secret
-                    )
-                    print("Updated Vault secret for", application, key)
+                    plan.update(application, key, secret)
 
-    def _sync_pull_secret(
+    def _plan_pull_secret(
         self,
-        vault_client: VaultClient,
+        plan: _VaultWritePlan,
         vault_secrets: dict[str, dict[str, SecretStr]],
         pull_secret: PullSecret,
     ) -> None:
-        """Sync the pull secret for an environment to Vault.
+        """Plan the sync of the pull secret for an environment.
 
         Parameters
         ----------
-        vault_client
-            Client for talking to Vault for this environment.
+        plan
+            Plan of changes to Vault, which will be updated.
         vault_secrets
             Current secrets in Vault for this environment.
         pull_secret
@@ -710,8 +1084,88 @@ class SecretsService:
         value = SecretStr(pull_secret.to_dockerconfigjson())
         secret = {".dockerconfigjson": value}
         if "pull-secret" not in vault_secrets:
-            vault_client.store_application_secret("pull-secret", secret)
-            print("Created Vault secret for pull-secret")
+            plan.create("pull-secret", secret)
         elif secret != vault_secrets["pull-secret"]:
-            vault_client.store_application_secret("pull-secret", secret)
-            print("Updated Vault secret for pull-secret")
+            plan.replace("pull-secret", secret)
+
+    def _plan_vault_cleanup(
+        self,
+        plan: _VaultWritePlan,
+        vault_secrets: dict[str, dict[str, SecretStr]],
+        resolved: ResolvedSecrets,
+        *,
+        has_pull_secret: bool,
+    ) -> None:
+        """Plan deletion of any unrecognized Vault secrets.
+
+        Parameters
+        ----------
+        plan
+            Plan of changes to Vault, which will be updated.
+        vault_secrets
+            Current secrets in Vault for this environment.
+        resolved
+            Resolved secrets for this environment.
+        has_pull_secret
+            Whether there should be a pull secret for this environment.
+        """
+        for application, values in sorted(vault_secrets.items()):
+            if application not in resolved.applications:
+                if application == "pull-secret" and has_pull_secret:
+                    continue
+                plan.delete(application)
+                continue
+            expected = resolved.applications[application]
+            to_delete = set(values.keys()) - set(expected.keys())
+            if to_delete:
+                plan.delete_keys(application, values, to_delete)
+
+    def _write_vault_secrets(
+        self, vault_client: VaultClient, plan: _VaultWritePlan
+    ) -> None:
+        """Make the planned changes to Vault and report them.
+
+        Each application's secret is written with a single request, and the
+        requests for different applications are made concurrently up to the
+        concurrency limit of the Vault client. The changes are reported in
+        the order they were planned once all writes finish. If any write
+        fails, the changes that were made are still reported before the
+        exception is raised.
+
+        Parameters
+        ----------
+        vault_client
+            Client for talking to Vault for this environment.
+        plan
+            Planned changes to Vault.
+        """
+        written: set[str] = set()
+
+        def write(application: str) -> None:
+            values = plan.writes[application].values
+            if values is None:
+                vault_client.delete_application_secret(application)
+            elif plan.writes[application].patch:
+                vault_client.update_application_secret(application, values)
+            else:
+                vault_client.store_application_secret(application, values)
+            written.add(application)
+
+        # Unlike Executor.map, a failed write does not cancel the writes that
+        # have not started yet, and leaving the executor waits for all of
+        # them, so the report covers every change that was made.
+        applications = sorted(plan.writes.keys())
+        workers = min(vault_client.concurrency, len(applications))
+        try:
+            if workers <= 1:
+                for application in applications:
+                    write(application)
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    futures = [pool.submit(write, a) for a in applications]
+                    for future in futures:
+                        future.result()
+        finally:
+            for application, line in plan.report:
+                if application in written:
+                    print(line)
@@ -2,26 +2,83 @@
 
 from __future__ import annotations
 
+import json
+import re
+import subprocess
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from functools import partial
+from threading import Lock, Thread
+from typing import Any
 
+import httpx
 from pydantic import SecretStr
 
-from ..exceptions import CommandFailedError
+from ..constants import (
+    ARGOCD_POLL_INTERVAL,
+    ARGOCD_RECONNECT_DELAY,
+    ARGOCD_RECONNECT_TIMEOUT,
+)
+from ..exceptions import ArgoCDError
 from ..models.applications import Project
 from .command import Command
 
 __all__ = ["ArgoCDStorage"]
 
+_PORT_FORWARD_REGEX = re.compile(r"Forwarding from 127\.0\.0\.1:(?P<port>\d+)")
+"""Regex matching the line in which kubectl reports the forwarded port."""
+
+_RECONNECT_INITIAL_DELAY = 0.1
+"""Delay in seconds before the first attempt to reconnect to Argo CD."""
+
 
 class ArgoCDStorage:
     """Interface to Argo CD operations.
 
-    Calls the :command:`argocd` command-line client. Used primarily by the
-    installer.
+    Talks to the Argo CD REST API. Used primarily by the installer, which
+    normally cannot yet reach Argo CD through an ingress. Unless a URL is
+    given, `login` therefore starts a single :command:`kubectl port-forward`
+    to the Argo CD server, which is reused for every later operation until
+    `close` is called. All requests share the connection pool of a single
+    HTTP client, so the storage may be used from multiple threads.
+
+    If the connection breaks, such as when Argo CD syncs itself and replaces
+    the server pod, the connection and any port forward are discarded. Each
+    later request then reconnects and logs in again with the same
+    credentials, retrying with backoff until Argo CD can be reached again or
+    the deadline of the operation passes.
+
+    Parameters
+    ----------
+    url
+        Base URL of the Argo CD server. If not given, the server is reached
+        through a port forward to the ``argocd-server`` service in the
+        ``argocd`` namespace, which must serve plain HTTP.
+    poll_interval
+        How often to check whether a sync has finished.
     """
 
-    def __init__(self) -> None:
-        self._argocd = Command("argocd")
+    def __init__(
+        self,
+        url: str | None = None,
+        *,
+        poll_interval: timedelta = ARGOCD_POLL_INTERVAL,
+    ) -> None:
+        self._url = url
+        self._poll_interval = poll_interval.total_seconds()
+        self._kubectl = Command("kubectl")
+        self._lock = Lock()
+        self._client: httpx.Client | None = None
+        self._credentials: tuple[str, SecretStr] | None = None
+        self._port_forward: subprocess.Popen[str] | None = None
+
+    def close(self) -> None:
+        """Close the connection to Argo CD and stop any port forward."""
+        with self._lock:
+            self._disconnect()
+            self._credentials = None
 
     def create_environment(
         self,
@@ -34,7 +91,7 @@ class ArgoCDStorage:
         """Manually create an Argo CD application.
 
         Used only by the installer for installing the app of apps to bootstrap
-        the environment.
+        the environment. If the application already exists, it is updated.
 
         Parameters
         ----------
@@ -50,43 +107,74 @@ class ArgoCDStorage:
 
         Raises
         ------
-        CommandFailedError
+        ArgoCDError
             Raised if Argo CD fails.
         """
-        self._argocd.run(
-            "app",
-            "create",
-            app_of_apps_name,
-            "--repo",
-            git_url,
-            "--path",
-            "environments",
-            "--dest-namespace",
-            "argocd",
-            "--dest-server",
-            "https://kubernetes.default.svc",
-            "--upsert",
-            "--revision",
-            git_branch,
-            "--helm-set",
-            f"repoUrl={git_url}",
-            "--helm-set",
-            f"targetRevision={git_branch}",
-            "--values",
-            "values.yaml",
-            "--values",
-            f"values-{environment}.yaml",
-            "--port-forward",
-            "--port-forward-namespace",
-            "argocd",
+        application = {
+            "metadata": {"name": app_of_apps_name},
+            "spec": {
+                "project": "default",
+                "source": {
+                    "repoURL": git_url,
+                    "path": "environments",
+                    "targetRevision": git_branch,
+                    "helm": {
+                        "parameters": [
+                            {"name": "repoUrl", "value": git_url},
+                            {"name": "targetRevision", "value": git_branch},
+                        ],
+                        "valueFiles": [
+                            "values.yaml",
+                            f"values-{environment}.yaml",
+                        ],
+                    },
+                },
+                "destination": {
+                    "namespace": "argocd",
+                    "server": "https://kubernetes.default.svc",
+                },
+            },
+        }
+        self._request(
+            "POST",
+            "/api/v1/applications",
+            params={"upsert": "true"},
+            json=application,
+        )
+
+    def is_synced(self, application: str) -> bool:
+        """Check whether an application is synced and healthy.
+
+        Parameters
+        ----------
+        application
+            Name of the application.
+
+        Returns
+        -------
+        bool
+            `True` if the application exists, has no sync in progress, is in
+            sync with its source, and is healthy. `False` otherwise,
+            including if Argo CD could not be asked.
+        """
+        path = f"/api/v1/applications/{application}"
+        try:
+            app = self._request("GET", path).json()
+        except ArgoCDError:
+            return False
+        status = app.get("status", {})
+        return (
+            not app.get("operation")
+            and status.get("sync", {}).get("status") == "Synced"
+            and status.get("health", {}).get("status") == "Healthy"
         )
 
     def login(self, username: str, password: SecretStr) -> None:
         """Authenticate to Argo CD.
 
-        Authenticates using username and password authentication with port
-        forwarding. This normally must be done before any other Argo CD
-        operations.
+        Opens the connection to Argo CD, starting the port forward if
+        needed, and creates a session. This must be done before any other
+        Argo CD operations.
 
         Parameters
         ----------
@@ -97,20 +185,13 @@ class ArgoCDStorage:
 
         Raises
         ------
-        CommandFailedError
-            Raised if Argo CD fails.
+        ArgoCDError
+            Raised if Argo CD cannot be reached or authentication fails.
         """
-        self._argocd.run(
-            "login",
-            "--plaintext",
-            "--username",
-            username,
-            "--password",
-            password.get_secret_value(),
-            "--port-forward",
-            "--port-forward-namespace",
-            "argocd",
-        )
+        with self._lock:
+            self._disconnect()
+            self._credentials = (username, password)
+            self._connect()
 
     def set_project(self, application: str, project: Project) -> None:
         """Set the Argo CD project of an application.
@@ -124,18 +205,18 @@ class ArgoCDStorage:
 
         Raises
         ------
-        CommandFailedError
+        ArgoCDError
             Raised if Argo CD fails.
         """
-        self._argocd.run(
-            "app",
-            "set",
-            application,
-            "--project",
-            project.value,
-            "--port-forward",
-            "--port-forward-namespace",
-            "argocd",
+        patch = {"spec": {"project": project.value}}
+        self._request(
+            "PATCH",
+            f"/api/v1/applications/{application}",
+            json={
+                "name": application,
+                "patch": json.dumps(patch),
+                "patchType": "merge",
+            },
         )
 
     def sync(
@@ -143,6 +224,8 @@ class ArgoCDStorage:
     ) -> None:
         """Sync a specific Argo CD application.
 
+        Waits for the sync to finish and the application to become healthy.
+
         Parameters
         ----------
         application
@@ -152,33 +235,18 @@ class ArgoCDStorage:
 
         Raises
         ------
-        CommandFailedError
-            Raised if Argo CD fails.
-        CommandTimedOutError
-            Raised if the command timed out. The timeout is also passed to
-            Argo CD as an option, so normally the command should fail and
-            raise `~phalanx.exceptions.CommandFailedError` instead. This
-            exception means the Argo CD timeout didn't work for some reason.
+        ArgoCDError
+            Raised if Argo CD fails or the sync did not complete within the
+            timeout.
         """
         # As of Argo CD 2.10.5, the first sync of Argo CD, cert-manager, and
         # Gafaelfawr always fails with a spurious error claiming the
         # infrastructure project had not been created. This is transient; the
-        # second execution succeeds. Therefore, on CommandFailedError, try
-        # running the same command again.
-        args = [
-            "app",
-            "sync",
-            application,
-            "--timeout",
-            str(int(timeout.total_seconds())),
-            "--port-forward",
-            "--port-forward-namespace",
-            "argocd",
-        ]
+        # second attempt succeeds. Therefore, on failure, try again.
         try:
-            self._argocd.run(*args)
-        except CommandFailedError:
-            self._argocd.run(*args)
+            self._sync(application, timeout)
+        except ArgoCDError:
+            self._sync(application, timeout)
 
     def sync_all(
         self,
@@ -188,6 +256,9 @@ class ArgoCDStorage:
     ) -> None:
         """Sync all Argo CD applications under an app of apps.
 
+        All of the syncs are started at once, and then all of them are waited
+        for together.
+
         Parameters
         ----------
         app_of_apps_name
@@ -197,22 +268,324 @@ class ArgoCDStorage:
 
         Raises
         ------
-        CommandFailedError
-            Raised if Argo CD fails.
-        CommandTimedOutError
-            Raised if the command timed out. The timeout is also passed to
-            Argo CD as an option, so normally the command should fail and
-            raise `~phalanx.exceptions.CommandFailedError` instead. This
-            exception means the Argo CD timeout didn't work for some reason.
+        ArgoCDError
+            Raised if Argo CD fails or the syncs did not complete within the
+            timeout.
+        """
+        deadline = time.monotonic() + timeout.total_seconds()
+        selector = f"argocd.argoproj.io/instance={app_of_apps_name}"
+        response = self._request(
+            "GET",
+            "/api/v1/applications",
+            deadline=deadline,
+            params={"selector": selector},
+        )
+        items = response.json().get("items") or []
+        applications = sorted(a["metadata"]["name"] for a in items)
+        if not applications:
+            return
+        with ThreadPoolExecutor(max_workers=len(applications)) as pool:
+            start = partial(self._start_sync, deadline=deadline)
+            list(pool.map(start, applications))
+        self._wait_for_sync(applications, timeout, deadline)
+
+    def _connect(self) -> httpx.Client:
+        """Open the connection to Argo CD and create a session.
+
+        Must be called with the lock held.
+
+        Returns
+        -------
+        httpx.Client
+            Client for the Argo CD API, which is also stored for later
+            requests.
+
+        Raises
+        ------
+        ArgoCDError
+            Raised if Argo CD cannot be reached or authentication fails.
+        """
+        if not self._credentials:
+            raise ArgoCDError("Not logged in to Argo CD")
+        url = self._url or self._start_port_forward()
+        client = httpx.Client(base_url=url, timeout=30)
+        username, password = self._credentials
+        credentials = {
+            "username": username,
+            "password": password.get_secret_value(),
+        }
+        try:
+            response = client.post("/api/v1/session", json=credentials)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            client.close()
+            self._disconnect()
+            raise ArgoCDError(f"Cannot log in to Argo CD: {e!s}") from e
+        token = response.json()["token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        self._client = client
+        return client
+
+    def _disconnect(self) -> None:
+        """Close the HTTP client and stop the port forward, if any.
+
+        Must be called with the lock held.
+        """
+        if self._client:
+            self._client.close()
+            self._client = None
+        if self._port_forward:
+            self._port_forward.terminate()
+            self._port_forward.wait()
+            self._port_forward = None
+
+    def _is_synced(self, application: dict[str, Any]) -> bool:
+        """Check whether the most recent sync of an application has finished.
+
+        Parameters
+        ----------
+        application
+            Argo CD application as returned by the API.
+
+        Returns
+        -------
+        bool
+            `True` if the sync succeeded and the application is healthy,
+            `False` if it is still in progress.
+
+        Raises
+        ------
+        ArgoCDError
+            Raised if the sync failed.
+        """
+        if application.get("operation"):
+            return False
+        status = application.get("status", {})
+        state = status.get("operationState", {})
+        phase = state.get("phase")
+        if phase in ("Error", "Failed"):
+            name = application["metadata"]["name"]
+            message = state.get("message", phase)
+            raise ArgoCDError(f"Sync of {name} failed: {message}")
+        health = status.get("health", {}).get("status")
+        return phase == "Succeeded" and health == "Healthy"
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        deadline: float | None = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Make a request to the Argo CD API.
+
+        If Argo CD cannot be reached, the request is retried with backoff,
+        reconnecting and logging in again each time, until it succeeds or the
+        deadline passes.
+
+        Parameters
+        ----------
+        method
+            HTTP method.
+        path
+            Path of the API route.
+        deadline
+            Time, as returned by `time.monotonic`, after which to stop
+            trying to reach Argo CD. Defaults to
+            `~phalanx.constants.ARGOCD_RECONNECT_TIMEOUT` from now.
+        **kwargs
+            Additional arguments to `httpx.Client.request`.
+
+        Returns
+        -------
+        httpx.Response
+            Successful response.
+
+        Raises
+        ------
+        ArgoCDError
+            Raised if not logged in, if Argo CD could not be reached before
+            the deadline, or if Argo CD returned an error.
         """
-        self._argocd.run(
-            "app",
-            "sync",
-            "-l",
-            f"argocd.argoproj.io/instance={app_of_apps_name}",
-            "--timeout",
-            str(int(timeout.total_seconds())),
-            "--port-forward",
-            "--port-forward-namespace",
+        if deadline is None:
+            timeout = ARGOCD_RECONNECT_TIMEOUT.total_seconds()
+            deadline = time.monotonic() + timeout
+        delay = _RECONNECT_INITIAL_DELAY
+        max_delay = ARGOCD_RECONNECT_DELAY.total_seconds()
+        while True:
+            try:
+                response = self._send(method, path, **kwargs)
+                break
+            except (ArgoCDError, httpx.TransportError) as e:
+                if not self._credentials:
+                    raise ArgoCDError("Not logged in to Argo CD") from e
+                if time.monotonic() + delay > deadline:
+                    if isinstance(e, ArgoCDError):
+                        raise
+                    raise ArgoCDError(f"Cannot reach Argo CD: {e!s}") from e
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+        if response.is_error:
+            try:
+                message = response.json().get("message", response.text)
+            except ValueError:
+                message = response.text
+            msg = (
+                f"{method} {path} failed with status {response.status_code}:"
+                f" {message}"
+            )
+            raise ArgoCDError(msg)
+        return response
+
+    def _send(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """Send a single request, connecting to Argo CD first if needed.
+
+        Parameters
+        ----------
+        method
+            HTTP method.
+        path
+            Path of the API route.
+        **kwargs
+            Additional arguments to `httpx.Client.request`.
+
+        Returns
+        -------
+        httpx.Response
+            Response, which may be an error.
+
+        Raises
+        ------
+        ArgoCDError
+            Raised if not logged in or if logging in again failed.
+        httpx.TransportError
+            Raised if Argo CD could not be reached. The connection is then
+            discarded so that the next request reconnects.
+        """
+        with self._lock:
+            if not self._credentials:
+                raise ArgoCDError("Not logged in to Argo CD")
+            client = self._client or self._connect()
+        try:
+            return client.request(method, path, **kwargs)
+        except httpx.TransportError:
+            with self._lock:
+                if self._client is client:
+                    self._disconnect()
+            raise
+
+    def _start_port_forward(self) -> str:
+        """Start a port forward to the Argo CD server.
+
+        Must be called with the lock held.
+
+        Returns
+        -------
+        str
+            Base URL through which the Argo CD server can be reached.
+
+        Raises
+        ------
+        ArgoCDError
+            Raised if the port forward could not be started.
+        """
+        process = self._kubectl.start(
+            "port-forward",
+            "--namespace",
             "argocd",
+            "service/argocd-server",
+            ":80",
+        )
+        stdout = process.stdout
+        match = (
+            _PORT_FORWARD_REGEX.match(stdout.readline()) if stdout else None
+        )
+        if not stdout or not match:
+            process.terminate()
+            process.wait()
+            raise ArgoCDError("Cannot start port forward to Argo CD")
+
+        # kubectl reports every forwarded connection on standard output, so
+        # keep reading it so that kubectl never blocks on a full pipe.
+        Thread(target=stdout.read, daemon=True).start()
+        self._port_forward = process
+        return f"http://127.0.0.1:{match.group('port')}"
+
+    def _start_sync(self, application: str, *, deadline: float) -> None:
+        """Ask Argo CD to sync an application without waiting for it.
+
+        Parameters
+        ----------
+        application
+            Name of the application.
+        deadline
+            Time, as returned by `time.monotonic`, after which to stop
+            trying to reach Argo CD.
+
+        Raises
+        ------
+        ArgoCDError
+            Raised if Argo CD fails.
+        """
+        path = f"/api/v1/applications/{application}/sync"
+        self._request(
+            "POST", path, deadline=deadline, json={"name": application}
         )
+
+    def _sync(self, application: str, timeout: timedelta) -> None:
+        """Sync an application once and wait for the sync to finish.
+
+        Parameters
+        ----------
+        application
+            Name of the application.
+        timeout
+            How long to wait for the sync to complete.
+
+        Raises
+        ------
+        ArgoCDError
+            Raised if Argo CD fails or the sync did not complete within the
+            timeout.
+        """
+        deadline = time.monotonic() + timeout.total_seconds()
+        self._start_sync(application, deadline=deadline)
+        self._wait_for_sync([application], timeout, deadline)
+
+    def _wait_for_sync(
+        self, applications: Iterable[str], timeout: timedelta, deadline: float
+    ) -> None:
+        """Wait for the syncs of some applications to finish.
+
+        Parameters
+        ----------
+        applications
+            Names of the applications.
+        timeout
+            How long the syncs were given to finish, for error messages.
+        deadline
+            Time, as returned by `time.monotonic`, by which the syncs must
+            finish.
+
+        Raises
+        ------
+        ArgoCDError
+            Raised if a sync failed or the syncs did not finish within the
+            timeout.
+        """
+        remaining = set(applications)
+        while True:
+            for application in sorted(remaining):
+                path = f"/api/v1/applications/{application}"
+                response = self._request("GET", path, deadline=deadline)
+                if self._is_synced(response.json()):
+                    remaining.remove(application)
+            if not remaining:
+                return
+            if time.monotonic() >= deadline:
+                names = ", ".join(sorted(remaining))
+                seconds = int(timeout.total_seconds())
+                msg = f"Sync of {names} did not finish within {seconds}s"
+                raise ArgoCDError(msg)
+            time.sleep(self._poll_interval)
@@ -0,0 +1,231 @@
+"""On-disk cache of the results of expensive operations."""
+
+from __future__ import annotations
+
+import os
+import shutil
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import IO
+
+from ..constants import CACHE_MAX_SIZE
+
+__all__ = [
+    "ResultCache",
+    "get_cache_path",
+]
+
+
+def get_cache_path() -> Path:
+    """Determine the root of the Phalanx cache directory.
+
+    Follows the XDG base directory specification, so the cache is stored in
+    :file:`phalanx` under ``XDG_CACHE_HOME`` if that environment variable is
+    set, and otherwise under :file:`~/.cache`.
+
+    Returns
+    -------
+    pathlib.Path
+        Root of the Phalanx cache directory. It may not exist.
+    """
+    if cache_home := os.getenv("XDG_CACHE_HOME"):
+        return Path(cache_home) / "phalanx"
+    return Path.home() / ".cache" / "phalanx"
+
+
+class ResultCache:
+    """Content-addressed on-disk cache of the results of operations.
+
+    Each entry is stored in a separate file named by its key, which should be
+    a hash of all of the inputs to the operation. Entries are therefore never
+    invalidated, only evicted when the cache grows larger than its maximum
+    size. Eviction removes the least-recently-used entries first.
+
+    Listing the cache to find its size is slow once it holds many entries,
+    so the cache is only measured on the first write. After that, the size
+    of each written entry is added to a running total, and the cache is only
+    measured again, evicting entries as needed, when that total exceeds the
+    maximum size. Writes by other processes are not counted until then, so
+    the cache may temporarily grow somewhat larger than its maximum size.
+
+    Writes are atomic, so it is safe to use the same cache from multiple
+    threads or processes at the same time.
+
+    Parameters
+    ----------
+    path
+        Directory in which to store cached results. It will be created if it
+        does not exist.
+    max_size
+        Maximum total size of the cached results in bytes.
+    """
+
+    def __init__(self, path: Path, max_size: int = CACHE_MAX_SIZE) -> None:
+        self._path = path
+        self._max_size = max_size
+        self._size: int | None = None
+        self._lock = Lock()
+
+    def get(self, key: str) -> str | None:
+        """Retrieve a cached result.
+
+        Parameters
+        ----------
+        key
+            Key of the cached result.
+
+        Returns
+        -------
+        str or None
+            Cached result, or `None` if there is no result with that key.
+        """
+        path = self._path / key
+        try:
+            data = path.read_text()
+        except FileNotFoundError:
+            return None
+
+        # Update the modification time so that entries that are still in use
+        # are evicted last.
+        with suppress(FileNotFoundError):
+            os.utime(path)
+        return data
+
+    def get_file(self, key: str) -> Path | None:
+        """Retrieve the path to a cached file.
+
+        The file must not be modified. It should be copied elsewhere
+        promptly, since it may be evicted at any time.
+
+        Parameters
+        ----------
+        key
+            Key of the cached file.
+
+        Returns
+        -------
+        pathlib.Path or None
+            Path to the cached file, or `None` if there is no file with that
+            key.
+        """
+        path = self._path / key
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, data: str) -> None:
+        """Store a result in the cache.
+
+        Parameters
+        ----------
+        key
+            Key of the result.
+        data
+            Result to store.
+
+        Raises
+        ------
+        OSError
+            Raised if the result could not be stored, in which case the cache
+            is left unchanged.
+        """
+        encoded = data.encode()
+        with self._write_entry(key) as fh:
+            fh.write(encoded)
+        self._add_size(len(encoded))
+
+    def put_file(self, key: str, source: Path) -> None:
+        """Store a copy of a file in the cache.
+
+        Parameters
+        ----------
+        key
+            Key of the file.
+        source
+            File to copy into the cache.
+
+        Raises
+        ------
+        OSError
+            Raised if the file could not be stored, in which case the cache
+            is left unchanged.
+        """
+        with self._write_entry(key) as fh, source.open("rb") as source_fh:
+            shutil.copyfileobj(source_fh, fh)
+        self._add_size(source.stat().st_size)
+
+    def _add_size(self, size: int) -> None:
+        """Account for a new entry, evicting entries if needed.
+
+        Parameters
+        ----------
+        size
+            Size of the new entry in bytes.
+        """
+        with self._lock:
+            if self._size is None or self._size + size > self._max_size:
+                self._size = self._evict()
+            else:
+                self._size += size
+
+    def _evict(self) -> int:
+        """Evict least-recently-used entries until under the maximum size.
+
+        Returns
+        -------
+        int
+            Total size of the remaining entries in bytes.
+        """
+        entries = []
+        total = 0
+        for path in self._path.iterdir():
+            if path.name.startswith(".tmp-"):
+                continue
+            with suppress(FileNotFoundError):
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total <= self._max_size:
+            return total
+        for _, size, path in sorted(entries):
+            path.unlink(missing_ok=True)
+            total -= size
+            if total <= self._max_size:
+                break
+        return total
+
+    @contextmanager
+    def _write_entry(self, key: str) -> Iterator[IO[bytes]]:
+        """Write a new entry, storing it in the cache only if writing works.
+
+        The entry is written to a temporary file and moved into place once
+        it is complete. If writing it fails, the temporary file is deleted.
+
+        Parameters
+        ----------
+        key
+            Key of the entry.
+
+        Yields
+        ------
+        typing.IO
+            File to which to write the contents of the entry.
+        """
+        self._path.mkdir(parents=True, exist_ok=True)
+        tmp_path = None
+        try:
+            with NamedTemporaryFile(
+                dir=self._path, prefix=".tmp-", delete=False
+            ) as tmp:
+                tmp_path = Path(tmp.name)
+                yield tmp
+            tmp_path.replace(self._path / key)
+        except BaseException:
+            if tmp_path:
+                tmp_path.unlink(missing_ok=True)
+            raise
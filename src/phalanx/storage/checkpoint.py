@@ -0,0 +1,81 @@
+"""Local record of the completed steps of an environment installation."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from threading import Lock
+
+__all__ = ["InstallCheckpoint"]
+
+
+class InstallCheckpoint:
+    """Record of the completed steps of an environment installation.
+
+    Each completed step is stored with a key describing what it did, such as
+    a digest of its inputs. A later installation can then skip a step if the
+    key is unchanged and the result of the step can still be seen in the
+    cluster. The record is a small JSON file that is rewritten atomically
+    after each step, so it survives an installation that fails or is
+    interrupted. Steps may be recorded from multiple threads.
+
+    Parameters
+    ----------
+    path
+        Path to the checkpoint file. It and its parent directory will be
+        created if they do not exist.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = Lock()
+
+    def clear(self) -> None:
+        """Forget all completed steps."""
+        with self._lock:
+            self._path.unlink(missing_ok=True)
+
+    def get(self, step: str) -> str | None:
+        """Get the key recorded for a completed step.
+
+        Parameters
+        ----------
+        step
+            Name of the step.
+
+        Returns
+        -------
+        str or None
+            Key recorded when the step was completed, or `None` if it has not
+            been completed.
+        """
+        with self._lock:
+            return self._read().get(step)
+
+    def record(self, step: str, key: str) -> None:
+        """Record that a step has been completed.
+
+        Parameters
+        ----------
+        step
+            Name of the step.
+        key
+            Description of what the step did, used to decide whether it can
+            be skipped by a later installation.
+        """
+        with self._lock:
+            steps = self._read()
+            steps[step] = key
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(steps, indent=2, sort_keys=True))
+            tmp_path.replace(self._path)
+
+    def _read(self) -> dict[str, str]:
+        """Read the completed steps, returning nothing if the file is bad."""
+        try:
+            steps = json.loads(self._path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+        return steps if isinstance(steps, dict) else {}
@@ -4,9 +4,11 @@ from __future__ import annotations
 
 import subprocess
 from datetime import timedelta
+from io import StringIO
 from pathlib import Path
 
 from ..exceptions import CommandFailedError, CommandTimedOutError
+from ..output import get_output_capture
 
 __all__ = ["Command"]
 
@@ -71,6 +73,33 @@ class Command:
             raise CommandFailedError(self._command, args, e) from e
         return result
 
+    def start(self, *args: str) -> subprocess.Popen[str]:
+        """Start the command in the background, capturing its output.
+
+        This method should only be called by subclasses, which should provide
+        a higher-level interface used by the rest of the program. The caller
+        is responsible for reading the standard output of the process and
+        for terminating it.
+
+        Parameters
+        ----------
+        *args
+            Arguments to the command.
+
+        Returns
+        -------
+        subprocess.Popen
+            Running process. Standard error is not redirected.
+
+        Raises
+        ------
+        OSError
+            Raised if the command could not be executed at all.
+        """
+        return subprocess.Popen(
+            [self._command, *args], stdout=subprocess.PIPE, text=True
+        )
+
     def run(
         self,
         *args: str,
@@ -83,9 +112,11 @@ class Command:
         """Run the command with the provided arguments.
 
         Standard output and standard error are not redirected and will go to
-        the standard output and error of the caller. This method should only
-        be called by subclasses, which should provide a higher-level interface
-        used by the rest of the program.
+        the standard output and error of the caller, unless the caller is
+        capturing its output with `~phalanx.output.capture_output`, in which
+        case they are added to its capture when the command finishes. This
+        method should only be called by subclasses, which should provide a
+        higher-level interface used by the rest of the program.
 
         Parameters
         ----------
@@ -119,13 +150,45 @@ class Command:
         """
         cmdline = [self._command, *args]
         stdin_bytes = stdin.encode() if stdin is not None else None
-        stdout = subprocess.DEVNULL if quiet else None
+        capture = get_output_capture()
+        stdout: int | None = subprocess.DEVNULL if quiet else None
+        stderr: int | None = None
+        if capture is not None:
+            stdout = subprocess.DEVNULL if quiet else subprocess.PIPE
+            stderr = subprocess.PIPE if quiet else subprocess.STDOUT
         check = not ignore_fail
         try:
-            subprocess.run(
-                cmdline, check=check, cwd=cwd, input=stdin_bytes, stdout=stdout
+            result = subprocess.run(
+                cmdline,
+                check=check,
+                cwd=cwd,
+                input=stdin_bytes,
+                stdout=stdout,
+                stderr=stderr,
             )
         except subprocess.CalledProcessError as e:
+            self._add_to_capture(capture, e.stdout, e.stderr)
             raise CommandFailedError(self._command, args, e) from e
         except subprocess.TimeoutExpired as e:
+            self._add_to_capture(capture, e.stdout, e.stderr)
             raise CommandTimedOutError(self._command, args, e) from e
+        self._add_to_capture(capture, result.stdout, result.stderr)
+
+    @staticmethod
+    def _add_to_capture(
+        capture: StringIO | None, *outputs: bytes | None
+    ) -> None:
+        """Add the output of a command to the caller's output capture.
+
+        Parameters
+        ----------
+        capture
+            Buffer capturing the output of the caller, if any.
+        *outputs
+            Captured standard output and standard error of the command.
+        """
+        if capture is None:
+            return
+        for output in outputs:
+            if output:
+                capture.write(output.decode(errors="replace"))
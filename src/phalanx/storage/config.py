@@ -2,17 +2,22 @@
 
 from __future__ import annotations
 
+import hashlib
+import pickle
 import re
+import tarfile
 from collections import defaultdict
-from contextlib import suppress
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager, suppress
+from copy import deepcopy
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Self
+from tempfile import NamedTemporaryFile, TemporaryDirectory, TemporaryFile
+from threading import Lock
+from typing import Any, ClassVar, Self
 from urllib.parse import urlparse
 
 import yaml
-from git import Diff
-from git.repo import Repo
 from pydantic import ValidationError
 
 from ..constants import HELM_DOCLINK_ANNOTATION
@@ -41,11 +46,14 @@ from ..models.environments import (
     IdentityProvider,
     PhalanxConfig,
 )
-from ..models.helm import HelmStarter
+from ..models.helm import HelmDependency, HelmStarter
 from ..models.secrets import ConditionalSecretConfig, Secret
 
 __all__ = ["ConfigStorage"]
 
+_VALUES_REFERENCE_REGEX = re.compile(rb"\.Values(?![\w-])((?:\.\w+)*)")
+"""Regular expression matching references to Helm values in templates."""
+
 
 def _merge_overrides(
     base: dict[str, Any], overrides: dict[str, Any]
@@ -76,6 +84,213 @@ def _merge_overrides(
     return new
 
 
+@dataclass
+class _CachedFile:
+    """Cached contents of a Phalanx configuration file."""
+
+    stamp: tuple[int, int]
+    """Modification time and size of the file when it was last checked."""
+
+    digest: str
+    """SHA-256 hash of the contents of the file."""
+
+    data: Any
+    """Parsed contents of the file, or the text for non-YAML files."""
+
+
+class _ParseCache:
+    """Per-process cache of the contents of Phalanx configuration files.
+
+    Loading the configuration of every environment reads the same files over
+    and over, and parsing YAML is slow, so each file is read and parsed at
+    most once. Entries are keyed by path. If the modification time or size of
+    a file changes, it is read again, but only parsed again if its contents
+    have changed.
+
+    The cache can be saved to and loaded from a snapshot file so that later
+    processes start with every file already parsed.
+
+    Parsed YAML is returned as a deep copy, since callers may modify it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._text: dict[Path, _CachedFile] = {}
+        self._yaml: dict[Path, _CachedFile] = {}
+        self._changed = False
+
+    def forget_tree(self, root: Path) -> None:
+        """Discard the cached contents of every file under a directory.
+
+        Parameters
+        ----------
+        root
+            Directory whose files should be discarded, such as a temporary
+            directory that is about to be deleted.
+        """
+        with self._lock:
+            for entries in (self._text, self._yaml):
+                for path in [p for p in entries if p.is_relative_to(root)]:
+                    del entries[path]
+
+    def invalidate(self, path: Path) -> None:
+        """Discard any cached contents of a file.
+
+        Parameters
+        ----------
+        path
+            Path to the file.
+        """
+        with self._lock:
+            self._text.pop(path, None)
+            self._yaml.pop(path, None)
+            self._changed = True
+
+    def load_snapshot(self, snapshot: dict[str, Any], root: Path) -> None:
+        """Add the files from a snapshot to the cache.
+
+        Parameters
+        ----------
+        snapshot
+            Snapshot created by `create_snapshot`.
+        root
+            Root of the Phalanx configuration, relative to which paths in the
+            snapshot are interpreted.
+        """
+        with self._lock:
+            for name, cached in snapshot["text"].items():
+                self._text.setdefault(root / name, cached)
+            for name, cached in snapshot["yaml"].items():
+                self._yaml.setdefault(root / name, cached)
+
+    def load_yaml(self, path: Path) -> Any:
+        """Load and parse a YAML file.
+
+        Parameters
+        ----------
+        path
+            Path to the file.
+
+        Returns
+        -------
+        Any
+            Parsed contents of the file.
+        """
+        return deepcopy(self._load(self._yaml, path, yaml.safe_load))
+
+    def read_text(self, path: Path) -> str:
+        """Read the contents of a text file.
+
+        Parameters
+        ----------
+        path
+            Path to the file.
+
+        Returns
+        -------
+        str
+            Contents of the file.
+        """
+        return self._load(self._text, path, lambda t: t)
+
+    def create_snapshot(self, paths: Iterable[Path], root: Path) -> dict:
+        """Create a snapshot of the cached contents of some files.
+
+        Each file is checked and, if necessary, read again first.
+
+        Parameters
+        ----------
+        paths
+            Files to include in the snapshot. YAML files must end in
+            ``.yaml`` and must not be Helm templates.
+        root
+            Root of the Phalanx configuration, relative to which paths in the
+            snapshot are stored.
+
+        Returns
+        -------
+        dict
+            Snapshot that can be passed to `load_snapshot`.
+        """
+        snapshot: dict[str, dict[str, _CachedFile]] = {"text": {}, "yaml": {}}
+        for path in paths:
+            name = path.relative_to(root)
+            if "templates" in name.parts:
+                self._load(self._text, path, lambda t: t)
+                with self._lock:
+                    snapshot["text"][str(name)] = self._text[path]
+            else:
+                self._load(self._yaml, path, yaml.safe_load)
+                with self._lock:
+                    snapshot["yaml"][str(name)] = self._yaml[path]
+        return snapshot
+
+    def take_changed(self) -> bool:
+        """Check whether any file was parsed since the last check.
+
+        Returns
+        -------
+        bool
+            `True` if the cache has changed since the last call.
+        """
+        with self._lock:
+            changed = self._changed
+            self._changed = False
+        return changed
+
+    def _load(
+        self,
+        entries: dict[Path, _CachedFile],
+        path: Path,
+        parse: Callable[[str], Any],
+    ) -> Any:
+        """Load a file through the cache.
+
+        Parameters
+        ----------
+        entries
+            Cache entries for this type of file.
+        path
+            Path to the file.
+        parse
+            Function to parse the text of the file.
+
+        Returns
+        -------
+        Any
+            Parsed contents of the file, which must not be modified.
+        """
+        stat = path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = entries.get(path)
+        if cached and cached.stamp == stamp:
+            return cached.data
+
+        # The file may only have been touched, such as by switching Git
+        # branches, so only parse it again if its contents have changed.
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        if cached and cached.digest == digest:
+            data = cached.data
+        else:
+            data = parse(raw.decode())
+        with self._lock:
+            entries[path] = _CachedFile(stamp=stamp, digest=digest, data=data)
+            self._changed = True
+        return data
+
+
+_parse_cache = _ParseCache()
+"""Cache of parsed configuration files shared by all `ConfigStorage`."""
+
+_SNAPSHOT_VERSION = 1
+"""Version of the format of configuration snapshot files.
+
+Increment this when changing the format so that old snapshots are ignored.
+"""
+
+
 @dataclass
 class _ApplicationChange:
     """Holds the analysis of a diff affecting a Phalanx application chart."""
@@ -90,13 +305,16 @@ class _ApplicationChange:
     """Whether this change is a file deletion."""
 
     @classmethod
-    def from_diff(cls, diff: Diff) -> Self:
-        """Create a change based on a Git diff.
+    def from_path(cls, path: str, *, is_delete: bool) -> Self:
+        """Create a change based on the path to a changed file.
 
         Parameters
         ----------
-        diff
-            One Git diff affecting a single file.
+        path
+            Path to the changed file relative to the root of the Phalanx
+            configuration.
+        is_delete
+            Whether the file was deleted.
 
         Returns
         -------
@@ -108,22 +326,23 @@ class _ApplicationChange:
         ValueError
             Raised if this is not a change to an application chart.
         """
-        full_path = diff.b_path or diff.a_path
-        if not full_path:
-            raise ValueError("Not a change to an application")
-        m = re.match("applications/([^/]+)/(.+)", full_path)
+        m = re.match("applications/([^/]+)/(.+)", path)
         if not m:
             raise ValueError("Not a change to an application")
         return cls(
-            application=m.group(1),
-            path=m.group(2),
-            is_delete=diff.change_type == "D",
+            application=m.group(1), path=m.group(2), is_delete=is_delete
         )
 
     @property
     def affects_all_envs(self) -> bool:
-        """Whether this change may affect any environment."""
-        if self.path in ("Chart.yaml", "values.yaml"):
+        """Whether this change may affect any environment.
+
+        Changes to :file:`values.yaml` are not included. They only affect an
+        environment if they change the merged values that the chart
+        references, which is determined by comparing the results of
+        `ConfigStorage.get_referenced_values`.
+        """
+        if self.path == "Chart.yaml":
             return True
         return self.path.startswith(("crds/", "templates/"))
 
@@ -135,10 +354,25 @@ class ConfigStorage:
     ----------
     path
         Path to the root of the Phalanx configuration.
+    snapshot
+        If given, path to a snapshot of the parsed configuration. The
+        snapshot is loaded if it exists and then brought up to date with
+        the configuration on disk, parsing only files that have changed. It
+        is created if it does not exist.
     """
 
-    def __init__(self, path: Path) -> None:
+    _REVISION_PATHS: ClassVar[list[str]] = [
+        "applications",
+        "charts",
+        "environments",
+    ]
+    """Directories needed to analyze the configuration at a Git revision."""
+
+    def __init__(self, path: Path, *, snapshot: Path | None = None) -> None:
         self._path = path
+        self._resource_paths: dict[str, Path] | None = None
+        if snapshot:
+            self.update_snapshot(snapshot)
 
     def add_application_setting(self, application: str, setting: str) -> None:
         """Add the setting for a new application to the environments chart.
@@ -215,6 +449,72 @@ class ConfigStorage:
             else:
                 new.write(setting + "\n")
         path_new.rename(path)
+        _parse_cache.invalidate(path)
+
+    def get_affected_applications(
+        self, paths: Iterable[Path]
+    ) -> dict[str, list[str]]:
+        """Get the application and environment pairs affected by changes.
+
+        This is the equivalent of `get_modified_applications` for files
+        changed in the working tree rather than relative to a Git branch.
+        Changes to the environment configuration and to application
+        :file:`values.yaml` files are ignored, since they only affect
+        applications through their injected values and the values that their
+        charts reference, and the caller has to compare those.
+
+        Parameters
+        ----------
+        paths
+            Paths to changed files, either absolute or relative to the root
+            of the Phalanx configuration. Files that no longer exist are
+            treated as deleted.
+
+        Returns
+        -------
+        dict of list of str
+            Dictionary of all affected applications to the list of
+            environments configured for that application that may have been
+            affected, sorted by application name.
+        """
+        result: defaultdict[str, list[str]] = defaultdict(list)
+        dependents = self.get_shared_chart_dependents()
+        for path in paths:
+            relative = self._get_relative_path(path)
+            if not relative:
+                continue
+            is_delete = not (self._path / relative).exists()
+            self._add_changed_path(
+                result, relative, is_delete=is_delete, dependents=dependents
+            )
+        return {a: sorted(set(e)) for a, e in sorted(result.items()) if e}
+
+    def get_affected_environments(self, paths: Iterable[Path]) -> list[str]:
+        """Get the environments whose top-level chart is affected by changes.
+
+        Parameters
+        ----------
+        paths
+            Paths to changed files, either absolute or relative to the root
+            of the Phalanx configuration.
+
+        Returns
+        -------
+        list of str
+            Sorted list of environments whose top-level Argo CD chart may
+            have been affected by the changes.
+        """
+        environments = set()
+        for path in paths:
+            relative = self._get_relative_path(path)
+            if not relative or not relative.startswith("environments/"):
+                continue
+            if m := re.match("environments/values-([^.]+).yaml$", relative):
+                if (self._path / relative).exists():
+                    environments.add(m.group(1))
+            else:
+                return self.list_environments()
+        return sorted(environments)
 
     def get_all_dependency_repositories(self) -> set[str]:
         """List the URLs of all referenced third-party Helm repositories.
@@ -234,6 +534,39 @@ class ConfigStorage:
             repo_urls.update(urls)
         return repo_urls
 
+    def get_all_remote_dependencies(self) -> set[HelmDependency]:
+        """List every third-party chart used as a dependency.
+
+        Includes the dependencies of both application charts and shared
+        charts. Dependencies referenced with ``file:`` URLs or without a
+        repository are not third-party charts and are not included.
+
+        Returns
+        -------
+        set of HelmDependency
+            Third-party charts used by some chart.
+        """
+        paths = [self._path / "applications", self._path / "charts"]
+        dependencies = set()
+        for chart_path in (
+            p for d in paths if d.is_dir() for p in d.iterdir()
+        ):
+            if not (chart_path / "Chart.yaml").exists():
+                continue
+            chart = _parse_cache.load_yaml(chart_path / "Chart.yaml")
+            for dependency in chart.get("dependencies", []):
+                repository = dependency.get("repository", "")
+                if not repository or repository.startswith("file:"):
+                    continue
+                dependencies.add(
+                    HelmDependency(
+                        name=dependency["name"],
+                        version=str(dependency["version"]),
+                        repository=repository,
+                    )
+                )
+        return dependencies
+
     def get_application_chart_path(self, application: str) -> Path:
         """Determine the path to an application Helm chart.
 
@@ -280,6 +613,28 @@ class ConfigStorage:
             for v in sorted(path.glob("values-*.yaml"))
         ]
 
+    def get_chart_size(self, application: str) -> int:
+        """Estimate the size of an application chart.
+
+        Used to estimate how long it will take to lint the chart when there
+        are no previous timings for it.
+
+        Parameters
+        ----------
+        application
+            Name of the application.
+
+        Returns
+        -------
+        int
+            One plus the number of template files and the number of
+            dependency charts.
+        """
+        path = self.get_application_chart_path(application)
+        templates = [p for p in (path / "templates").rglob("*") if p.is_file()]
+        chart = _parse_cache.load_yaml(path / "Chart.yaml")
+        return 1 + len(templates) + len(chart.get("dependencies") or [])
+
     def get_dependency_repositories(self, application: str) -> set[str]:
         """Return URLs for dependency Helm repositories for this application.
 
@@ -295,7 +650,7 @@ class ConfigStorage:
             application's chart.
         """
         path = self.get_application_chart_path(application) / "Chart.yaml"
-        chart = yaml.safe_load(path.read_text())
+        chart = _parse_cache.load_yaml(path)
         repo_urls = set()
         for dependency in chart.get("dependencies", []):
             if "repository" in dependency:
@@ -322,6 +677,8 @@ class ConfigStorage:
         str
             Branch name.
         """
+        from git.repo import Repo
+
         return Repo(str(self._path)).active_branch.name
 
     def get_git_url(self) -> str:
@@ -345,6 +702,8 @@ class ConfigStorage:
             Raised if the ``origin`` remote does not exist or if its URL is
             not in a recognized format.
         """
+        from git.repo import Repo
+
         repo = Repo(str(self._path))
         try:
             origin = repo.remote("origin")
@@ -380,7 +739,12 @@ class ConfigStorage:
 
         Application and environment pairs that have been deleted do not count
         as modified, since we don't want to attempt to lint deleted
-        configurations.
+        configurations. Changes to a shared chart in :file:`charts` affect
+        every application that uses it via a ``file://`` dependency, directly
+        or through another shared chart. Changes to the environment
+        configuration and to application :file:`values.yaml` files are not
+        considered, since they only affect applications through their
+        injected values and the values that their charts reference.
 
         Parameters
         ----------
@@ -395,21 +759,131 @@ class ConfigStorage:
             environments configured for that application that may have been
             affected.
         """
+        from git.repo import Repo
+
         result: defaultdict[str, list[str]] = defaultdict(list)
+        dependents = self.get_shared_chart_dependents()
         repo = Repo(str(self._path))
-        diffs = repo.head.commit.diff(branch, paths=["applications"], R=True)
-        for diff in diffs:
-            try:
-                change = _ApplicationChange.from_diff(diff)
-            except ValueError:
+        paths = ("applications", "charts")
+        for diff in repo.head.commit.diff(branch, paths=paths, R=True):
+            path = diff.b_path or diff.a_path
+            if not path:
                 continue
-            if change.affects_all_envs:
-                envs = self.get_application_environments(change.application)
-                if envs:
-                    result[change.application] = envs
-            elif not change.is_delete:
-                if m := re.match("values-([^.]+).yaml$", change.path):
-                    result[change.application].append(m.group(1))
+            is_delete = diff.change_type == "D"
+            self._add_changed_path(
+                result, path, is_delete=is_delete, dependents=dependents
+            )
+        return result
+
+    def get_referenced_values(
+        self, application: str, environments: Iterable[str]
+    ) -> dict[str, dict[str, Any]]:
+        """Get the merged values that an application chart may reference.
+
+        The templates of the chart, and of any shared charts it depends on,
+        are searched for references to ``.Values``, and the merged values for
+        each environment are reduced to the referenced keys. Two
+        configurations of a chart that produce the same referenced values
+        lint the same way, so changes to :file:`values.yaml` only need to be
+        linted in environments whose referenced values changed.
+
+        The analysis is conservative. Third-party subcharts are assumed to
+        reference all of their values, and a chart with a values schema or
+        a template that uses ``.Values`` without a key is assumed to
+        reference everything.
+
+        Parameters
+        ----------
+        application
+            Name of the application.
+        environments
+            Environments for which to merge values.
+
+        Returns
+        -------
+        dict of dict
+            Mapping from environment name to the referenced values, keyed by
+            dotted key path. References to keys that are not set are
+            omitted.
+        """
+        path = self.get_application_chart_path(application)
+        references = self._find_values_references(path)
+        values_path = path / "values.yaml"
+        values: dict[str, Any] = {}
+        if values_path.exists():
+            values = _parse_cache.load_yaml(values_path) or {}
+        result = {}
+        for environment in environments:
+            env_values_path = path / f"values-{environment}.yaml"
+            merged = values
+            if env_values_path.exists():
+                env_values = _parse_cache.load_yaml(env_values_path) or {}
+                merged = _merge_overrides(values, env_values)
+            if references is None:
+                result[environment] = {"": merged}
+                continue
+            referenced = {}
+            for reference in sorted(references):
+                with suppress(KeyError, TypeError):
+                    value = merged
+                    for key in reference:
+                        value = value[key]
+                    referenced[".".join(reference)] = value
+            result[environment] = referenced
+        return result
+
+    def get_shared_chart_dependents(self) -> dict[str, set[str]]:
+        """Determine which applications use each shared chart.
+
+        Applications use the shared charts in :file:`charts` through
+        ``file://`` dependencies in their :file:`Chart.yaml` files, and
+        shared charts may in turn depend on other shared charts. This builds
+        the reverse dependency graph and follows it transitively.
+
+        Returns
+        -------
+        dict of set of str
+            Mapping from the name of each shared chart that is used to the
+            names of all applications that depend on it, directly or
+            indirectly.
+        """
+        charts_path = (self._path / "charts").resolve()
+        graph: defaultdict[str, set[tuple[str, str]]] = defaultdict(set)
+        chart_files = [
+            *sorted(self._path.glob("applications/*/Chart.yaml")),
+            *sorted(self._path.glob("charts/*/Chart.yaml")),
+        ]
+        for chart_file in chart_files:
+            chart = _parse_cache.load_yaml(chart_file)
+            for dependency in chart.get("dependencies") or []:
+                repository = dependency.get("repository", "")
+                if not repository.startswith("file://"):
+                    continue
+                relative = repository.removeprefix("file://")
+                target = (chart_file.parent / relative).resolve()
+                if target.parent == charts_path:
+                    dependent = (
+                        chart_file.parent.parent.name,
+                        chart_file.parent.name,
+                    )
+                    graph[target.name].add(dependent)
+
+        # Walk the graph from each shared chart, collecting the applications
+        # found along the way. Shared charts already seen are skipped to
+        # guard against cycles.
+        result = {}
+        for chart in graph:
+            applications = set()
+            seen = {chart}
+            stack = [chart]
+            while stack:
+                for kind, name in graph.get(stack.pop(), set()):
+                    if kind == "applications":
+                        applications.add(name)
+                    elif name not in seen:
+                        seen.add(name)
+                        stack.append(name)
+            result[chart] = applications
         return result
 
     def get_starter_path(self, starter: HelmStarter) -> Path:
@@ -427,6 +901,28 @@ class ConfigStorage:
         """
         return self._path / "starters" / starter.value
 
+    def has_modified_values(self, branch: str) -> bool:
+        """Determine whether the environment configuration or values changed.
+
+        Parameters
+        ----------
+        branch
+            Git branch against which to compare to see what modifications
+            have been made.
+
+        Returns
+        -------
+        bool
+            Whether any file under :file:`environments`, or the
+            :file:`values.yaml` file of any application, differs from that
+            branch.
+        """
+        from git.repo import Repo
+
+        repo = Repo(str(self._path))
+        paths = ("environments", "applications/*/values.yaml")
+        return bool(repo.head.commit.diff(branch, paths=paths, R=True))
+
     def list_application_environments(self) -> dict[str, list[str]]:
         """List all available applications and their environments.
 
@@ -525,16 +1021,48 @@ class ConfigStorage:
             Raised if the named environment has no configuration.
         """
         values_base = self._path / "environments"
-        with (values_base / "values.yaml").open() as fh:
-            values = yaml.safe_load(fh)
+        values = _parse_cache.load_yaml(values_base / "values.yaml")
         env_values_path = values_base / f"values-{environment_name}.yaml"
         if not env_values_path.exists():
             raise UnknownEnvironmentError(environment_name)
-        with env_values_path.open() as fh:
-            env_values = yaml.safe_load(fh)
-            values = _merge_overrides(values, env_values)
+        env_values = _parse_cache.load_yaml(env_values_path)
+        values = _merge_overrides(values, env_values)
         return EnvironmentConfig.model_validate(values)
 
+    @contextmanager
+    def load_revision(self, revision: str) -> Iterator[ConfigStorage]:
+        """Load the Phalanx configuration as of a Git revision.
+
+        The application and environment configuration at that revision is
+        extracted into a temporary directory, which is deleted when the
+        context manager exits. Any of its files that were cached are then
+        discarded from the cache.
+
+        Parameters
+        ----------
+        revision
+            Git revision, such as a branch name, to load.
+
+        Yields
+        ------
+        ConfigStorage
+            Storage object for the configuration at that revision.
+        """
+        from git.repo import Repo
+
+        repo = Repo(str(self._path))
+        tree = repo.commit(revision).tree
+        paths = [p for p in self._REVISION_PATHS if p in tree]
+        with TemporaryDirectory() as tmpdir, TemporaryFile() as archive:
+            repo.archive(archive, revision, format="tar", path=paths)
+            archive.seek(0)
+            with tarfile.open(fileobj=archive) as tar:
+                tar.extractall(tmpdir, filter="data")
+            try:
+                yield ConfigStorage(Path(tmpdir))
+            finally:
+                _parse_cache.forget_tree(Path(tmpdir))
+
     def load_phalanx_config(self) -> PhalanxConfig:
         """Load the full Phalanx configuration.
 
@@ -622,6 +1150,52 @@ class ConfigStorage:
                 chart_path = self._path / "applications" / app / "Chart.yaml"
                 with chart_path.open("w") as fh:
                     yaml.safe_dump(app_config.chart, fh, sort_keys=False)
+                _parse_cache.invalidate(chart_path)
+
+    def update_snapshot(self, snapshot: Path) -> None:
+        """Bring a snapshot of the parsed configuration up to date.
+
+        The snapshot holds the parsed contents of every application chart,
+        values, and secrets file, every environment values file, and every
+        Argo CD ``Application`` template. Loading it lets later commands use
+        that data without parsing the files again. Files whose modification
+        time and size are unchanged are assumed to be unchanged, and other
+        files are only parsed again if their contents have changed.
+
+        Parameters
+        ----------
+        snapshot
+            Path to the snapshot file. It will be created if it doesn't
+            exist and only rewritten if something has changed.
+        """
+        try:
+            data = pickle.loads(snapshot.read_bytes())  # noqa: S301
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            data = None
+        if not data or data.get("version") != _SNAPSHOT_VERSION:
+            data = {"version": _SNAPSHOT_VERSION, "files": None}
+        if data["files"]:
+            _parse_cache.load_snapshot(data["files"], self._path)
+
+        # Files that have been deleted are dropped from the snapshot, so
+        # also rewrite it if the set of files has changed.
+        _parse_cache.take_changed()
+        files = _parse_cache.create_snapshot(
+            self._list_config_files(), self._path
+        )
+        changed = _parse_cache.take_changed()
+        old_files = data["files"] or {}
+        if not changed and all(
+            files[k].keys() == old_files.get(k, {}).keys() for k in files
+        ):
+            return
+        data["files"] = files
+        snapshot.parent.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(
+            "wb", dir=snapshot.parent, prefix=".tmp-", delete=False
+        ) as tmp:
+            pickle.dump(data, tmp)
+        Path(tmp.name).replace(snapshot)
 
     def write_application_template(
         self, name: str, project: Project, template: str
@@ -655,6 +1229,62 @@ class ConfigStorage:
             raise ApplicationExistsError(name)
         path.write_text(template)
 
+    def _add_application_change(
+        self, result: defaultdict[str, list[str]], change: _ApplicationChange
+    ) -> None:
+        """Add the application and environment pairs affected by a change.
+
+        Parameters
+        ----------
+        result
+            Mapping of application names to affected environments, which will
+            be updated in place.
+        change
+            Change to an application chart.
+        """
+        if change.affects_all_envs:
+            envs = self.get_application_environments(change.application)
+            if envs:
+                result[change.application] = envs
+        elif not change.is_delete:
+            if m := re.match("values-([^.]+).yaml$", change.path):
+                result[change.application].append(m.group(1))
+
+    def _add_changed_path(
+        self,
+        result: defaultdict[str, list[str]],
+        path: str,
+        *,
+        is_delete: bool,
+        dependents: dict[str, set[str]],
+    ) -> None:
+        """Add the application and environment pairs affected by a change.
+
+        Parameters
+        ----------
+        result
+            Mapping of application names to affected environments, which will
+            be updated in place.
+        path
+            Path to the changed file relative to the configuration root.
+        is_delete
+            Whether the file was deleted.
+        dependents
+            Applications using each shared chart, from
+            `get_shared_chart_dependents`.
+        """
+        if m := re.match("charts/([^/]+)/", path):
+            for application in sorted(dependents.get(m.group(1), set())):
+                envs = self.get_application_environments(application)
+                if envs:
+                    result[application] = envs
+            return
+        try:
+            change = _ApplicationChange.from_path(path, is_delete=is_delete)
+        except ValueError:
+            return
+        self._add_application_change(result, change)
+
     def _build_environment_details(
         self,
         config: EnvironmentConfig,
@@ -860,7 +1490,7 @@ class ConfigStorage:
             Raised if the namespace for the application could not be found.
         """
         template_path = self._find_application_resource_path(application)
-        template = template_path.read_text()
+        template = _parse_cache.read_text(template_path)
 
         # Helm templates are unfortunately not valid YAML, so do this the hard
         # way with a regular expression.
@@ -923,19 +1553,154 @@ class ConfigStorage:
             Raised if the project for the application could not be found or
             was set to an invalid value.
         """
+        # Index all of the Application resources the first time one is
+        # needed, and again if the index is out of date, rather than searching
+        # every project directory for each application.
+        paths = self._resource_paths
+        if paths is None or not paths.get(application, Path()).is_file():
+            paths = self._index_application_resources()
+        if application not in paths:
+            msg = "Cannot find Application resource"
+            raise InvalidApplicationConfigError(application, msg)
+        return paths[application]
+
+    def _get_relative_path(self, path: Path) -> str | None:
+        """Convert a path to a POSIX path relative to the configuration root.
+
+        Parameters
+        ----------
+        path
+            Absolute path or path relative to the configuration root.
+
+        Returns
+        -------
+        str or None
+            Path relative to the root of the Phalanx configuration, or `None`
+            if the path is outside of it.
+        """
+        if not path.is_absolute():
+            return path.as_posix()
+        try:
+            return path.relative_to(self._path.resolve()).as_posix()
+        except ValueError:
+            try:
+                return path.relative_to(self._path.absolute()).as_posix()
+            except ValueError:
+                return None
+
+    def _find_subchart_references(
+        self, path: Path, dependency: dict[str, Any], seen: set[Path]
+    ) -> set[tuple[str, ...]] | None:
+        """Find the Helm values of a chart that a subchart may reference.
+
+        Parameters
+        ----------
+        path
+            Path to the parent chart.
+        dependency
+            Entry for the subchart in the dependencies of the parent chart.
+        seen
+            Charts already being analyzed, used to guard against dependency
+            cycles.
+
+        Returns
+        -------
+        set of tuple of str or None
+            Key paths of referenced values of the parent chart, or `None` if
+            the subchart may reference any value.
+        """
+        if "import-values" in dependency:
+            return None
+
+        # Subcharts see the values under their name or alias and the global
+        # values. Shared charts can be analyzed, but third-party charts are
+        # assumed to use everything they are given.
+        name = dependency.get("alias") or dependency["name"]
+        references: set[tuple[str, ...]] = {("global",), (name,)}
+        for condition in dependency.get("condition", "").split(","):
+            if condition.strip():
+                references.add(tuple(condition.strip().split(".")))
+        if dependency.get("tags"):
+            references.add(("tags",))
+        repository = dependency.get("repository", "")
+        if not repository.startswith("file://"):
+            return references
+        subchart_path = (path / repository.removeprefix("file://")).resolve()
+        if subchart_path in seen or not subchart_path.is_dir():
+            return references
+        subchart = self._find_values_references(subchart_path, seen)
+        if subchart is None:
+            return references
+        references.remove((name,))
+        for reference in subchart:
+            if reference[0] == "global":
+                references.add(reference)
+            else:
+                references.add((name, *reference))
+        return references
+
+    def _find_values_references(
+        self, path: Path, seen: set[Path] | None = None
+    ) -> set[tuple[str, ...]] | None:
+        """Find the Helm values that a chart may reference.
+
+        Parameters
+        ----------
+        path
+            Path to the chart.
+        seen
+            Charts already being analyzed, used to guard against dependency
+            cycles.
+
+        Returns
+        -------
+        set of tuple of str or None
+            Key paths of referenced values, or `None` if the chart may
+            reference any value. A reference to a key also covers
+            everything under it.
+        """
+        if (path / "values.schema.json").exists():
+            return None
+        seen = (seen or set()) | {path.resolve()}
+
+        # Search every file in the chart other than downloaded subcharts,
+        # since values and other files may be passed through tpl.
+        references: set[tuple[str, ...]] = set()
+        for file_path in sorted(path.rglob("*")):
+            relative = file_path.relative_to(path)
+            if relative.parts[0] == "charts" or not file_path.is_file():
+                continue
+            for m in _VALUES_REFERENCE_REGEX.finditer(file_path.read_bytes()):
+                if not m.group(1):
+                    return None
+                key = m.group(1).decode().removeprefix(".")
+                references.add(tuple(key.split(".")))
+
+        chart = _parse_cache.load_yaml(path / "Chart.yaml")
+        for dependency in chart.get("dependencies") or []:
+            found = self._find_subchart_references(path, dependency, seen)
+            if found is None:
+                return None
+            references.update(found)
+        return references
+
+    def _index_application_resources(self) -> dict[str, Path]:
+        """Index the ``Application`` resources for all applications.
+
+        Returns
+        -------
+        dict of pathlib.Path
+            Mapping of application names to the paths of their
+            ``Application`` resource templates.
+        """
         template_path = (
             self.get_environment_chart_path() / "templates" / "applications"
         )
-        application_path = None
-        for subdir in template_path.iterdir():
-            candidate = subdir / f"{application}.yaml"
-            if candidate.exists():
-                application_path = candidate
-                break
-        if not application_path:
-            msg = "Cannot find Application resource"
-            raise InvalidApplicationConfigError(application, msg)
-        return application_path
+        paths: dict[str, Path] = {}
+        for path in sorted(template_path.glob("*/*.yaml")):
+            paths.setdefault(path.stem, path)
+        self._resource_paths = paths
+        return paths
 
     def _is_condition_satisfied(
         self, instance: ApplicationInstance, condition: str | None
@@ -964,6 +1729,25 @@ class ConfigStorage:
         else:
             return instance.is_values_setting_true(condition)
 
+    def _list_config_files(self) -> list[Path]:
+        """List the configuration files included in a snapshot.
+
+        Returns
+        -------
+        list of pathlib.Path
+            Paths to every application chart, values, and secrets file, every
+            environment values file, and every Argo CD ``Application``
+            template.
+        """
+        applications_path = self._path / "applications"
+        environments_path = self.get_environment_chart_path()
+        paths = list(applications_path.glob("*/Chart.yaml"))
+        paths.extend(applications_path.glob("*/values*.yaml"))
+        paths.extend(applications_path.glob("*/secrets*.yaml"))
+        paths.extend(environments_path.glob("values*.yaml"))
+        paths.extend(self._index_application_resources().values())
+        return sorted(paths)
+
     def _load_application_config(self, name: str) -> ApplicationConfig:
         """Load the configuration for an application from disk.
 
@@ -978,14 +1762,12 @@ class ConfigStorage:
             Application configuration.
         """
         base_path = self._path / "applications" / name
-        with (base_path / "Chart.yaml").open("r") as fh:
-            chart = yaml.safe_load(fh)
+        chart = _parse_cache.load_yaml(base_path / "Chart.yaml")
 
         # Load main values file.
         values_path = base_path / "values.yaml"
         if values_path.exists():
-            with values_path.open("r") as fh:
-                values = yaml.safe_load(fh) or {}
+            values = _parse_cache.load_yaml(values_path) or {}
         else:
             values = {}
 
@@ -993,17 +1775,15 @@ class ConfigStorage:
         environment_values = {}
         for path in base_path.glob("values-*.yaml"):
             env_name = path.stem.removeprefix("values-")
-            with path.open("r") as fh:
-                env_values = yaml.safe_load(fh)
-                if env_values:
-                    environment_values[env_name] = env_values
+            env_values = _parse_cache.load_yaml(path)
+            if env_values:
+                environment_values[env_name] = env_values
 
         # Load the secrets configuration.
         secrets_path = base_path / "secrets.yaml"
         secrets = {}
         if secrets_path.exists():
-            with secrets_path.open("r") as fh:
-                raw_secrets = yaml.safe_load(fh)
+            raw_secrets = _parse_cache.load_yaml(secrets_path)
             secrets = {
                 k: ConditionalSecretConfig.model_validate(s)
                 for k, s in raw_secrets.items()
@@ -1013,8 +1793,7 @@ class ConfigStorage:
         environment_secrets = {}
         for path in base_path.glob("secrets-*.yaml"):
             env_name = path.stem[len("secrets-") :]
-            with path.open("r") as fh:
-                raw_secrets = yaml.safe_load(fh)
+            raw_secrets = _parse_cache.load_yaml(path)
             environment_secrets[env_name] = {
                 k: ConditionalSecretConfig.model_validate(s)
                 for k, s in raw_secrets.items()
@@ -2,19 +2,97 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
+import re
+import shutil
+import sqlite3
 import sys
-from datetime import timedelta
+import tarfile
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from threading import Lock
+from typing import ClassVar
 from urllib.parse import urlparse
 
 import yaml
+from safir.datetime import current_datetime
 
+from ..constants import HELM_REPO_CONCURRENCY, HELM_REPO_REFRESH_INTERVAL
 from ..exceptions import CommandFailedError
-from ..models.helm import HelmStarter
+from ..models.helm import HelmDependency, HelmLintResult, HelmStarter
 from ..storage.config import ConfigStorage
+from .cache import ResultCache
 from .command import Command
+from .history import LintHistory
 
 __all__ = ["HelmStorage"]
 
+_DEPENDENCY_STAMP = ".phalanx-dependencies.json"
+"""Name of the file in :file:`charts` recording the last dependency update.
+
+Helm ignores files in :file:`charts` whose names start with a period.
+"""
+
+_RELEASE_DESCRIPTION = "Installed by Phalanx with inputs {digest}"
+"""Template for the description of releases installed by the installer.
+
+The description records a digest of the inputs to the installation so that
+a later installation can tell whether the release is already current.
+"""
+
+_HELM_ENV_REGEX = re.compile(r'^(HELM_[A-Z_]+)="(.*)"$', re.MULTILINE)
+"""Regular expression matching a setting in the output of ``helm env``."""
+
+
+class _RepositoryState:
+    """Helm repositories already prepared by this process.
+
+    Parameters
+    ----------
+    refresh_interval
+        How long repository indices are considered current after a refresh.
+    """
+
+    def __init__(self, refresh_interval: timedelta) -> None:
+        self._refresh_interval = refresh_interval
+        self._lock = Lock()
+        self._added: set[str] = set()
+        self._refreshed: datetime | None = None
+
+    def is_added(self, url: str) -> bool:
+        """Whether a repository has already been added."""
+        with self._lock:
+            return url in self._added
+
+    def is_current(self) -> bool:
+        """Whether repository indices were refreshed recently enough."""
+        with self._lock:
+            if not self._refreshed:
+                return False
+            return (
+                current_datetime() - self._refreshed < self._refresh_interval
+            )
+
+    def mark_added(self, url: str) -> None:
+        """Record that a repository has been added.
+
+        Adding a repository requires refreshing the indices again.
+        """
+        with self._lock:
+            self._added.add(url)
+            self._refreshed = None
+
+    def mark_refreshed(self) -> None:
+        """Record that repository indices have been refreshed."""
+        with self._lock:
+            self._refreshed = current_datetime()
+
 
 class HelmStorage:
     """Interface to Helm operations.
@@ -26,11 +104,209 @@ class HelmStorage:
     ----------
     config_storage
         Storage object for the Phalanx configuration.
+    cache
+        If given, cache the results of linting and expanding application
+        charts here, keyed by a hash of all of the inputs to Helm. A lint or
+        template whose inputs are unchanged will then return the cached
+        result without running Helm. Successful lints of the top-level chart
+        for an environment are cached the same way. Downloaded and packaged
+        dependency charts are also stored here, keyed by their contents, so
+        that they can be reused without running Helm.
+    history
+        If given, record the duration, outcome, and Helm version of every
+        lint that runs Helm here. Lints answered from the cache are not
+        recorded.
+    repo_ttl
+        How long a downloaded Helm repository index is considered current.
+        Older indices are refreshed by `prepare_repositories`.
+    mirror
+        If given, local mirror of third-party charts populated by
+        `mirror_charts`. Dependencies of a chart are installed from the
+        mirror without network access if it holds all of them.
     """
 
-    def __init__(self, config_storage: ConfigStorage) -> None:
+    _repositories: ClassVar[_RepositoryState | None] = None
+    """Repositories already prepared, if this process remembers them."""
+
+    def __init__(
+        self,
+        config_storage: ConfigStorage,
+        *,
+        cache: ResultCache | None = None,
+        history: LintHistory | None = None,
+        repo_ttl: timedelta = HELM_REPO_REFRESH_INTERVAL,
+        mirror: Path | None = None,
+    ) -> None:
         self._config = config_storage
+        self._cache = cache
+        self._cache_warned = False
+        self._history = history
+        self._history_warned = False
+        self._repo_ttl = repo_ttl
+        self._mirror = mirror
         self._helm = Command("helm")
+        self._chart_digests: dict[str, str] = {}
+        self._environment_chart_digest: str | None = None
+        self._helm_env: dict[str, str] | None = None
+        self._helm_version: str | None = None
+
+    def capture_lint_application(
+        self, application: str, environment: str, values: dict[str, str]
+    ) -> HelmLintResult:
+        """Lint an application chart with Helm, capturing the output.
+
+        Identical to `lint_application` except that nothing is printed.
+        Instead, the filtered output is returned so that the caller can print
+        it with `print_lint_result` at an appropriate time. This allows
+        multiple charts to be linted in parallel.
+
+        Parameters
+        ----------
+        application
+            Name of the application.
+        environment
+            Name of the environment in which to lint that application chart,
+            used to select the :file:`values-{environment}.yaml` file to add.
+        values
+            Extra key/value pairs to set, reflecting the settings injected by
+            Argo CD.
+
+        Returns
+        -------
+        HelmLintResult
+            Results of the lint.
+        """
+        application_path = self._config.get_application_chart_path(application)
+
+        # helm lint complains about any chart without a templates directory,
+        # but many of our charts are wrappers around third-party charts and
+        # intentionally don't have such a directory. To silence the warning,
+        # create an empty templates directory if needed. Git ignores empty
+        # directories, so this is essentially a no-op in a Git checkout.
+        (application_path / "templates").mkdir(exist_ok=True)
+
+        # If the inputs to Helm haven't changed since the last time this
+        # chart was linted, return the previous results.
+        set_arg = ",".join(f"{k}={v}" for k, v in values.items())
+        cache_key = None
+        if self._cache:
+            cache_key = self._build_cache_key(
+                "lint", application, environment, set_arg
+            )
+            if cached := self._get_cached(cache_key):
+                return HelmLintResult.model_validate_json(cached)
+
+        # Run helm lint with the appropriate flag for the environment in which
+        # the chart is being linted.
+        start = time.monotonic()
+        try:
+            result = self._helm.capture(
+                "lint",
+                application,
+                "--strict",
+                "--values",
+                f"{application}/values.yaml",
+                "--values",
+                f"{application}/values-{environment}.yaml",
+                "--set",
+                set_arg,
+                cwd=application_path.parent,
+            )
+        except CommandFailedError as e:
+            msg = (
+                f"Error: Application {application} in environment"
+                f" {environment} has errors\n"
+            )
+            lint_result = HelmLintResult(
+                application=application,
+                environment=environment,
+                success=False,
+                output=self._filter_lint_output(
+                    application, environment, e.stdout
+                ),
+                errors=(e.stderr or "") + msg,
+            )
+        else:
+            lint_result = HelmLintResult(
+                application=application,
+                environment=environment,
+                success=True,
+                output=self._filter_lint_output(
+                    application, environment, result.stdout
+                ),
+                errors=result.stderr or "",
+            )
+        self._record_lint(lint_result, start)
+        if self._cache and cache_key:
+            self._put_cached(cache_key, lint_result.model_dump_json())
+        return lint_result
+
+    def capture_lint_environment(self, environment: str) -> HelmLintResult:
+        """Lint the top-level chart for an environment, capturing the output.
+
+        Identical to `lint_environment` except that nothing is printed.
+        Instead, the filtered output is returned so that the caller can print
+        it with `print_lint_result` at an appropriate time. This allows
+        multiple environments to be linted in parallel.
+
+        Parameters
+        ----------
+        environment
+            Name of the environment.
+
+        Returns
+        -------
+        HelmLintResult
+            Results of the lint.
+        """
+        path = self._config.get_environment_chart_path()
+
+        # Only successful results are cached, so an environment that failed
+        # to lint is linted again even if nothing has changed.
+        cache_key = None
+        if self._cache:
+            cache_key = self._build_environment_cache_key("lint", environment)
+            if cached := self._get_cached(cache_key):
+                return HelmLintResult.model_validate_json(cached)
+
+        start = time.monotonic()
+        try:
+            result = self._helm.capture(
+                "lint",
+                path.name,
+                "--strict",
+                "--values",
+                f"{path.name}/values.yaml",
+                "--values",
+                f"{path.name}/values-{environment}.yaml",
+                cwd=path.parent,
+            )
+        except CommandFailedError as e:
+            msg = (
+                f"Error: Top-level chart for environment {environment} has"
+                " errors\n"
+            )
+            lint_result = HelmLintResult(
+                application=None,
+                environment=environment,
+                success=False,
+                output=self._filter_lint_output(None, environment, e.stdout),
+                errors=(e.stderr or "") + msg,
+            )
+        else:
+            lint_result = HelmLintResult(
+                application=None,
+                environment=environment,
+                success=True,
+                output=self._filter_lint_output(
+                    None, environment, result.stdout
+                ),
+                errors=result.stderr or "",
+            )
+        self._record_lint(lint_result, start)
+        if self._cache and cache_key and lint_result.success:
+            self._put_cached(cache_key, lint_result.model_dump_json())
+        return lint_result
 
     def create(
         self, application: str, description: str, starter: HelmStarter
@@ -95,7 +371,16 @@ class HelmStorage:
         `upgrade_application`.
 
         Assumes that remote repositories have already been refreshed with
-        `repo_update` and tells Helm to skip that.
+        `prepare_repositories` and tells Helm to skip that.
+
+        Helm is not run if the dependencies were already updated and neither
+        :file:`Chart.yaml` nor any local dependency chart has changed since.
+        If the result cache is enabled and holds the result of an update with
+        the same inputs, :file:`Chart.lock` and the dependency charts are
+        restored from the cache instead of running Helm. Otherwise, if the
+        chart mirror holds every third-party dependency, they are copied
+        from the mirror and local dependencies are packaged, without network
+        access.
 
         Parameters
         ----------
@@ -110,6 +395,18 @@ class HelmStorage:
             Raised if Helm fails.
         """
         application_path = self._config.get_application_chart_path(application)
+        self._chart_digests.pop(application, None)
+        inputs = self._hash_dependency_inputs(application_path)
+        if inputs:
+            if self._is_dependency_current(application_path, inputs):
+                return
+            if self._restore_dependencies(application_path, inputs):
+                return
+        (application_path / "charts" / _DEPENDENCY_STAMP).unlink(
+            missing_ok=True
+        )
+        if inputs and self._restore_from_mirror(application_path, inputs):
+            return
         self._helm.run(
             "dependency",
             "update",
@@ -117,6 +414,90 @@ class HelmStorage:
             cwd=application_path,
             quiet=quiet,
         )
+        if inputs:
+            self._record_dependencies(application_path, inputs)
+
+    def forget_chart_digests(self) -> None:
+        """Forget the chart digests remembered for cache keys.
+
+        The digest of each chart is computed once and reused for later
+        cache lookups. This must be called if charts may have changed since,
+        such as between the lints of a watch, so that stale results are not
+        returned from the cache.
+        """
+        self._chart_digests.clear()
+        self._environment_chart_digest = None
+
+    def is_mirrored(self, application: str) -> bool:
+        """Whether the chart mirror holds every dependency of an application.
+
+        Parameters
+        ----------
+        application
+            Name of the application.
+
+        Returns
+        -------
+        bool
+            `True` if there is a chart mirror and it holds every third-party
+            dependency of the application chart, in which case its Helm
+            repositories are not needed.
+        """
+        if not self._mirror:
+            return False
+        path = self._config.get_application_chart_path(application)
+        dependencies = self._get_remote_dependencies(path)
+        return all(self._get_mirrored_chart(d) for d in dependencies)
+
+    def is_release_current(
+        self, application: str, environment: str, values: dict[str, str]
+    ) -> bool:
+        """Check whether an application is installed with the same inputs.
+
+        Used by the installer to skip reinstalling an application that a
+        previous installation already installed. Assumes that
+        :command:`helm dependency update` has already been run.
+
+        Parameters
+        ----------
+        application
+            Name of the application, which is also the name of its release
+            and namespace.
+        environment
+            Name of the environment.
+        values
+            Extra key/value pairs that would be set.
+
+        Returns
+        -------
+        bool
+            `True` if the release is deployed and was installed by
+            `upgrade_application` with the same chart, values, and Helm
+            version, `False` otherwise.
+        """
+        set_arg = ",".join(f"{k}={v}" for k, v in values.items())
+        digest = self._build_cache_key(
+            "upgrade", application, environment, set_arg
+        )
+        try:
+            result = self._helm.capture(
+                "status",
+                application,
+                "--namespace",
+                application,
+                "--output",
+                "json",
+            )
+        except CommandFailedError:
+            return False
+        if not result.stdout:
+            return False
+        info = json.loads(result.stdout).get("info", {})
+        description = _RELEASE_DESCRIPTION.format(digest=digest)
+        return (
+            info.get("status") == "deployed"
+            and info.get("description") == description
+        )
 
     def lint_application(
         self, application: str, environment: str, values: dict[str, str]
@@ -144,47 +525,11 @@ class HelmStorage:
         bool
             Whether linting passed.
         """
-        application_path = self._config.get_application_chart_path(application)
-
-        # helm lint complains about any chart without a templates directory,
-        # but many of our charts are wrappers around third-party charts and
-        # intentionally don't have such a directory. To silence the warning,
-        # create an empty templates directory if needed. Git ignores empty
-        # directories, so this is essentially a no-op in a Git checkout.
-        if not (application_path / "templates").exists():
-            (application_path / "templates").mkdir()
-
-        # Run helm lint with the appropriate flag for the environment in which
-        # the chart is being linted.
-        set_arg = ",".join(f"{k}={v}" for k, v in values.items())
-        try:
-            result = self._helm.capture(
-                "lint",
-                application,
-                "--strict",
-                "--values",
-                f"{application}/values.yaml",
-                "--values",
-                f"{application}/values-{environment}.yaml",
-                "--set",
-                set_arg,
-                cwd=application_path.parent,
-            )
-        except CommandFailedError as e:
-            self._print_lint_output(application, environment, e.stdout)
-            if e.stderr:
-                sys.stderr.write(e.stderr)
-            msg = (
-                f"Error: Application {application} in environment"
-                f" {environment} has errors\n"
-            )
-            sys.stderr.write(msg)
-            return False
-        else:
-            self._print_lint_output(application, environment, result.stdout)
-            if result.stderr:
-                sys.stderr.write(result.stderr)
-            return True
+        result = self.capture_lint_application(
+            application, environment, values
+        )
+        self.print_lint_result(result)
+        return result.success
 
     def lint_environment(self, environment: str) -> bool:
         """Lint the top-level chart for an environment with Helm.
@@ -202,33 +547,200 @@ class HelmStorage:
         bool
             Whether linting passed.
         """
-        path = self._config.get_environment_chart_path()
-        try:
-            result = self._helm.capture(
-                "lint",
-                path.name,
-                "--strict",
-                "--values",
-                f"{path.name}/values.yaml",
-                "--values",
-                f"{path.name}/values-{environment}.yaml",
-                cwd=path.parent,
+        result = self.capture_lint_environment(environment)
+        self.print_lint_result(result)
+        return result.success
+
+    def mirror_charts(
+        self, dependencies: Iterable[HelmDependency], *, jobs: int = 1
+    ) -> list[HelmDependency]:
+        """Download third-party charts into the chart mirror.
+
+        Charts already in the mirror are not downloaded again, since
+        published charts are assumed to be immutable. Each chart is stored
+        in a subdirectory named after its repository, and an
+        :file:`index.yaml` for the whole mirror is regenerated afterwards.
+        Only dependencies on exact chart versions can be installed from the
+        mirror.
+
+        Parameters
+        ----------
+        dependencies
+            Charts to download.
+        jobs
+            Maximum number of charts to download in parallel.
+
+        Returns
+        -------
+        list of HelmDependency
+            Charts that were downloaded, sorted by repository, name, and
+            version.
+
+        Raises
+        ------
+        CommandFailedError
+            Raised if Helm fails.
+        ValueError
+            Raised if there is no chart mirror or a Helm repository URL is
+            invalid.
+        """
+        if not self._mirror:
+            raise ValueError("No chart mirror configured")
+        mirror = self._mirror
+        missing = sorted(
+            (d for d in set(dependencies) if not self._get_mirrored_chart(d)),
+            key=lambda d: (d.repository, d.name, d.version),
+        )
+
+        def pull(dependency: HelmDependency) -> None:
+            destination = mirror / self._get_repository_name(
+                dependency.repository
             )
-        except CommandFailedError as e:
-            self._print_lint_output(None, environment, e.stdout)
-            if e.stderr:
-                sys.stderr.write(e.stderr)
-            msg = (
-                f"Error: Top-level chart for environment {environment} has"
-                " errors\n"
+            destination.mkdir(parents=True, exist_ok=True)
+            repository = dependency.repository
+            if repository.startswith("oci://"):
+                chart = [f"{repository.rstrip('/')}/{dependency.name}"]
+            else:
+                chart = [dependency.name, "--repo", repository]
+            self._helm.run(
+                "pull",
+                *chart,
+                "--version",
+                dependency.version,
+                "--destination",
+                str(destination),
+                quiet=True,
             )
-            sys.stderr.write(msg)
-            return False
-        else:
-            self._print_lint_output(None, environment, result.stdout)
-            if result.stderr:
-                sys.stderr.write(result.stderr)
-            return True
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for future in [pool.submit(pull, d) for d in missing]:
+                future.result()
+        mirror.mkdir(parents=True, exist_ok=True)
+        self._helm.run("repo", "index", str(mirror), quiet=True)
+        return missing
+
+    def prepare_dependencies(
+        self, applications: Iterable[str], *, jobs: int = 1
+    ) -> None:
+        """Download chart dependencies for several applications.
+
+        Equivalent to calling `dependency_update` for each application with
+        Helm's standard output suppressed, except that up to ``jobs``
+        applications are updated in parallel.
+
+        Parameters
+        ----------
+        applications
+            Applications whose dependencies should be updated.
+        jobs
+            Maximum number of dependency updates to run in parallel.
+
+        Raises
+        ------
+        CommandFailedError
+            Raised if Helm fails for any application.
+        """
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = [
+                pool.submit(self.dependency_update, a, quiet=True)
+                for a in applications
+            ]
+            for future in futures:
+                future.result()
+
+    def prepare_repositories(
+        self, urls: Iterable[str], *, quiet: bool = False
+    ) -> None:
+        """Ensure Helm has current indices for some chart repositories.
+
+        Reads Helm's repository configuration and adds only the repositories
+        that are missing or configured with a different URL. Adding a
+        repository downloads its index, so of the remaining repositories,
+        only those whose index in Helm's cache is missing or older than the
+        configured freshness interval are refreshed, in parallel.
+
+        If `remember_repositories` has been called, does nothing if all of
+        the repositories were prepared recently by this process.
+
+        Parameters
+        ----------
+        urls
+            URLs of the chart repositories.
+        quiet
+            Whether to suppress Helm's standard output.
+
+        Raises
+        ------
+        CommandFailedError
+            Raised if Helm fails.
+        ValueError
+            Raised if a Helm repository URL is invalid.
+        """
+        urls = sorted(set(urls))
+        if not urls:
+            return
+        state = self._repositories
+        if state and state.is_current() and all(map(state.is_added, urls)):
+            return
+        configured = self._read_repository_config()
+        stale = []
+        for url in urls:
+            name = self._get_repository_name(url)
+            if configured.get(name) != url.rstrip("/"):
+                self.repo_add(url, quiet=quiet)
+            elif not self._is_index_current(name):
+                stale.append(url)
+        if stale:
+            self.repo_update(stale, quiet=quiet)
+        if state:
+            for url in urls:
+                state.mark_added(url)
+            state.mark_refreshed()
+
+    def print_lint_result(
+        self, result: HelmLintResult, *, elapsed: timedelta | None = None
+    ) -> None:
+        """Print the captured results of a lint.
+
+        Parameters
+        ----------
+        result
+            Results of a lint from `capture_lint_application` or
+            `capture_lint_environment`.
+        elapsed
+            If given, how long the lint took, which is reported after its
+            results.
+        """
+        # Flush after each write so that the output of one lint is not
+        # interleaved with the output of the next when standard output and
+        # standard error go to the same place.
+        sys.stdout.write(result.output)
+        sys.stdout.flush()
+        sys.stderr.write(result.errors)
+        sys.stderr.flush()
+        if elapsed is not None:
+            status = "Passed" if result.success else "Failed"
+            seconds = elapsed.total_seconds()
+            sys.stdout.write(f"==> {status} in {seconds:.2f}s\n")
+            sys.stdout.flush()
+
+    @classmethod
+    def remember_repositories(cls, refresh_interval: timedelta) -> None:
+        """Avoid preparing the same Helm repositories repeatedly.
+
+        After this is called, every `HelmStorage` in this process skips
+        adding repositories it has already added and skips refreshing
+        repository indices if they were refreshed less than
+        ``refresh_interval`` ago and no repositories have been added since.
+        This is intended for long-running processes that run many Helm
+        commands.
+
+        Parameters
+        ----------
+        refresh_interval
+            How long repository indices are considered current.
+        """
+        cls._repositories = _RepositoryState(refresh_interval)
 
     def repo_add(self, url: str, *, quiet: bool = False) -> None:
         """Add a Helm chart repository to Helm's cache.
@@ -242,6 +754,9 @@ class HelmStorage:
         arbitrary heuristics that produce consistent names and hopefully won't
         produce conflicts.
 
+        Does nothing if `remember_repositories` has been called and this
+        repository was already added.
+
         Parameters
         ----------
         url
@@ -256,22 +771,28 @@ class HelmStorage:
         ValueError
             Raised if the Helm repository URL is invalid.
         """
-        hostname = urlparse(url).hostname
-        if not hostname:
-            raise ValueError(f"Invalid Helm repository URL {url}")
-        if hostname.endswith("github.io"):
-            name = hostname.split(".", 1)[0]
-        elif "." in hostname:
-            name = hostname.split(".")[-2]
-        else:
-            name = hostname
+        name = self._get_repository_name(url)
+        if self._repositories and self._repositories.is_added(url):
+            return
         self._helm.run("repo", "add", "--force-update", name, url, quiet=quiet)
+        if self._repositories:
+            self._repositories.mark_added(url)
 
-    def repo_update(self, *, quiet: bool = False) -> None:
+    def repo_update(
+        self, urls: Iterable[str] | None = None, *, quiet: bool = False
+    ) -> None:
         """Update Helm's cache of upstream repository indices.
 
+        Does nothing if ``urls`` is not given, `remember_repositories` has
+        been called, and the indices are still current.
+
         Parameters
         ----------
+        urls
+            If given, only update the indices of these repositories, which
+            must already have been added. Each is updated by a separate Helm
+            command, run in parallel. Otherwise, update every repository Helm
+            knows about.
         quiet
             Whether to suppress Helm's standard output.
 
@@ -279,8 +800,34 @@ class HelmStorage:
         ------
         CommandFailedError
             Raised if Helm fails.
+        ValueError
+            Raised if a Helm repository URL is invalid.
         """
+        if urls is not None:
+            names = sorted({self._get_repository_name(u) for u in urls})
+            if not names:
+                return
+            # Run each update in a copy of the current context so that any
+            # output capture of the caller also applies to it.
+            workers = min(len(names), HELM_REPO_CONCURRENCY)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(
+                        copy_context().run,
+                        partial(
+                            self._helm.run, "repo", "update", n, quiet=quiet
+                        ),
+                    )
+                    for n in names
+                ]
+                for future in futures:
+                    future.result()
+            return
+        if self._repositories and self._repositories.is_current():
+            return
         self._helm.run("repo", "update", quiet=quiet)
+        if self._repositories:
+            self._repositories.mark_refreshed()
 
     def template_application(
         self, application: str, environment: str, values: dict[str, str]
@@ -315,6 +862,15 @@ class HelmStorage:
         """
         application_path = self._config.get_application_chart_path(application)
         set_arg = ",".join(f"{k}={v}" for k, v in values.items())
+        cache_key = None
+        if self._cache:
+            cache_key = self._build_cache_key(
+                "template", application, environment, set_arg
+            )
+            if cached := self._get_cached(cache_key):
+                cached_result = json.loads(cached)
+                sys.stderr.write(cached_result["stderr"])
+                return cached_result["stdout"]
         try:
             result = self._helm.capture(
                 "template",
@@ -335,6 +891,9 @@ class HelmStorage:
             raise
         if result.stderr:
             sys.stderr.write(result.stderr)
+        if self._cache and cache_key:
+            data = {"stdout": result.stdout, "stderr": result.stderr or ""}
+            self._put_cached(cache_key, json.dumps(data))
         return result.stdout
 
     def template_environment(
@@ -397,7 +956,8 @@ class HelmStorage:
         Runs :command:`helm upgrade --install` to install an application chart
         in the given environment. Assumes that :command:`helm dependency
         update` has already been run to download any third-party charts. Any
-        output to standard error is passed along.
+        output to standard error is passed along. The release description
+        records a digest of the inputs for `is_release_current`.
 
         This method bypasses Argo CD and should only be used by the installer
         to bootstrap the environment.
@@ -428,6 +988,9 @@ class HelmStorage:
         """
         application_path = self._config.get_application_chart_path(application)
         set_arg = ",".join(f"{k}={v}" for k, v in values.items())
+        digest = self._build_cache_key(
+            "upgrade", application, environment, set_arg
+        )
         self._helm.run(
             "upgrade",
             application,
@@ -439,6 +1002,8 @@ class HelmStorage:
             f"{application}/values-{environment}.yaml",
             "--set",
             set_arg,
+            "--description",
+            _RELEASE_DESCRIPTION.format(digest=digest),
             "--create-namespace",
             "--namespace",
             application,
@@ -449,10 +1014,92 @@ class HelmStorage:
             timeout=timeout + timedelta(seconds=1),
         )
 
-    def _print_lint_output(
+    def _build_cache_key(
+        self, action: str, application: str, environment: str, set_arg: str
+    ) -> str:
+        """Construct the cache key for a Helm action on an application chart.
+
+        The key is a hash of everything that may affect the output of Helm:
+        the action, the full contents of the application chart directory
+        (including both values files and any downloaded dependencies), the
+        injected values, and the version of Helm.
+
+        Parameters
+        ----------
+        action
+            Helm action being performed, such as ``lint`` or ``template``.
+        application
+            Name of the application.
+        environment
+            Name of the environment.
+        set_arg
+            Argument to the ``--set`` flag for injected values.
+
+        Returns
+        -------
+        str
+            Cache key for that action.
+        """
+        if application not in self._chart_digests:
+            path = self._config.get_application_chart_path(application)
+            self._chart_digests[application] = self._hash_chart(path)
+        digest = hashlib.sha256()
+        for data in (
+            action,
+            application,
+            environment,
+            set_arg,
+            self._chart_digests[application],
+            self._get_helm_version(),
+        ):
+            digest.update(data.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _build_environment_cache_key(
+        self, action: str, environment: str
+    ) -> str:
+        """Construct the cache key for a Helm action on the top-level chart.
+
+        The key is a hash of the action, the contents of the top-level chart
+        other than the values files for other environments, and the version
+        of Helm. Changing the configuration of one environment therefore
+        does not invalidate the cached results for the others.
+
+        Parameters
+        ----------
+        action
+            Helm action being performed, such as ``lint``.
+        environment
+            Name of the environment.
+
+        Returns
+        -------
+        str
+            Cache key for that action.
+        """
+        path = self._config.get_environment_chart_path()
+        if self._environment_chart_digest is None:
+            self._environment_chart_digest = self._hash_chart(
+                path, exclude="values-*.yaml"
+            )
+        values_path = path / f"values-{environment}.yaml"
+        digest = hashlib.sha256()
+        for data in (
+            action,
+            environment,
+            self._environment_chart_digest,
+            hashlib.sha256(values_path.read_bytes()).hexdigest(),
+            self._get_helm_version(),
+        ):
+            digest.update(data.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _filter_lint_output(
         self, application: str | None, environment: str, output: str | None
-    ) -> None:
-        """Print filtered output from Helm's lint.
+    ) -> str:
+        """Filter the output from Helm's lint.
 
         :command:`helm lint` has no apparent way to disable certain checks,
         and there are some warnings that we will never care about. It also
@@ -466,13 +1113,19 @@ class HelmStorage:
             Name of the environment in which to lint that application chart,
         output
             Raw output from :command:`helm lint`.
+
+        Returns
+        -------
+        str
+            Filtered output, suitable for printing to standard output.
         """
         if not output:
-            return
+            return ""
         if application:
             prelude = f"==> Linting {application} (environment {environment})"
         else:
             prelude = f"==> Linting top-level chart for {environment}"
+        lines = []
         for line in output.removesuffix("\n").split("\n"):
             if "icon is recommended" in line:
                 continue
@@ -481,6 +1134,503 @@ class HelmStorage:
             if "1 chart(s) linted" in line:
                 continue
             if line.startswith("==> Linting"):
-                print(prelude)
+                lines.append(prelude)
             else:
-                print(line)
+                lines.append(line)
+        return "".join(line + "\n" for line in lines)
+
+    def _get_cached(self, key: str) -> str | None:
+        """Retrieve a result from the cache, treating errors as a miss.
+
+        Parameters
+        ----------
+        key
+            Key of the cached result.
+
+        Returns
+        -------
+        str or None
+            Cached result, or `None` if the cache is disabled, has no result
+            with that key, or could not be read.
+        """
+        if not self._cache:
+            return None
+        try:
+            return self._cache.get(key)
+        except OSError as e:
+            self._warn_cache_error(e)
+            return None
+
+    def _get_helm_env(self) -> dict[str, str]:
+        """Get Helm's settings, running Helm only the first time.
+
+        Returns
+        -------
+        dict of str
+            Settings reported by :command:`helm env`, such as the locations
+            of the repository configuration and cache. Empty if Helm fails,
+            in which case every repository is treated as missing.
+        """
+        if self._helm_env is None:
+            try:
+                result = self._helm.capture("env")
+            except CommandFailedError:
+                self._helm_env = {}
+            else:
+                output = result.stdout or ""
+                self._helm_env = dict(_HELM_ENV_REGEX.findall(output))
+        return self._helm_env
+
+    def _get_helm_version(self) -> str:
+        """Get the version of Helm, running Helm only the first time.
+
+        Returns
+        -------
+        str
+            Short version string reported by Helm.
+        """
+        if self._helm_version is None:
+            result = self._helm.capture("version", "--short")
+            self._helm_version = (result.stdout or "").strip()
+        return self._helm_version
+
+    def _get_mirrored_chart(self, dependency: HelmDependency) -> Path | None:
+        """Find a third-party chart in the chart mirror.
+
+        Parameters
+        ----------
+        dependency
+            Chart to find.
+
+        Returns
+        -------
+        pathlib.Path or None
+            Path to the chart archive, or `None` if there is no mirror or the
+            mirror doesn't hold that chart.
+        """
+        if not self._mirror:
+            return None
+        name = self._get_repository_name(dependency.repository)
+        archive = f"{dependency.name}-{dependency.version}.tgz"
+        path = self._mirror / name / archive
+        return path if path.is_file() else None
+
+    def _get_remote_dependencies(self, path: Path) -> list[HelmDependency]:
+        """Get the third-party dependencies of a chart.
+
+        Parameters
+        ----------
+        path
+            Path to the chart.
+
+        Returns
+        -------
+        list of HelmDependency
+            Dependencies of the chart downloaded from a Helm repository.
+        """
+        chart = yaml.safe_load((path / "Chart.yaml").read_text())
+        return [
+            HelmDependency(
+                name=d["name"],
+                version=str(d["version"]),
+                repository=d["repository"],
+            )
+            for d in chart.get("dependencies") or []
+            if d.get("repository", "file:").split(":", 1)[0] != "file"
+        ]
+
+    def _get_repository_name(self, url: str) -> str:
+        """Choose the name under which to add a Helm chart repository.
+
+        Parameters
+        ----------
+        url
+            URL of the chart repository.
+
+        Returns
+        -------
+        str
+            Consistent name for that repository.
+
+        Raises
+        ------
+        ValueError
+            Raised if the Helm repository URL is invalid.
+        """
+        hostname = urlparse(url).hostname
+        if not hostname:
+            raise ValueError(f"Invalid Helm repository URL {url}")
+        if hostname.endswith("github.io"):
+            return hostname.split(".", 1)[0]
+        elif "." in hostname:
+            return hostname.split(".")[-2]
+        else:
+            return hostname
+
+    def _hash_chart(self, path: Path, *, exclude: str | None = None) -> str:
+        """Hash the contents of a chart directory.
+
+        Downloaded or packaged dependency charts are hashed by the contents
+        of their members rather than the bytes of the archive, since Helm
+        packages charts with the current time and repackaging a shared chart
+        would otherwise change the hash. :file:`Chart.lock` is ignored for the
+        same reason; its contents are determined by the rest of the chart.
+
+        Parameters
+        ----------
+        path
+            Path to the chart.
+        exclude
+            If given, a glob pattern matching names of files at the top level
+            of the chart to leave out of the hash.
+
+        Returns
+        -------
+        str
+            Hex digest of the contents of the chart.
+        """
+        digest = hashlib.sha256()
+        for file_path in sorted(path.rglob("*")):
+            if not file_path.is_file() or file_path.name == "Chart.lock":
+                continue
+            if (
+                exclude
+                and file_path.parent == path
+                and file_path.match(exclude)
+            ):
+                continue
+            digest.update(str(file_path.relative_to(path)).encode())
+            digest.update(b"\0")
+            if file_path.suffix == ".tgz":
+                with tarfile.open(file_path) as archive:
+                    for member in sorted(archive, key=lambda m: m.name):
+                        if not member.isfile():
+                            continue
+                        fh = archive.extractfile(member)
+                        if not fh:
+                            continue
+                        digest.update(member.name.encode())
+                        digest.update(b"\0")
+                        digest.update(fh.read())
+            else:
+                digest.update(file_path.read_bytes())
+        return digest.hexdigest()
+
+    def _hash_dependency_charts(self, path: Path) -> dict[str, str]:
+        """Hash the downloaded or packaged dependencies of a chart.
+
+        Parameters
+        ----------
+        path
+            Path to the chart.
+
+        Returns
+        -------
+        dict of str
+            Mapping of archive names in :file:`charts` to hex digests of
+            their contents.
+        """
+        charts = {}
+        for archive in sorted((path / "charts").glob("*.tgz")):
+            with archive.open("rb") as fh:
+                digest = hashlib.file_digest(fh, "sha256")
+            charts[archive.name] = digest.hexdigest()
+        return charts
+
+    def _hash_dependency_inputs(self, path: Path) -> str | None:
+        """Hash the inputs to a dependency update of a chart.
+
+        These are :file:`Chart.yaml` and the contents of any dependency
+        charts referenced with ``file:`` URLs. Remote dependency charts are
+        assumed to be immutable once published.
+
+        Parameters
+        ----------
+        path
+            Path to the chart.
+
+        Returns
+        -------
+        str or None
+            Hex digest of the inputs, or `None` if the chart has no
+            dependencies.
+        """
+        chart_yaml = (path / "Chart.yaml").read_bytes()
+        dependencies = yaml.safe_load(chart_yaml).get("dependencies")
+        if not dependencies:
+            return None
+        digest = hashlib.sha256(chart_yaml)
+        for dependency in dependencies:
+            repository = dependency.get("repository", "")
+            if repository.startswith("file://"):
+                source = path / repository.removeprefix("file://")
+                digest.update(b"\0")
+                digest.update(self._hash_chart(source.resolve()).encode())
+        return digest.hexdigest()
+
+    def _is_dependency_current(self, path: Path, inputs: str) -> bool:
+        """Check whether the dependencies of a chart are up to date.
+
+        Parameters
+        ----------
+        path
+            Path to the chart.
+        inputs
+            Hash of the current inputs to a dependency update.
+
+        Returns
+        -------
+        bool
+            `True` if the last dependency update was done with the same
+            inputs and neither :file:`Chart.lock` nor any downloaded
+            dependency chart has changed since, `False` otherwise.
+        """
+        stamp_path = path / "charts" / _DEPENDENCY_STAMP
+        try:
+            stamp = json.loads(stamp_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return False
+        if stamp.get("inputs") != inputs:
+            return False
+
+        # Helm writes Chart.lock, but installing from the mirror does not.
+        if not stamp.get("mirror") and not (path / "Chart.lock").exists():
+            return False
+        return stamp.get("charts") == self._hash_dependency_charts(path)
+
+    def _is_index_current(self, name: str) -> bool:
+        """Whether Helm's cached index of a chart repository is current.
+
+        Parameters
+        ----------
+        name
+            Name of the repository in Helm's configuration.
+
+        Returns
+        -------
+        bool
+            `True` if the index was downloaded less than the configured
+            freshness interval ago, `False` if it is older, missing, or the
+            location of Helm's cache is unknown.
+        """
+        cache = self._get_helm_env().get("HELM_REPOSITORY_CACHE")
+        if not cache:
+            return False
+        try:
+            mtime = (Path(cache) / f"{name}-index.yaml").stat().st_mtime
+        except FileNotFoundError:
+            return False
+        age = timedelta(seconds=time.time() - mtime)
+        return age < self._repo_ttl
+
+    def _put_cached(self, key: str, data: str) -> None:
+        """Store a result in the cache, if possible.
+
+        A result that cannot be stored is not an error, since it only means
+        that the operation will be run again next time.
+
+        Parameters
+        ----------
+        key
+            Key of the result.
+        data
+            Result to store.
+        """
+        if not self._cache:
+            return
+        try:
+            self._cache.put(key, data)
+        except OSError as e:
+            self._warn_cache_error(e)
+
+    def _read_repository_config(self) -> dict[str, str]:
+        """Read the chart repositories Helm already knows about.
+
+        Returns
+        -------
+        dict of str
+            Mapping of repository names to their URLs, without any trailing
+            slash. Empty if Helm has no repository configuration.
+        """
+        config = self._get_helm_env().get("HELM_REPOSITORY_CONFIG")
+        if not config:
+            return {}
+        try:
+            data = yaml.safe_load(Path(config).read_text())
+        except FileNotFoundError:
+            return {}
+        repositories = (data or {}).get("repositories") or []
+        return {r["name"]: r["url"].rstrip("/") for r in repositories}
+
+    def _record_dependencies(self, path: Path, inputs: str) -> None:
+        """Record the results of a dependency update of a chart.
+
+        Writes the stamp file used by `_is_dependency_current` and, if the
+        result cache is enabled, stores :file:`Chart.lock` and the dependency
+        charts in the cache.
+
+        Parameters
+        ----------
+        path
+            Path to the chart.
+        inputs
+            Hash of the inputs to the dependency update.
+        """
+        lock_path = path / "Chart.lock"
+        if not lock_path.exists():
+            return
+        charts = self._hash_dependency_charts(path)
+        stamp = {"inputs": inputs, "charts": charts}
+        (path / "charts" / _DEPENDENCY_STAMP).write_text(json.dumps(stamp))
+        if not self._cache:
+            return
+        manifest = {"lock": lock_path.read_text(), "charts": charts}
+        cache_key = hashlib.sha256(f"dependencies\0{inputs}".encode())
+        try:
+            for name, digest in charts.items():
+                if not self._cache.get_file(digest):
+                    self._cache.put_file(digest, path / "charts" / name)
+            self._cache.put(cache_key.hexdigest(), json.dumps(manifest))
+        except OSError as e:
+            self._warn_cache_error(e)
+
+    def _record_lint(self, result: HelmLintResult, start: float) -> None:
+        """Record a lint in the lint history, if there is one.
+
+        The history is only used to report and schedule lints, so a failure
+        to record the lint is reported as a warning and does not change the
+        result of the lint.
+
+        Parameters
+        ----------
+        result
+            Result of the lint.
+        start
+            Monotonic clock time at which Helm was started.
+        """
+        if not self._history:
+            return
+        duration = timedelta(seconds=time.monotonic() - start)
+        try:
+            helm_version = self._get_helm_version()
+            self._history.record(result, duration, helm_version)
+        except (CommandFailedError, OSError, sqlite3.Error) as e:
+            if not self._history_warned:
+                self._history_warned = True
+                msg = f"Warning: Cannot record lint in lint history: {e}\n"
+                sys.stderr.write(msg)
+
+    def _restore_dependencies(self, path: Path, inputs: str) -> bool:
+        """Restore the results of a dependency update from the cache.
+
+        Parameters
+        ----------
+        path
+            Path to the chart.
+        inputs
+            Hash of the current inputs to a dependency update.
+
+        Returns
+        -------
+        bool
+            `True` if :file:`Chart.lock` and the dependency charts were
+            restored from the cache, `False` if the cache is disabled or does
+            not hold a complete result for these inputs.
+        """
+        if not self._cache:
+            return False
+        cache_key = hashlib.sha256(f"dependencies\0{inputs}".encode())
+        cached = self._get_cached(cache_key.hexdigest())
+        if not cached:
+            return False
+        manifest = json.loads(cached)
+        charts_path = path / "charts"
+        try:
+            sources = {}
+            for name, digest in manifest["charts"].items():
+                source = self._cache.get_file(digest)
+                if not source:
+                    return False
+                sources[name] = source
+            charts_path.mkdir(exist_ok=True)
+            for old_archive in charts_path.glob("*.tgz"):
+                old_archive.unlink()
+            for name, source in sources.items():
+                shutil.copyfile(source, charts_path / name)
+        except OSError as e:
+            self._warn_cache_error(e)
+            return False
+        (path / "Chart.lock").write_text(manifest["lock"])
+        stamp = {"inputs": inputs, "charts": manifest["charts"]}
+        (charts_path / _DEPENDENCY_STAMP).write_text(json.dumps(stamp))
+        return True
+
+    def _restore_from_mirror(self, path: Path, inputs: str) -> bool:
+        """Install the dependencies of a chart from the chart mirror.
+
+        Third-party dependencies are copied from the mirror and dependencies
+        referenced with ``file:`` URLs are packaged with :command:`helm
+        package`, which matches what :command:`helm dependency update` does
+        but doesn't need the network.
+
+        Parameters
+        ----------
+        path
+            Path to the chart.
+        inputs
+            Hash of the current inputs to a dependency update.
+
+        Returns
+        -------
+        bool
+            `True` if the dependencies were installed, `False` if there is no
+            mirror, the mirror doesn't hold every third-party dependency, or
+            a local dependency could not be packaged.
+        """
+        if not self._mirror:
+            return False
+        sources = []
+        for dependency in self._get_remote_dependencies(path):
+            source = self._get_mirrored_chart(dependency)
+            if not source:
+                return False
+            sources.append(source)
+        chart = yaml.safe_load((path / "Chart.yaml").read_text())
+        charts_path = path / "charts"
+        charts_path.mkdir(exist_ok=True)
+        for old_archive in charts_path.glob("*.tgz"):
+            old_archive.unlink()
+        for source in sources:
+            shutil.copyfile(source, charts_path / source.name)
+        for dependency in chart.get("dependencies") or []:
+            repository = dependency.get("repository", "")
+            if not repository.startswith("file://"):
+                continue
+            local = path / repository.removeprefix("file://")
+            try:
+                self._helm.capture(
+                    "package",
+                    str(local.resolve()),
+                    "--destination",
+                    str(charts_path),
+                )
+            except CommandFailedError:
+                return False
+        charts = self._hash_dependency_charts(path)
+        stamp = {"inputs": inputs, "charts": charts, "mirror": True}
+        (charts_path / _DEPENDENCY_STAMP).write_text(json.dumps(stamp))
+        return True
+
+    def _warn_cache_error(self, error: OSError) -> None:
+        """Warn that the cache could not be used, only the first time.
+
+        Parameters
+        ----------
+        error
+            Error from the cache.
+        """
+        if not self._cache_warned:
+            self._cache_warned = True
+            sys.stderr.write(
+                f"Warning: Cannot use Helm result cache: {error}\n"
+            )
@@ -0,0 +1,170 @@
+"""Local history of how long Helm takes to lint each chart."""
+
+from __future__ import annotations
+
+import sqlite3
+import statistics
+from collections.abc import Iterator
+from contextlib import closing, contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from safir.datetime import current_datetime
+
+from ..constants import LINT_HISTORY_MAX_RUNS
+from ..models.helm import HelmLintResult, HelmLintStats
+
+__all__ = ["LintHistory"]
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS lint (
+        id INTEGER PRIMARY KEY,
+        application TEXT,
+        environment TEXT NOT NULL,
+        timestamp REAL NOT NULL,
+        duration REAL NOT NULL,
+        success INTEGER NOT NULL,
+        helm_version TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS lint_chart
+        ON lint (application, environment, id);
+"""
+"""Schema of the lint history database."""
+
+
+class LintHistory:
+    """Record of the duration and outcome of each Helm lint.
+
+    The history is stored in a small SQLite database. Only the most recent
+    lints of each chart are kept, so the database does not grow without
+    bound. Each operation opens its own connection, so the same history can
+    be used from multiple threads or processes at the same time.
+
+    Parameters
+    ----------
+    path
+        Path to the SQLite database. It and its parent directory will be
+        created if they do not exist.
+    max_runs
+        Number of recent lints of each chart to keep.
+    """
+
+    def __init__(
+        self, path: Path, *, max_runs: int = LINT_HISTORY_MAX_RUNS
+    ) -> None:
+        self._path = path
+        self._max_runs = max_runs
+
+    def get_durations(self) -> dict[tuple[str | None, str], timedelta]:
+        """Estimate how long each chart takes to lint.
+
+        Returns
+        -------
+        dict of timedelta
+            Median duration of the recorded lints of each chart, keyed by
+            application (`None` for the top-level chart) and environment.
+        """
+        return {
+            chart: timedelta(seconds=statistics.median(d for d, *_ in runs))
+            for chart, runs in self._get_runs().items()
+        }
+
+    def get_stats(self) -> list[HelmLintStats]:
+        """Summarize the recorded lints of each chart.
+
+        Returns
+        -------
+        list of HelmLintStats
+            Summary of each chart, slowest first by median duration.
+        """
+        stats = []
+        for (application, environment), runs in self._get_runs().items():
+            durations = [d for d, *_ in runs]
+            trend = None
+            if len(durations) >= 2:
+                half = len(durations) // 2
+                older = statistics.median(durations[:half])
+                newer = statistics.median(durations[-half:])
+                if older > 0:
+                    trend = (newer - older) / older
+            _, success, helm_version = runs[-1]
+            stats.append(
+                HelmLintStats(
+                    application=application,
+                    environment=environment,
+                    runs=len(runs),
+                    last=timedelta(seconds=durations[-1]),
+                    median=timedelta(seconds=statistics.median(durations)),
+                    trend=trend,
+                    success=success,
+                    helm_version=helm_version,
+                )
+            )
+        stats.sort(
+            key=lambda s: (-s.median, s.application or "", s.environment)
+        )
+        return stats
+
+    def record(
+        self, result: HelmLintResult, duration: timedelta, helm_version: str
+    ) -> None:
+        """Record a lint, discarding the oldest lints of that chart.
+
+        Parameters
+        ----------
+        result
+            Result of the lint.
+        duration
+            How long the lint took.
+        helm_version
+            Version of Helm that ran the lint.
+        """
+        chart = (result.application, result.environment)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO lint (application, environment, timestamp,"
+                " duration, success, helm_version)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    *chart,
+                    current_datetime(microseconds=True).timestamp(),
+                    duration.total_seconds(),
+                    result.success,
+                    helm_version,
+                ),
+            )
+            conn.execute(
+                "DELETE FROM lint WHERE application IS ? AND environment = ?"
+                " AND id NOT IN (SELECT id FROM lint WHERE application IS ?"
+                " AND environment = ? ORDER BY id DESC LIMIT ?)",
+                (*chart, *chart, self._max_runs),
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open the database in a transaction, creating it if necessary."""
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(self._path, timeout=30)) as conn:
+            conn.executescript(_SCHEMA)
+            with conn:
+                yield conn
+
+    def _get_runs(
+        self,
+    ) -> dict[tuple[str | None, str], list[tuple[float, bool, str]]]:
+        """Retrieve the recorded lints of each chart, oldest first."""
+        if not self._path.exists():
+            return {}
+        runs: dict[tuple[str | None, str], list[tuple[float, bool, str]]] = {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT application, environment, duration, success,"
+                " helm_version FROM lint ORDER BY id"
+            )
+            for application, environment, *run in rows:
+                duration, success, helm_version = run
+                chart = (application, environment)
+                runs.setdefault(chart, []).append(
+                    (duration, bool(success), helm_version)
+                )
+        return runs
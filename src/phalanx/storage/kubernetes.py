@@ -2,22 +2,281 @@
 
 from __future__ import annotations
 
+import json
+import math
+import re
+import subprocess
+import time
+from collections.abc import Callable, Iterable
+from datetime import timedelta
+from threading import Condition, Lock, Thread
+from typing import Any
+
+import httpx
+
+from ..exceptions import KubernetesError
 from ..models.vault import VaultCredentials
 from .command import Command
 
 __all__ = ["KubernetesStorage"]
 
+_PROXY_REGEX = re.compile(r"Starting to serve on 127\.0\.0\.1:(?P<port>\d+)")
+"""Regex matching the line in which kubectl reports the proxy port."""
+
+
+def _check_daemonset(daemonset: dict[str, Any]) -> tuple[bool, str]:
+    """Check the rollout status of a ``DaemonSet``.
+
+    Parameters
+    ----------
+    daemonset
+        The ``DaemonSet`` object.
+
+    Returns
+    -------
+    tuple
+        Whether the rollout is complete, and a description of its status.
+    """
+    metadata = daemonset["metadata"]
+    status = daemonset.get("status", {})
+    if metadata.get("generation", 0) > status.get("observedGeneration", 0):
+        return False, "Waiting for spec update to be observed"
+    desired = status.get("desiredNumberScheduled", 0)
+    updated = status.get("updatedNumberScheduled", 0)
+    if updated < desired:
+        return False, f"{updated} of {desired} new pods have been updated"
+    available = status.get("numberAvailable", 0)
+    if available < desired:
+        return False, f"{available} of {desired} updated pods are available"
+    return True, "Successfully rolled out"
+
+
+def _check_deployment(deployment: dict[str, Any]) -> tuple[bool, str]:
+    """Check the rollout status of a ``Deployment``.
+
+    Parameters
+    ----------
+    deployment
+        The ``Deployment`` object.
+
+    Returns
+    -------
+    tuple
+        Whether the rollout is complete, and a description of its status.
+
+    Raises
+    ------
+    KubernetesError
+        Raised if the rollout exceeded its progress deadline.
+    """
+    metadata = deployment["metadata"]
+    status = deployment.get("status", {})
+    if metadata.get("generation", 0) > status.get("observedGeneration", 0):
+        return False, "Waiting for spec update to be observed"
+    for condition in status.get("conditions", []):
+        if condition.get("reason") == "ProgressDeadlineExceeded":
+            name = metadata["name"]
+            msg = f"deployment/{name} exceeded its progress deadline"
+            raise KubernetesError(msg)
+    replicas = deployment.get("spec", {}).get("replicas", 1)
+    updated = status.get("updatedReplicas", 0)
+    if updated < replicas:
+        return False, f"{updated} of {replicas} replicas have been updated"
+    old = status.get("replicas", 0) - updated
+    if old > 0:
+        return False, f"{old} old replicas are pending termination"
+    available = status.get("availableReplicas", 0)
+    if available < updated:
+        return (
+            False,
+            f"{available} of {updated} updated replicas are available",
+        )
+    return True, "Successfully rolled out"
+
+
+def _check_statefulset(statefulset: dict[str, Any]) -> tuple[bool, str]:
+    """Check the rollout status of a ``StatefulSet``.
+
+    Parameters
+    ----------
+    statefulset
+        The ``StatefulSet`` object.
+
+    Returns
+    -------
+    tuple
+        Whether the rollout is complete, and a description of its status.
+    """
+    metadata = statefulset["metadata"]
+    spec = statefulset.get("spec", {})
+    status = statefulset.get("status", {})
+    observed = status.get("observedGeneration", 0)
+    if not observed or metadata.get("generation", 0) > observed:
+        return False, "Waiting for spec update to be observed"
+    replicas = spec.get("replicas", 1)
+    ready = status.get("readyReplicas", 0)
+    if ready < replicas:
+        return False, f"{ready} of {replicas} pods are ready"
+    update = spec.get("updateStrategy", {}).get("rollingUpdate", {})
+    partition = update.get("partition", 0)
+    updated = status.get("updatedReplicas", 0)
+    if partition:
+        expected = replicas - partition
+        if updated < expected:
+            return False, f"{updated} of {expected} new pods have been updated"
+        return True, "Successfully rolled out"
+    if status.get("updateRevision") != status.get("currentRevision"):
+        return False, f"{updated} of {replicas} pods have been updated"
+    return True, "Successfully rolled out"
+
+
+_ROLLOUT_KINDS: dict[
+    str, tuple[str, Callable[[dict[str, Any]], tuple[bool, str]]]
+] = {
+    "daemonset": ("daemonsets", _check_daemonset),
+    "deployment": ("deployments", _check_deployment),
+    "statefulset": ("statefulsets", _check_statefulset),
+}
+"""API resource name and status check for each kind of rollout."""
+
+
+class _RolloutTracker:
+    """Track the status of a set of rollouts watched by several threads.
+
+    Parameters
+    ----------
+    names
+        Names of the rollouts in the form ``<kind>/<name>``.
+    progress
+        If given, called with the name of a rollout and a description of its
+        status whenever that status changes. It is called from the thread
+        running `wait`, not the threads watching the rollouts.
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        progress: Callable[[str, str], None] | None,
+    ) -> None:
+        self._pending = set(names)
+        self._progress = progress
+        self._status: dict[str, str] = {}
+        self._reports: list[tuple[str, str]] = []
+        self._error: Exception | None = None
+        self._condition = Condition()
+
+    def fail(self, error: Exception) -> None:
+        """Record that a rollout failed or could not be watched.
+
+        Parameters
+        ----------
+        error
+            Exception describing the failure.
+        """
+        with self._condition:
+            self._error = self._error or error
+            self._condition.notify_all()
+
+    def is_done(self) -> bool:
+        """Check whether all rollouts are complete or one has failed.
+
+        Returns
+        -------
+        bool
+            `True` if there is nothing left to wait for.
+        """
+        with self._condition:
+            return not self._pending or self._error is not None
+
+    def update(self, name: str, *, ready: bool, status: str) -> None:
+        """Record the status of a rollout.
+
+        Parameters
+        ----------
+        name
+            Name of the rollout.
+        ready
+            Whether the rollout is complete.
+        status
+            Description of the status of the rollout.
+        """
+        with self._condition:
+            if ready:
+                self._pending.discard(name)
+            if self._status.get(name) != status:
+                self._status[name] = status
+                self._reports.append((name, status))
+            self._condition.notify_all()
+
+    def wait(self, deadline: float) -> None:
+        """Wait for all rollouts to complete, reporting their progress.
+
+        Parameters
+        ----------
+        deadline
+            Time, as returned by `time.monotonic`, by which all rollouts must
+            be complete.
+
+        Raises
+        ------
+        KubernetesError
+            Raised if a rollout failed or did not complete by the deadline.
+        """
+        while True:
+            with self._condition:
+                while not self._reports and self._pending and not self._error:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        names = ", ".join(sorted(self._pending))
+                        msg = f"Rollout of {names} did not finish in time"
+                        raise KubernetesError(msg)
+                    self._condition.wait(remaining)
+                reports, self._reports = self._reports, []
+                done = not self._pending
+                error = self._error
+            if self._progress:
+                for name, status in reports:
+                    self._progress(name, status)
+            if error:
+                raise error
+            if done:
+                return
+
 
 class KubernetesStorage:
     """Storage layer for direct Kubernetes operations.
 
     Used primarily by the installer. This uses :command:`kubectl` directly
     rather than one of the Python Kubernetes libraries since it seemed simpler
-    at the time.
+    at the time. Watching rollouts uses the Kubernetes API, which is reached
+    through a single :command:`kubectl proxy` so that :command:`kubectl`
+    still handles authentication. The proxy is started when first needed and
+    is reused until `close` is called.
+
+    Parameters
+    ----------
+    api_url
+        Base URL of the Kubernetes API. If not given, the API is reached
+        through :command:`kubectl proxy`.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, api_url: str | None = None) -> None:
+        self._api_url = api_url
         self._kubectl = Command("kubectl")
+        self._lock = Lock()
+        self._client: httpx.Client | None = None
+        self._proxy: subprocess.Popen[str] | None = None
+
+    def close(self) -> None:
+        """Close the connection to the Kubernetes API and stop any proxy."""
+        with self._lock:
+            if self._client:
+                self._client.close()
+                self._client = None
+            if self._proxy:
+                self._proxy.terminate()
+                self._proxy.wait()
+                self._proxy = None
 
     def create_namespace(
         self, namespace: str, *, ignore_fail: bool = False
@@ -68,16 +327,307 @@ class KubernetesStorage:
         result = self._kubectl.capture("config", "current-context")
         return result.stdout.strip()
 
-    def wait_for_rollout(self, name: str, namespace: str) -> None:
-        """Wait for a Kubernetes rollout to complete.
+    def wait_for_rollouts(
+        self,
+        names: Iterable[str],
+        namespace: str,
+        *,
+        timeout: timedelta = timedelta(minutes=5),
+        progress: Callable[[str, str], None] | None = None,
+    ) -> None:
+        """Wait for several Kubernetes rollouts to complete.
+
+        Rather than running :command:`kubectl rollout status` for each
+        rollout in turn, watch all of the objects of each kind at once using
+        the Kubernetes watch API, and return as soon as all of them are
+        ready or one of them fails.
+
+        A watch request covers only one resource type, so a single stream
+        cannot watch both a ``Deployment`` and a ``StatefulSet``. There is
+        therefore one stream, in its own thread, per kind of object, shared
+        by all of the objects of that kind. All of the streams use the same
+        client and :command:`kubectl proxy`.
 
         Parameters
         ----------
-        name
-            Name of the rollout. This should be the type of object (usually
-            either ``deployment`` or ``statefulset``, followed by a slash and
-            the name of the object.
+        names
+            Names of the rollouts. Each should be the type of object
+            (``daemonset``, ``deployment``, or ``statefulset``), followed by a
+            slash and the name of the object.
+        namespace
+            Namespace in which the rollouts are happening.
+        timeout
+            How long to wait for all of the rollouts to complete.
+        progress
+            If given, called with the name of a rollout and a description of
+            its status whenever that status changes. It is always called from
+            the calling thread, so any output capture of the caller applies.
+
+        Raises
+        ------
+        KubernetesError
+            Raised if one of the objects does not exist, or a rollout failed,
+            did not complete within the timeout, or could not be watched.
+        ValueError
+            Raised if one of the names is not a supported type of object.
+        """
+        names = list(names)
+        objects: dict[str, set[str]] = {}
+        for name in names:
+            kind, _, object_name = name.partition("/")
+            if kind not in _ROLLOUT_KINDS or not object_name:
+                raise ValueError(f"Unsupported rollout {name}")
+            objects.setdefault(kind, set()).add(object_name)
+        if not names:
+            return
+        deadline = time.monotonic() + timeout.total_seconds()
+        tracker = _RolloutTracker(names, progress)
+        client = self._get_client()
+        for kind, kind_objects in objects.items():
+            Thread(
+                target=self._watch_rollouts,
+                args=(client, kind, namespace, kind_objects, tracker),
+                kwargs={"deadline": deadline},
+                daemon=True,
+            ).start()
+        tracker.wait(deadline)
+
+    def _get_client(self) -> httpx.Client:
+        """Get the client for the Kubernetes API, starting a proxy if needed.
+
+        Returns
+        -------
+        httpx.Client
+            Client for the Kubernetes API.
+
+        Raises
+        ------
+        KubernetesError
+            Raised if the proxy could not be started.
+        """
+        with self._lock:
+            if not self._client:
+                url = self._api_url or self._start_proxy()
+                self._client = httpx.Client(base_url=url, timeout=30)
+            return self._client
+
+    def _list_rollouts(
+        self,
+        client: httpx.Client,
+        kind: str,
+        namespace: str,
+        objects: set[str],
+        tracker: _RolloutTracker,
+    ) -> str:
+        """Report the current status of objects of one kind to a tracker.
+
+        Parameters
+        ----------
+        client
+            Client for the Kubernetes API.
+        kind
+            Kind of the objects (such as ``deployment``).
+        namespace
+            Namespace of the objects.
+        objects
+            Names of the objects.
+        tracker
+            Tracker to which to report status.
+
+        Returns
+        -------
+        str
+            Resource version of the list, from which to watch for changes.
+
+        Raises
+        ------
+        KubernetesError
+            Raised if the list fails, one of the objects does not exist, or a
+            rollout has failed.
+        httpx.HTTPError
+            Raised if the Kubernetes API could not be reached.
+        """
+        resource, check = _ROLLOUT_KINDS[kind]
+        path = f"/apis/apps/v1/namespaces/{namespace}/{resource}"
+        response = client.get(path)
+        if response.is_error:
+            msg = (
+                f"Cannot list {resource} in {namespace}:"
+                f" status {response.status_code}: {response.text}"
+            )
+            raise KubernetesError(msg)
+        data = response.json()
+        missing = set(objects)
+        for obj in data["items"]:
+            name = obj["metadata"]["name"]
+            if name in objects:
+                missing.discard(name)
+                ready, status = check(obj)
+                tracker.update(f"{kind}/{name}", ready=ready, status=status)
+        if missing:
+            names = ", ".join(f"{kind}/{n}" for n in sorted(missing))
+            raise KubernetesError(f"{names} not found in {namespace}")
+        return data["metadata"]["resourceVersion"]
+
+    def _start_proxy(self) -> str:
+        """Start a proxy to the Kubernetes API.
+
+        Must be called with the lock held.
+
+        Returns
+        -------
+        str
+            Base URL through which the Kubernetes API can be reached.
+
+        Raises
+        ------
+        KubernetesError
+            Raised if the proxy could not be started.
+        """
+        process = self._kubectl.start("proxy", "--port", "0")
+        stdout = process.stdout
+        match = _PROXY_REGEX.match(stdout.readline()) if stdout else None
+        if not stdout or not match:
+            process.terminate()
+            process.wait()
+            raise KubernetesError("Cannot start kubectl proxy")
+
+        # Keep reading standard output so that kubectl never blocks on a full
+        # pipe.
+        Thread(target=stdout.read, daemon=True).start()
+        self._proxy = process
+        return f"http://127.0.0.1:{match.group('port')}"
+
+    def _watch_rollouts(
+        self,
+        client: httpx.Client,
+        kind: str,
+        namespace: str,
+        objects: set[str],
+        tracker: _RolloutTracker,
+        *,
+        deadline: float,
+    ) -> None:
+        """Watch objects of one kind and report their status to a tracker.
+
+        Runs in a separate thread until there is nothing left to wait for or
+        the deadline passes. Errors are reported to the tracker rather than
+        raised.
+
+        Parameters
+        ----------
+        client
+            Client for the Kubernetes API.
+        kind
+            Kind of the objects (such as ``deployment``).
+        namespace
+            Namespace of the objects.
+        objects
+            Names of the objects to watch.
+        tracker
+            Tracker to which to report status.
+        deadline
+            Time, as returned by `time.monotonic`, at which to give up.
+        """
+        resource, _ = _ROLLOUT_KINDS[kind]
+        try:
+            while not tracker.is_done():
+                remaining = math.ceil(deadline - time.monotonic())
+                if remaining <= 0:
+                    return
+                self._watch_rollouts_once(
+                    client,
+                    kind,
+                    namespace,
+                    objects,
+                    tracker,
+                    timeout=remaining,
+                )
+        except KubernetesError as e:
+            tracker.fail(e)
+        except (httpx.HTTPError, ValueError) as e:
+            msg = f"Cannot watch {resource} in {namespace}: {e!s}"
+            tracker.fail(KubernetesError(msg))
+
+    def _watch_rollouts_once(
+        self,
+        client: httpx.Client,
+        kind: str,
+        namespace: str,
+        objects: set[str],
+        tracker: _RolloutTracker,
+        *,
+        timeout: int,
+    ) -> None:
+        """List and then watch objects, reporting their status to a tracker.
+
+        Like :command:`kubectl rollout status`, the objects are retrieved
+        first so that a missing object fails at once rather than waiting for
+        an event that will never come. Changes are then watched from the
+        resource version of that list.
+
+        Returns when the tracker is done, or when the API server ends the
+        watch, such as when its timeout expires or its resource version has
+        become too old.
+
+        Parameters
+        ----------
+        client
+            Client for the Kubernetes API.
+        kind
+            Kind of the objects (such as ``deployment``).
         namespace
-            Namespace in which the rollout is happening.
+            Namespace of the objects.
+        objects
+            Names of the objects to watch.
+        tracker
+            Tracker to which to report status.
+        timeout
+            Timeout of the watch in seconds.
+
+        Raises
+        ------
+        KubernetesError
+            Raised if the list or watch fails, one of the objects does not
+            exist, or a rollout has failed.
+        httpx.HTTPError
+            Raised if the Kubernetes API could not be reached.
         """
-        self._kubectl.run("-n", namespace, "rollout", "status", name)
+        resource, check = _ROLLOUT_KINDS[kind]
+        path = f"/apis/apps/v1/namespaces/{namespace}/{resource}"
+        version = self._list_rollouts(
+            client, kind, namespace, objects, tracker
+        )
+        if tracker.is_done():
+            return
+        params = {
+            "watch": "true",
+            "resourceVersion": version,
+            "timeoutSeconds": str(timeout),
+        }
+        with client.stream(
+            "GET", path, params=params, timeout=timeout + 5
+        ) as response:
+            if response.is_error:
+                response.read()
+                msg = (
+                    f"Cannot watch {resource} in {namespace}:"
+                    f" status {response.status_code}: {response.text}"
+                )
+                raise KubernetesError(msg)
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "ERROR":
+                    return
+                name = event["object"]["metadata"]["name"]
+                if name not in objects:
+                    continue
+                if event["type"] == "DELETED":
+                    ready, status = False, "Deleted"
+                else:
+                    ready, status = check(event["object"])
+                tracker.update(f"{kind}/{name}", ready=ready, status=status)
+                if tracker.is_done():
+                    return
@@ -4,11 +4,15 @@ from __future__ import annotations
 
 import os
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 
 from onepasswordconnectsdk import new_client
 from onepasswordconnectsdk.client import FailedToRetrieveItemException
+from onepasswordconnectsdk.models import Item
 from pydantic import SecretStr
 
+from ..constants import ONEPASSWORD_CONCURRENCY
 from ..exceptions import (
     MissingOnepasswordSecretsError,
     NoOnepasswordCredentialsError,
@@ -26,7 +30,9 @@ class OnepasswordClient:
     using the metadata of a Phalanx environment by `OnepasswordStorage`.
 
     The 1Password Connect authentication token is taken from the
-    ``OP_CONNECT_TOKEN`` environment variable, which must be set.
+    ``OP_CONNECT_TOKEN`` environment variable, which must be set. All
+    requests share the connection pool of a single HTTP client, so the
+    client may be used from multiple threads.
 
     Parameters
     ----------
@@ -73,23 +79,28 @@ class OnepasswordClient:
         # the onepasswordconnectsdk Python library appears to turn that into
         # separate queries per item anyway, it can't handle fields whose names
         # contain periods, and it means we don't know what items are missing
-        # for error reporting. It seems better to do the work directly.
+        # for error reporting. It seems better to do the work directly,
+        # retrieving all of the items, including the pull secret and Vault
+        # write token, concurrently.
+        titles = [*query.keys(), "pull-secret", "vault-write-token"]
+        workers = min(ONEPASSWORD_CONCURRENCY, len(titles))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(self._get_item, titles)
+            items = dict(zip(titles, results, strict=True))
+
+        # Extract the requested fields from each item.
         not_found = []
         for application, secrets in query.items():
-            try:
-                item = self._onepassword.get_item(application, self._vault_id)
-            except FailedToRetrieveItemException:
+            item = items[application]
+            if not item:
                 not_found.append(application)
                 continue
+            fields = self._index_fields(item)
             for secret in secrets:
-                found = False
-                for field in item.fields:
-                    if field.label == secret:
-                        static_secret = StaticSecret(value=field.value)
-                        applications[application][secret] = static_secret
-                        found = True
-                        break
-                if not found:
+                if secret in fields:
+                    static_secret = StaticSecret(value=fields[secret])
+                    applications[application][secret] = static_secret
+                else:
                     not_found.append(f"{application} {secret}")
 
         # If any secrets weren't found, raise an exception with the list of
@@ -100,12 +111,37 @@ class OnepasswordClient:
         # Return the static secrets.
         return StaticSecrets(
             applications=applications,
-            pull_secret=self._get_pull_secret(),
-            vault_write_token=self._get_vault_write_token(),
+            pull_secret=self._get_pull_secret(items["pull-secret"]),
+            vault_write_token=self._get_vault_write_token(
+                items["vault-write-token"]
+            ),
         )
 
-    def _get_pull_secret(self) -> PullSecret | None:
-        """Get the pull secret for an environment from 1Password.
+    def _get_item(self, title: str) -> Item | None:
+        """Retrieve an item from 1Password.
+
+        Parameters
+        ----------
+        title
+            Title of the item.
+
+        Returns
+        -------
+        Item or None
+            Item, or `None` if it does not exist.
+        """
+        try:
+            return self._onepassword.get_item(title, self._vault_id)
+        except FailedToRetrieveItemException:
+            return None
+
+    def _get_pull_secret(self, item: Item | None) -> PullSecret | None:
+        """Get the pull secret for an environment from its 1Password item.
+
+        Parameters
+        ----------
+        item
+            1Password item for the pull secret, or `None` if there is none.
 
         Returns
         -------
@@ -113,9 +149,7 @@ class OnepasswordClient:
             The constructed pull secret in a form suitable for adding to
             Vault, or `None` if there is no pull secret for this environment.
         """
-        try:
-            item = self._onepassword.get_item("pull-secret", self._vault_id)
-        except FailedToRetrieveItemException:
+        if not item:
             return None
 
         # Extract the usernames and passwords from the 1Password item.
@@ -134,26 +168,47 @@ class OnepasswordClient:
         # Return the result converted to the appropriate model.
         return PullSecret.model_validate({"registries": secrets})
 
-    def _get_vault_write_token(self) -> SecretStr | None:
+    def _get_vault_write_token(self, item: Item | None) -> SecretStr | None:
         """Get the Vault write token for an environment from 1Password.
 
+        Parameters
+        ----------
+        item
+            1Password item for the Vault write token, or `None` if there is
+            none.
+
         Returns
         -------
         SecretStr or None
             Vault write token for the configured environment, or `None` if
             it isn't present in 1Password.
         """
-        try:
-            item = self._onepassword.get_item(
-                "vault-write-token", self._vault_id
-            )
-        except FailedToRetrieveItemException:
+        if not item:
             return None
-        for field in item.fields:
-            if field.label == "vault-token":
-                return SecretStr(field.value)
+        fields = self._index_fields(item)
+        if "vault-token" in fields:
+            return SecretStr(fields["vault-token"])
         return None
 
+    def _index_fields(self, item: Item) -> dict[str, Any]:
+        """Index the fields of a 1Password item by label.
+
+        Parameters
+        ----------
+        item
+            1Password item.
+
+        Returns
+        -------
+        dict
+            Mapping of field labels to values. If more than one field has the
+            same label, the first one is used.
+        """
+        fields: dict[str, Any] = {}
+        for field in item.fields or []:
+            fields.setdefault(field.label, field.value)
+        return fields
+
 
 class OnepasswordStorage:
     """Create 1Password Connect clients for specific environments."""
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from datetime import timedelta
 
@@ -9,6 +10,7 @@ import hvac
 from hvac.exceptions import Forbidden, InvalidPath
 from pydantic import SecretStr
 
+from ..constants import VAULT_CONCURRENCY
 from ..exceptions import VaultNotFoundError
 from ..models.environments import EnvironmentBaseConfig
 from ..models.vault import (
@@ -40,6 +42,9 @@ class VaultClient:
         URL of the configured Vault server.
     path
         Prefix path within Vault where secrets are stored.
+    concurrency
+        Maximum number of concurrent requests to make to Vault when reading
+        or writing the secrets for all applications.
 
     Parameters
     ----------
@@ -52,6 +57,9 @@ class VaultClient:
         Credentials to use for authentication. If this is not set, fall back
         on the default library behavior of getting the token from the
         environment or the user's home directory.
+    concurrency
+        Maximum number of concurrent requests to make to Vault when reading
+        or writing the secrets for all applications.
     """
 
     def __init__(
@@ -59,9 +67,12 @@ class VaultClient:
         url: str,
         path: str,
         credentials: VaultCredentials | None = None,
+        *,
+        concurrency: int = VAULT_CONCURRENCY,
     ) -> None:
         self.url = url
         _, self.path = path.split("/", 1)
+        self.concurrency = concurrency
         self._vault = hvac.Client(url)
         self._vault.secrets.kv.default_kv_version = 2
         match credentials:
@@ -237,17 +248,35 @@ class VaultClient:
     def get_environment_secrets(self) -> dict[str, dict[str, SecretStr]]:
         """Get the secrets for an environment currently stored in Vault.
 
+        The secrets for each application are retrieved concurrently, up to
+        the concurrency limit of the client. Applications whose secrets
+        cannot be found are skipped.
+
         Returns
         -------
         dict of dict
             Mapping from application to secret key to its secret from Vault.
+
+        Raises
+        ------
+        VaultNotFoundError
+            Raised if the path for application secrets does not exist or if
+            the Vault server returned a permission denied error.
         """
-        vault_secrets = {}
-        for application in self.list_application_secrets():
-            with suppress(VaultNotFoundError):
-                vault_secret = self.get_application_secret(application)
-                vault_secrets[application] = vault_secret
-        return vault_secrets
+        applications = self.list_application_secrets()
+        workers = min(self.concurrency, len(applications))
+        if workers <= 1:
+            secrets = [self._get_secret_if_found(a) for a in applications]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                secrets = list(
+                    pool.map(self._get_secret_if_found, applications)
+                )
+        return {
+            a: s
+            for a, s in zip(applications, secrets, strict=True)
+            if s is not None
+        }
 
     def get_policy(self, name: str) -> str | None:
         """Get the contents of a Vault policy.
@@ -372,25 +401,57 @@ class VaultClient:
         self._vault.secrets.kv.create_or_update_secret(path, secret)
 
     def update_application_secret(
-        self, application: str, key: str, value: SecretStr
+        self, application: str, values: dict[str, SecretStr]
     ) -> None:
-        """Update the value of a specific secret key.
+        """Update the values of some secret keys for an application.
+
+        Any other keys in the application's secret are left unchanged.
 
         Parameters
         ----------
         application
             Name of the application.
-        key
-            Key within that application's secret to update.
-        value
-            New value for that secret key.
+        values
+            Secret key and value pairs to update.
         """
         path = f"{self.path}/{application}"
-        self._vault.secrets.kv.patch(path, {key: value.get_secret_value()})
+        secret = {k: v.get_secret_value() for k, v in values.items()}
+        self._vault.secrets.kv.patch(path, secret)
+
+    def _get_secret_if_found(
+        self, application: str
+    ) -> dict[str, SecretStr] | None:
+        """Get the secrets for an application, if they exist.
+
+        Parameters
+        ----------
+        application
+            Name of the application.
+
+        Returns
+        -------
+        dict of pydantic.types.SecretStr or None
+            Mapping from secret key to its secret from Vault, or `None` if
+            there is no secret for that application.
+        """
+        try:
+            return self.get_application_secret(application)
+        except VaultNotFoundError:
+            return None
 
 
 class VaultStorage:
-    """Create Vault clients for specific environments."""
+    """Create Vault clients for specific environments.
+
+    Parameters
+    ----------
+    concurrency
+        Maximum number of concurrent requests each created client should make
+        to Vault when reading or writing the secrets for all applications.
+    """
+
+    def __init__(self, *, concurrency: int = VAULT_CONCURRENCY) -> None:
+        self._concurrency = concurrency
 
     def get_vault_client(
         self,
@@ -428,4 +489,9 @@ class VaultStorage:
             path_prefix = env.vault_path_prefix
         if not env.vault_url:
             raise ValueError("vaultUrl not set for this environment")
-        return VaultClient(str(env.vault_url), path_prefix, credentials)
+        return VaultClient(
+            str(env.vault_url),
+            path_prefix,
+            credentials,
+            concurrency=self._concurrency,
+        )
@@ -0,0 +1,98 @@
+"""Watch the Phalanx configuration for changed files."""
+
+from __future__ import annotations
+
+import os
+import time
+from collections.abc import Iterable, Iterator
+from datetime import timedelta
+from pathlib import Path
+
+from ..constants import WATCH_INTERVAL
+
+__all__ = ["FileWatcher"]
+
+
+class FileWatcher:
+    """Watch directory trees for changed files by polling.
+
+    Polling is used rather than an operating system notification mechanism
+    such as inotify so that no additional dependencies are required and the
+    watcher behaves the same on every platform. Scanning the Phalanx
+    configuration only requires a :manpage:`stat(2)` call per file, which is
+    fast enough to do a few times a second.
+
+    The watcher is iterable. Each iteration blocks until some files have
+    changed and then returns the set of changed paths. Changes are batched
+    until a full polling interval passes with no further changes so that, for
+    example, switching Git branches produces one batch rather than many.
+
+    Parameters
+    ----------
+    paths
+        Directories to watch. Directories that do not exist are ignored until
+        they are created.
+    interval
+        How often to poll for changes.
+    """
+
+    def __init__(
+        self, paths: Iterable[Path], *, interval: timedelta = WATCH_INTERVAL
+    ) -> None:
+        self._paths = list(paths)
+        self._interval = interval.total_seconds()
+        self._state = self._scan()
+
+    def __iter__(self) -> Iterator[set[Path]]:
+        while True:
+            yield self.wait()
+
+    def poll(self) -> set[Path]:
+        """Check once for changed files.
+
+        Returns
+        -------
+        set of pathlib.Path
+            Paths to all files that were created, modified, or deleted since
+            the last check. Deleted files are included even though they no
+            longer exist.
+        """
+        state = self._scan()
+        changed = {
+            p
+            for p in state.keys() | self._state.keys()
+            if state.get(p) != self._state.get(p)
+        }
+        self._state = state
+        return changed
+
+    def wait(self) -> set[Path]:
+        """Wait for files to change.
+
+        Returns
+        -------
+        set of pathlib.Path
+            Paths to all files that were created, modified, or deleted.
+        """
+        changed: set[Path] = set()
+        while True:
+            time.sleep(self._interval)
+            new = self.poll()
+            if new:
+                changed.update(new)
+            elif changed:
+                return changed
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        """Gather the modification time and size of every watched file."""
+        state = {}
+        for root in self._paths:
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = Path(dirpath) / filename
+                    try:
+                        stat = path.stat()
+                    except FileNotFoundError:
+                        continue
+                    state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
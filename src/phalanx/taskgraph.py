@@ -0,0 +1,259 @@
+"""Run a graph of dependent tasks concurrently."""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import timedelta
+
+from .output import capture_output, redirect_captured_output
+
+__all__ = [
+    "Task",
+    "TaskGraph",
+    "TaskResult",
+]
+
+
+def _ignore(task: object) -> None:
+    """Discard a report of a task when no callback was given."""
+
+
+@dataclass(frozen=True)
+class Task:
+    """A task in a `TaskGraph`."""
+
+    name: str
+    """Unique name of the task."""
+
+    run: Callable[[], None]
+    """Function that performs the task."""
+
+    after: tuple[str, ...] = ()
+    """Names of the tasks that must finish before this task can start."""
+
+    title: str = ""
+    """Human-readable description of the task, or empty to use the name."""
+
+
+@dataclass(frozen=True)
+class TaskResult:
+    """Result of running a task in a `TaskGraph`."""
+
+    task: Task
+    """Task that was run."""
+
+    elapsed: timedelta
+    """How long the task took."""
+
+    output: str
+    """Captured output of the task, or empty if output was not captured."""
+
+    error: BaseException | None = None
+    """Exception raised by the task, if it failed."""
+
+    @property
+    def status(self) -> str:
+        """Description of how the task finished and how long it took."""
+        seconds = self.elapsed.total_seconds()
+        if self.error:
+            return f"Failed after {seconds:.1f}s"
+        return f"Finished in {seconds:.1f}s"
+
+
+class TaskGraph:
+    """Graph of tasks, each of which may depend on other tasks.
+
+    Tasks are added along with the names of the tasks they depend on, and
+    then the whole graph is run. Each task is started as soon as all of its
+    dependencies have finished, so independent tasks run concurrently in
+    separate threads. Tasks are expected to spend most of their time waiting
+    for external commands.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: dict[str, Task] = {}
+
+    def add(
+        self,
+        name: str,
+        run: Callable[[], None],
+        *,
+        after: Iterable[str] = (),
+        title: str = "",
+    ) -> None:
+        """Add a task to the graph.
+
+        Parameters
+        ----------
+        name
+            Unique name of the task.
+        run
+            Function that performs the task.
+        after
+            Names of the tasks that must finish before this one starts. They
+            need not have been added yet, but must be added before the graph
+            is run.
+        title
+            Human-readable description of the task. Defaults to its name.
+
+        Raises
+        ------
+        ValueError
+            Raised if a task with that name was already added.
+        """
+        if name in self._tasks:
+            raise ValueError(f"Duplicate task {name}")
+        self._tasks[name] = Task(
+            name=name, run=run, after=tuple(after), title=title or name
+        )
+
+    def order(self) -> list[str]:
+        """Determine an order in which the tasks could be run serially.
+
+        Returns
+        -------
+        list of str
+            Names of all tasks, each after all of its dependencies. Ties are
+            broken by the order in which tasks were added.
+
+        Raises
+        ------
+        ValueError
+            Raised if a task depends on a task that doesn't exist or the
+            dependencies contain a cycle.
+        """
+        for task in self._tasks.values():
+            for dependency in task.after:
+                if dependency not in self._tasks:
+                    msg = f"Task {task.name} depends on unknown {dependency}"
+                    raise ValueError(msg)
+        order: list[str] = []
+        done: set[str] = set()
+        while len(order) < len(self._tasks):
+            ready = [
+                t.name
+                for t in self._tasks.values()
+                if t.name not in done and done.issuperset(t.after)
+            ]
+            if not ready:
+                cycle = sorted(set(self._tasks) - done)
+                msg = f"Dependency cycle among tasks {', '.join(cycle)}"
+                raise ValueError(msg)
+            order.extend(ready)
+            done.update(ready)
+        return order
+
+    def run(
+        self,
+        *,
+        jobs: int | None = None,
+        capture: bool = False,
+        started: Callable[[Task], None] | None = None,
+        finished: Callable[[TaskResult], None] | None = None,
+    ) -> None:
+        """Run all of the tasks.
+
+        If a task fails, no further tasks are started, tasks that are
+        already running are allowed to finish, and then the exception from
+        the first failed task is raised.
+
+        Parameters
+        ----------
+        jobs
+            Maximum number of tasks to run at the same time. The default is
+            to not limit concurrency.
+        capture
+            Whether to capture the output of each task, using
+            `~phalanx.output.capture_output`, rather than letting the output
+            of concurrent tasks interleave. The captured output is passed to
+            ``finished``.
+        started
+            If given, called with each task just before it starts.
+        finished
+            If given, called with the result of each task when it finishes.
+            Both callbacks are always called from the thread that called this
+            method, never from the threads running the tasks, so they may
+            print without their output interleaving.
+
+        Raises
+        ------
+        Exception
+            Raised if any task fails.
+        ValueError
+            Raised if a task depends on a task that doesn't exist or the
+            dependencies contain a cycle.
+        """
+        order = self.order()
+        if not order:
+            return
+        report_started = started or _ignore
+        report_finished = finished or _ignore
+        pending = list(order)
+        done: set[str] = set()
+        running: dict[Future[TaskResult], str] = {}
+        error: BaseException | None = None
+        redirect = redirect_captured_output() if capture else nullcontext()
+        pool = ThreadPoolExecutor(max_workers=jobs or len(order))
+        with redirect, pool:
+            while pending or running:
+                if not error:
+                    for name in list(pending):
+                        task = self._tasks[name]
+                        if done.issuperset(task.after):
+                            pending.remove(name)
+                            report_started(task)
+                            future = pool.submit(
+                                self._run_task, task, capture=capture
+                            )
+                            running[future] = name
+                if not running:
+                    break
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    name = running.pop(future)
+                    result = future.result()
+                    if result.error:
+                        error = error or result.error
+                    else:
+                        done.add(name)
+                    report_finished(result)
+        if error:
+            raise error
+
+    def _run_task(self, task: Task, *, capture: bool) -> TaskResult:
+        """Run a single task, optionally capturing its output.
+
+        Parameters
+        ----------
+        task
+            Task to run.
+        capture
+            Whether to capture the output of the task.
+
+        Returns
+        -------
+        TaskResult
+            Result of the task, including any exception that it raised.
+        """
+        start = time.monotonic()
+        error = None
+        with capture_output() if capture else nullcontext() as output:
+            try:
+                task.run()
+            except Exception as e:
+                error = e
+        return TaskResult(
+            task=task,
+            elapsed=timedelta(seconds=time.monotonic() - start),
+            output=output.getvalue() if output else "",
+            error=error,
+        )
@@ -2,17 +2,25 @@
 
 from __future__ import annotations
 
+import json
+import os
 import shutil
 import subprocess
+from collections.abc import Iterator
+from datetime import timedelta
 from pathlib import Path
+from typing import Any
 from unittest.mock import ANY
 
+import pytest
 import yaml
 from git.repo import Repo
 from git.util import Actor
 
 from phalanx.factory import Factory
 from phalanx.models.applications import Project
+from phalanx.models.helm import HelmLintResult
+from phalanx.storage.cache import get_cache_path
 
 from ..support.cli import run_cli
 from ..support.data import (
@@ -23,18 +31,19 @@ from ..support.data import (
 from ..support.helm import MockHelmCommand
 
 
-def test_add_helm_repos(mock_helm: MockHelmCommand) -> None:
+def test_add_helm_repos(tmp_path: Path, mock_helm: MockHelmCommand) -> None:
     result = run_cli("application", "add-helm-repos", "argocd")
     assert result.output == ""
     assert result.exit_code == 0
     assert mock_helm.call_args_list == [
+        ["env"],
         [
             "repo",
             "add",
             "--force-update",
             "argoproj",
             "https://argoproj.github.io/argo-helm",
-        ]
+        ],
     ]
 
     mock_helm.reset_mock()
@@ -42,6 +51,7 @@ def test_add_helm_repos(mock_helm: MockHelmCommand) -> None:
     assert result.output == ""
     assert result.exit_code == 0
     assert mock_helm.call_args_list == [
+        ["env"],
         [
             "repo",
             "add",
@@ -65,6 +75,62 @@ def test_add_helm_repos(mock_helm: MockHelmCommand) -> None:
         ],
     ]
 
+    # If Helm already knows about some of the repositories, only the missing
+    # ones should be added and only out-of-date indices should be refreshed.
+    repo_config = tmp_path / "repositories.yaml"
+    repo_cache = tmp_path / "repository"
+    repo_cache.mkdir()
+    repositories = [
+        {"name": "argoproj", "url": "https://argoproj.github.io/argo-helm"},
+        {
+            "name": "jupyterhub",
+            "url": "https://jupyterhub.github.io/helm-chart",
+        },
+    ]
+    repo_config.write_text(yaml.safe_dump({"repositories": repositories}))
+    (repo_cache / "argoproj-index.yaml").write_text("")
+    stale = repo_cache / "jupyterhub-index.yaml"
+    stale.write_text("")
+    os.utime(stale, (0, 0))
+
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = None
+        if command[0] == "env":
+            output = (
+                f'HELM_REPOSITORY_CACHE="{repo_cache}"\n'
+                f'HELM_REPOSITORY_CONFIG="{repo_config}"\n'
+            )
+        return subprocess.CompletedProcess(
+            returncode=0, args=command, stdout=output, stderr=None
+        )
+
+    mock_helm.set_capture_callback(callback)
+    mock_helm.reset_mock()
+    result = run_cli("application", "add-helm-repos")
+    assert result.exit_code == 0
+    add_sqre = [
+        "repo",
+        "add",
+        "--force-update",
+        "lsst-sqre",
+        "https://lsst-sqre.github.io/charts/",
+    ]
+    assert mock_helm.call_args_list == [
+        ["env"],
+        add_sqre,
+        ["repo", "update", "jupyterhub"],
+    ]
+
+    # With a freshness interval of zero, every index should be refreshed.
+    mock_helm.reset_mock()
+    result = run_cli("application", "add-helm-repos", "--repo-ttl", "0")
+    assert result.exit_code == 0
+    assert mock_helm.call_args_list[:2] == [["env"], add_sqre]
+    assert sorted(mock_helm.call_args_list[2:]) == [
+        ["repo", "update", "argoproj"],
+        ["repo", "update", "jupyterhub"],
+    ]
+
 
 def test_create(tmp_path: Path) -> None:
     config_path = tmp_path / "phalanx"
@@ -295,6 +361,7 @@ def test_lint(mock_helm: MockHelmCommand) -> None:
     assert result.exit_code == 0
     set_args = read_output_json("idfdev", "lint-set-values")
     assert mock_helm.call_args_list == [
+        ["env"],
         [
             "repo",
             "add",
@@ -302,7 +369,6 @@ def test_lint(mock_helm: MockHelmCommand) -> None:
             "lsst-sqre",
             "https://lsst-sqre.github.io/charts/",
         ],
-        ["repo", "update"],
         ["dependency", "update", "--skip-refresh"],
         [
             "lint",
@@ -329,6 +395,7 @@ def test_lint(mock_helm: MockHelmCommand) -> None:
     assert result.output == expected
     assert result.exit_code == 0
     assert mock_helm.call_args_list == [
+        ["env"],
         [
             "repo",
             "add",
@@ -336,7 +403,6 @@ def test_lint(mock_helm: MockHelmCommand) -> None:
             "lsst-sqre",
             "https://lsst-sqre.github.io/charts/",
         ],
-        ["repo", "update"],
         ["dependency", "update", "--skip-refresh"],
         [
             "lint",
@@ -436,6 +502,152 @@ def test_lint_all(mock_helm: MockHelmCommand) -> None:
     assert mock_helm.call_args_list == expected_calls
 
 
+def test_lint_all_parallel(mock_helm: MockHelmCommand) -> None:
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = None
+        returncode = 0
+        stderr = None
+        if command[0] == "lint":
+            output = "==> Linting .\n[ERROR] templates/: some problem\n"
+            if command[6] == "gafaelfawr/values-minikube.yaml":
+                returncode = 1
+                stderr = "Some error\n"
+        return subprocess.CompletedProcess(
+            returncode=returncode, args=command, stdout=output, stderr=stderr
+        )
+
+    # Run all the lint commands in parallel. The Helm commands may be run in
+    # any order, but the output should be in a stable order and not
+    # interleaved, and the failure of a single pair should fail the lint.
+    mock_helm.set_capture_callback(callback)
+    result = run_cli("application", "lint-all", "--jobs", "4")
+    expected_calls = read_output_json("idfdev", "lint-all-calls")
+    expected = ""
+    for call in expected_calls:
+        if call[0] != "lint":
+            continue
+        application = call[1]
+        environment = call[6].split("/")[1].removeprefix("values-")[:-5]
+        expected += (
+            f"==> Linting {application} (environment {environment})\n"
+            "[ERROR] templates/: some problem\n"
+        )
+        if application == "gafaelfawr" and environment == "minikube":
+            expected += (
+                "Some error\n"
+                "Error: Application gafaelfawr in environment minikube has"
+                " errors\n"
+            )
+    assert result.output == expected
+    assert result.exit_code == 1
+    assert sorted(mock_helm.call_args_list) == sorted(expected_calls)
+
+
+def test_lint_all_cache(
+    tmp_path: Path, mock_helm: MockHelmCommand, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.delenv("PHALANX_NO_CACHE")
+    config_path = tmp_path / "phalanx"
+    shutil.copytree(str(phalanx_test_path()), str(config_path))
+
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = None
+        if command[0] == "version":
+            output = "v3.16.2+g13654a5\n"
+        elif command[0] == "lint":
+            output = "==> Linting .\n"
+        return subprocess.CompletedProcess(
+            returncode=0, args=command, stdout=output, stderr=None
+        )
+
+    # The first run should lint everything and record the results.
+    mock_helm.set_capture_callback(callback)
+    result = run_cli(
+        "application",
+        "lint-all",
+        "--config",
+        str(config_path),
+        needs_config=False,
+    )
+    assert result.exit_code == 0
+    expected_output = result.output
+    assert "==> Linting gafaelfawr (environment idfdev)\n" in expected_output
+    lint_calls = [c for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert len(lint_calls) == 9
+    assert mock_helm.call_args_list.count(["version", "--short"]) == 1
+
+    # The second run should reuse all of the cached results, including the
+    # output, without running helm lint.
+    mock_helm.reset_mock()
+    result = run_cli(
+        "application",
+        "lint-all",
+        "--config",
+        str(config_path),
+        needs_config=False,
+    )
+    assert result.exit_code == 0
+    assert result.output == expected_output
+    assert not [c for c in mock_helm.call_args_list if c[0] == "lint"]
+
+    # Changing a values file changes the chart, so should cause only that
+    # application to be linted again.
+    path = config_path / "applications" / "gafaelfawr" / "values-idfdev.yaml"
+    with path.open("a") as fh:
+        fh.write("foo: bar\n")
+    mock_helm.reset_mock()
+    result = run_cli(
+        "application",
+        "lint-all",
+        "--config",
+        str(config_path),
+        needs_config=False,
+    )
+    assert result.exit_code == 0
+    assert result.output == expected_output
+    lint_calls = [c for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert lint_calls
+    assert all(c[1] == "gafaelfawr" for c in lint_calls)
+
+    # Disabling the cache should lint everything again.
+    mock_helm.reset_mock()
+    result = run_cli(
+        "application",
+        "lint-all",
+        "--no-cache",
+        "--config",
+        str(config_path),
+        needs_config=False,
+    )
+    assert result.exit_code == 0
+    lint_calls = [c for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert len(lint_calls) == 9
+
+
+def test_lint_all_cache_error(
+    mock_helm: MockHelmCommand, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.delenv("PHALANX_NO_CACHE")
+
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = "==> Linting .\n" if command[0] == "lint" else None
+        return subprocess.CompletedProcess(
+            returncode=0, args=command, stdout=output, stderr=None
+        )
+
+    # If the cache cannot be read or written, every chart should still be
+    # linted, with a single warning.
+    cache_path = get_cache_path() / "helm"
+    cache_path.parent.mkdir(parents=True)
+    cache_path.write_text("not a directory\n")
+    mock_helm.set_capture_callback(callback)
+    result = run_cli("application", "lint-all")
+    assert result.exit_code == 0
+    assert result.output.count("Warning: Cannot use Helm result cache") == 1
+    lint_calls = [c for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert len(lint_calls) == 9
+
+
 def test_lint_all_git(tmp_path: Path, mock_helm: MockHelmCommand) -> None:
     upstream_path = tmp_path / "upstream"
     shutil.copytree(str(phalanx_test_path()), str(upstream_path))
@@ -449,15 +661,15 @@ def test_lint_all_git(tmp_path: Path, mock_helm: MockHelmCommand) -> None:
     # Now, make a few changes that should trigger linting.
     #
     # - argocd (only idfdev)
-    # - gafaelfawr (values change so all environments)
+    # - gafaelfawr (change to values used by all environments)
     # - portal (templates deletion so all environments)
     # - postgres (irrelevant change, no linting)
     path = change_path / "applications" / "argocd" / "values-idfdev.yaml"
     with path.open("a") as fh:
         fh.write("foo: bar\n")
     path = change_path / "applications" / "gafaelfawr" / "values.yaml"
-    with path.open("a") as fh:
-        fh.write("foo: bar\n")
+    values = path.read_text()
+    path.write_text(values.replace("\nredis:\n", "\nredis:\n  foo: bar\n"))
     repo.index.remove(
         "applications/portal/templates/vault-secrets.yaml", working_tree=True
     )
@@ -483,6 +695,413 @@ def test_lint_all_git(tmp_path: Path, mock_helm: MockHelmCommand) -> None:
     assert mock_helm.call_args_list == expected_calls
 
 
+def test_lint_all_git_impact(
+    tmp_path: Path, mock_helm: MockHelmCommand
+) -> None:
+    upstream_path = tmp_path / "upstream"
+    shutil.copytree(str(phalanx_test_path()), str(upstream_path))
+
+    # Add shared charts so that nublado depends on base through shared.
+    for name, dependency in (
+        ("base", None),
+        ("shared", "base"),
+        ("other", None),
+    ):
+        chart_path = upstream_path / "charts" / name
+        chart_path.mkdir(parents=True)
+        chart: dict[str, Any] = {"apiVersion": "v2", "name": name}
+        if dependency:
+            repository = f"file://../{dependency}"
+            chart["dependencies"] = [
+                {"name": dependency, "repository": repository}
+            ]
+        (chart_path / "Chart.yaml").write_text(yaml.safe_dump(chart))
+        (chart_path / "values.yaml").write_text("foo: bar\n")
+    path = upstream_path / "applications" / "nublado" / "Chart.yaml"
+    chart = yaml.safe_load(path.read_text())
+    chart["dependencies"] = [
+        {"name": "shared", "repository": "file://../../charts/shared"}
+    ]
+    path.write_text(yaml.safe_dump(chart))
+
+    upstream_repo = Repo.init(str(upstream_path), initial_branch="main")
+    upstream_repo.index.add(["applications", "charts", "environments"])
+    actor = Actor("Someone", "someone@example.com")
+    upstream_repo.index.commit("Initial commit", author=actor, committer=actor)
+    change_path = tmp_path / "change"
+    repo = Repo.clone_from(str(upstream_path), str(change_path))
+
+    # Change the chart that nublado depends on indirectly and the chart that
+    # nothing uses, change the injected values for minikube, and make a
+    # change to idfdev that doesn't affect its injected values.
+    for name in ("base", "other"):
+        path = change_path / "charts" / name / "values.yaml"
+        path.write_text("foo: baz\n")
+    path = change_path / "environments" / "values-minikube.yaml"
+    values = path.read_text()
+    path.write_text(values.replace("lsst.cloud", "example.com"))
+    path = change_path / "environments" / "values-idfdev.yaml"
+    with path.open("a") as fh:
+        fh.write("# Some comment\n")
+    repo.index.add(["charts", "environments"])
+    repo.index.commit("Some changes", author=actor, committer=actor)
+
+    result = run_cli(
+        "application",
+        "lint-all",
+        "--git",
+        "--config",
+        str(change_path),
+        needs_config=False,
+    )
+    assert result.exit_code == 0
+    lint_calls = [c[-3] for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert lint_calls == [
+        "argocd/values-minikube.yaml",
+        "gafaelfawr/values-minikube.yaml",
+        "nublado/values-idfdev.yaml",
+        "postgres/values-minikube.yaml",
+    ]
+
+
+def test_lint_all_git_values(
+    tmp_path: Path, mock_helm: MockHelmCommand
+) -> None:
+    upstream_path = tmp_path / "upstream"
+    shutil.copytree(str(phalanx_test_path()), str(upstream_path))
+    upstream_repo = Repo.init(str(upstream_path), initial_branch="main")
+    upstream_repo.index.add(["applications", "environments"])
+    actor = Actor("Someone", "someone@example.com")
+    upstream_repo.index.commit("Initial commit", author=actor, committer=actor)
+    change_path = tmp_path / "change"
+    repo = Repo.clone_from(str(upstream_path), str(change_path))
+
+    # Change a setting in the gafaelfawr values.yaml that is passed to a
+    # subchart but overridden for minikube, and a setting in the portal
+    # values.yaml that none of its templates use.
+    path = change_path / "applications" / "gafaelfawr" / "values.yaml"
+    values = path.read_text()
+    path.write_text(values.replace("enabled: true", "enabled: false"))
+    path = change_path / "applications" / "portal" / "values.yaml"
+    values = path.read_text()
+    path.write_text(values.replace("replicaCount: 1", "replicaCount: 2"))
+    repo.index.add(["applications"])
+    repo.index.commit("Some changes", author=actor, committer=actor)
+
+    result = run_cli(
+        "application",
+        "lint-all",
+        "--git",
+        "--config",
+        str(change_path),
+        needs_config=False,
+    )
+    assert result.exit_code == 0
+    lint_calls = [c[-3] for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert lint_calls == ["gafaelfawr/values-idfdev.yaml"]
+
+    # Changing a portal setting that its templates use should cause it to be
+    # linted.
+    values = path.read_text()
+    path.write_text(values.replace('nameOverride: ""', 'nameOverride: "a"'))
+    repo.index.add(["applications"])
+    repo.index.commit("Change name", author=actor, committer=actor)
+    mock_helm.reset_mock()
+    result = run_cli(
+        "application",
+        "lint-all",
+        "--git",
+        "--config",
+        str(change_path),
+        needs_config=False,
+    )
+    assert result.exit_code == 0
+    lint_calls = [c[-3] for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert lint_calls == [
+        "gafaelfawr/values-idfdev.yaml",
+        "portal/values-idfdev.yaml",
+    ]
+
+
+def test_lint_all_shard(tmp_path: Path, mock_helm: MockHelmCommand) -> None:
+    def lint_calls() -> list[tuple[str, str]]:
+        return [
+            (c[1], c[-3].removeprefix(f"{c[1]}/values-").removesuffix(".yaml"))
+            for c in mock_helm.call_args_list
+            if c[0] == "lint"
+        ]
+
+    # Each shard should lint a different subset of the pairs and together
+    # they should lint all of them.
+    config_storage = Factory(phalanx_test_path()).create_config_storage()
+    to_lint = config_storage.list_application_environments()
+    all_pairs = [(a, e) for a, envs in to_lint.items() for e in envs]
+    shards = []
+    for index in (1, 2):
+        mock_helm.reset_mock()
+        report = tmp_path / f"shard{index}.json"
+        args = ["--shard", f"{index}/2", "--report", str(report)]
+        result = run_cli("application", "lint-all", *args)
+        assert result.exit_code == 0
+        shards.append(lint_calls())
+        data = json.loads(report.read_text())
+        assert data["shard"] == {"index": index, "count": 2}
+        assert data["pairs"] == [list(p) for p in sorted(all_pairs)]
+        reported = [
+            (r["application"], r["environment"]) for r in data["results"]
+        ]
+        assert reported == shards[-1]
+    assert shards[0]
+    assert shards[1]
+    assert sorted(shards[0] + shards[1]) == sorted(all_pairs)
+
+    # The reports can be merged into a summary.
+    reports = [str(tmp_path / "shard1.json"), str(tmp_path / "shard2.json")]
+    merged = tmp_path / "merged.json"
+    result = run_cli(
+        "application",
+        "lint-merge",
+        *reports,
+        "--report",
+        str(merged),
+        needs_config=False,
+    )
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert len(lines) == len(all_pairs) + 1
+    assert lines[0].startswith("PASS argocd (environment idfdev) in ")
+    assert lines[-1].startswith(f"Linted {len(all_pairs)} charts in ")
+    assert lines[-1].endswith(", 0 failed")
+
+    # Merging an incomplete set of reports should fail.
+    result = run_cli(
+        "application", "lint-merge", reports[0], needs_config=False
+    )
+    assert result.exit_code == 2
+    assert "Reports must cover shards 1/2 to 2/2 once" in result.output
+
+    # With timings showing that one pair takes much longer than the others,
+    # that pair should be put in a shard by itself.
+    data = json.loads(merged.read_text())
+    for timing in data["results"]:
+        slow = timing["application"] == "gafaelfawr"
+        slow &= timing["environment"] == "minikube"
+        timing["duration"] = 100.0 if slow else 1.0
+    merged.write_text(json.dumps(data))
+    mock_helm.reset_mock()
+    args = ["--shard", "1/2", "--timings", str(merged)]
+    result = run_cli("application", "lint-all", *args)
+    assert result.exit_code == 0
+    assert lint_calls() == [("gafaelfawr", "minikube")]
+
+    # Merging shards that were assigned pairs using different timings should
+    # fail, since some pairs were linted twice and others not at all.
+    other = tmp_path / "other.json"
+    args = ["--shard", "2/2", "--timings", str(merged), "--report", str(other)]
+    result = run_cli("application", "lint-all", *args)
+    assert result.exit_code == 0
+    result = run_cli(
+        "application", "lint-merge", reports[0], str(other), needs_config=False
+    )
+    assert result.exit_code == 2
+    assert "Reports do not lint each chart exactly once: " in result.output
+
+    # So should merging shards that divided different sets of pairs.
+    data = json.loads((tmp_path / "shard2.json").read_text())
+    data["pairs"] = data["pairs"][1:]
+    other.write_text(json.dumps(data))
+    result = run_cli(
+        "application", "lint-merge", reports[0], str(other), needs_config=False
+    )
+    assert result.exit_code == 2
+    assert "Reports are from different sets of charts" in result.output
+
+    # Invalid shards should be rejected.
+    result = run_cli("application", "lint-all", "--shard", "3/2")
+    assert result.exit_code == 2
+    assert "Invalid shard 3/2" in result.output
+
+
+def test_lint_all_history(
+    mock_helm: MockHelmCommand, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.delenv("PHALANX_NO_CACHE")
+    monkeypatch.delenv("PHALANX_NO_HISTORY")
+
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = "v3.16.2+g13654a5\n" if command[0] == "version" else None
+        return subprocess.CompletedProcess(
+            returncode=0, args=command, stdout=output, stderr=None
+        )
+
+    # Nothing has been recorded yet.
+    result = run_cli("application", "lint-stats")
+    assert result.exit_code == 0
+    assert result.output == "No lints have been recorded\n"
+
+    # Every lint that runs Helm should be recorded.
+    mock_helm.set_capture_callback(callback)
+    result = run_cli("application", "lint-all")
+    assert result.exit_code == 0
+    expected_output = result.output
+    history = Factory(phalanx_test_path()).create_lint_history()
+    durations = history.get_durations()
+    assert len(durations) == 9
+    assert ("gafaelfawr", "minikube") in durations
+
+    # Pretend that one pair is much slower than the others. When linting in
+    # parallel, it should be started first, but the output should be
+    # unchanged.
+    slow = HelmLintResult(
+        application="postgres", environment="idfdev", success=False
+    )
+    for _ in range(3):
+        history.record(slow, timedelta(seconds=100), "v3.15.0")
+    shutil.rmtree(get_cache_path() / "helm")
+    mock_helm.reset_mock()
+    result = run_cli("application", "lint-all", "--jobs", "2")
+    assert result.exit_code == 0
+    assert result.output == expected_output
+    lint_calls = [c for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert "postgres/values-idfdev.yaml" in [c[-3] for c in lint_calls[:2]]
+
+    # The slow pair should be reported first, with the outcome and Helm
+    # version of its most recent lint.
+    result = run_cli("application", "lint-stats", "--limit", "2")
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert len(lines) == 3
+    assert lines[0].split() == [
+        "APPLICATION",
+        "ENVIRONMENT",
+        "RUNS",
+        "LAST",
+        "MEDIAN",
+        "TREND",
+        "STATUS",
+        "HELM",
+    ]
+    assert lines[1].split()[:3] == ["postgres", "idfdev", "5"]
+    assert lines[1].split()[-2:] == ["PASS", "v3.16.2+g13654a5"]
+    assert lines[2].split()[2] == "2"
+
+
+def test_lint_all_history_no_cache(
+    mock_helm: MockHelmCommand, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.delenv("PHALANX_NO_HISTORY")
+
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = "v3.16.2+g13654a5\n" if command[0] == "version" else None
+        return subprocess.CompletedProcess(
+            returncode=0, args=command, stdout=output, stderr=None
+        )
+
+    # Lints should be recorded even though the result cache is disabled.
+    mock_helm.set_capture_callback(callback)
+    result = run_cli("application", "lint-all", "--no-cache")
+    assert result.exit_code == 0
+    history = Factory(phalanx_test_path()).create_lint_history()
+    assert len(history.get_durations()) == 9
+    assert not (get_cache_path() / "helm").exists()
+
+    # Nothing more should be recorded if the history is disabled.
+    result = run_cli("application", "lint-all", "--no-cache", "--no-history")
+    assert result.exit_code == 0
+    assert len(history.get_durations()) == 9
+
+
+def test_lint_all_history_error(
+    mock_helm: MockHelmCommand, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.delenv("PHALANX_NO_HISTORY")
+
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = "v3.16.2+g13654a5\n" if command[0] == "version" else None
+        return subprocess.CompletedProcess(
+            returncode=0, args=command, stdout=output, stderr=None
+        )
+
+    # A history that cannot be opened should produce a warning but not
+    # change the outcome of the lints, whether they run serially or not.
+    (get_cache_path() / "lint-history.sqlite").mkdir(parents=True)
+    mock_helm.set_capture_callback(callback)
+    result = run_cli("application", "lint-all")
+    assert result.exit_code == 0
+    assert result.output.count("Warning: Cannot record lint") == 1
+    lint_calls = [c for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert len(lint_calls) == 9
+
+    mock_helm.reset_mock()
+    result = run_cli("application", "lint-all", "--jobs", "2")
+    assert result.exit_code == 0
+    assert result.output.count("Warning: Cannot read lint history") == 1
+    assert result.output.count("Warning: Cannot record lint") == 1
+    lint_calls = [c for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert len(lint_calls) == 9
+
+
+def test_lint_watch(
+    tmp_path: Path, mock_helm: MockHelmCommand, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    config_path = tmp_path / "phalanx"
+    shutil.copytree(str(phalanx_test_path()), str(config_path))
+    app_path = config_path / "applications" / "gafaelfawr"
+    env_path = config_path / "environments"
+
+    def changes() -> Iterator[set[Path]]:
+        yield {app_path / "values-idfdev.yaml"}
+        yield {config_path / "applications" / "portal" / "values.yaml"}
+        yield {app_path / "Chart.lock"}
+
+        # Changes to environments only matter if they change injected values.
+        path = env_path / "values-idfdev.yaml"
+        with path.open("a") as fh:
+            fh.write("# Some comment\n")
+        yield {path}
+        path = env_path / "values-minikube.yaml"
+        values = path.read_text()
+        path.write_text(values.replace("lsst.cloud", "example.com"))
+        yield {path}
+
+        # Changes to values.yaml only matter for environments whose merged
+        # values change. minikube overrides this setting.
+        path = app_path / "values.yaml"
+        values = path.read_text()
+        path.write_text(values.replace("enabled: true", "enabled: false"))
+        yield {path}
+
+    monkeypatch.setattr("phalanx.cli._watch_config", lambda _: changes())
+
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = "==> Linting .\n" if command[0] == "lint" else None
+        return subprocess.CompletedProcess(
+            returncode=0, args=command, stdout=output, stderr=None
+        )
+
+    # The initial lint should lint every environment, and then each change
+    # should only lint the affected pairs. Changes to other applications or
+    # to files that aren't inputs to linting should do nothing.
+    mock_helm.set_capture_callback(callback)
+    args = ["application", "lint", "gafaelfawr", "--watch"]
+    result = run_cli(*args, "--config", str(config_path), needs_config=False)
+    assert result.exit_code == 0
+    lint_calls = [c[-3] for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert lint_calls == [
+        "gafaelfawr/values-idfdev.yaml",
+        "gafaelfawr/values-minikube.yaml",
+        "gafaelfawr/values-idfdev.yaml",
+        "gafaelfawr/values-minikube.yaml",
+        "gafaelfawr/values-idfdev.yaml",
+    ]
+    lines = result.output.splitlines()
+    assert lines[:2] == [
+        "==> Linting gafaelfawr (environment idfdev)",
+        "==> Passed in " + lines[1].removeprefix("==> Passed in "),
+    ]
+    assert len([line for line in lines if line.startswith("==> Passed")]) == 5
+
+
 def test_template(mock_helm: MockHelmCommand) -> None:
     test_path = phalanx_test_path()
 
@@ -500,6 +1119,7 @@ def test_template(mock_helm: MockHelmCommand) -> None:
     assert result.exit_code == 0
     set_args = read_output_json("idfdev", "lint-set-values")
     assert mock_helm.call_args_list == [
+        ["env"],
         [
             "repo",
             "add",
@@ -507,7 +1127,6 @@ def test_template(mock_helm: MockHelmCommand) -> None:
             "lsst-sqre",
             "https://lsst-sqre.github.io/charts/",
         ],
-        ["repo", "update"],
         ["dependency", "update", "--skip-refresh"],
         [
             "template",
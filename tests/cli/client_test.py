@@ -0,0 +1,116 @@
+"""Tests for the client and server commands."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+from collections.abc import Iterator
+from pathlib import Path
+from threading import Thread
+
+import pytest
+
+from phalanx.server import PhalanxServer
+from phalanx.storage.helm import HelmStorage
+
+from ..support.cli import run_cli
+from ..support.helm import MockHelmCommand
+
+
+@pytest.fixture
+def server(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[PhalanxServer]:
+    monkeypatch.setattr(HelmStorage, "_repositories", None)
+    server = PhalanxServer(tmp_path / "phalanx.sock")
+    thread = Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def test_client(server: PhalanxServer, mock_helm: MockHelmCommand) -> None:
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = None
+        if command[0] == "template":
+            output = "this is some template\n"
+        return subprocess.CompletedProcess(
+            returncode=0, args=command, stdout=output, stderr=None
+        )
+
+    mock_helm.set_capture_callback(callback)
+    socket = str(server.socket_path)
+    args = ["application", "template", "gafaelfawr", "idfdev"]
+    result = run_cli("client", "--socket", socket, *args)
+    assert result.output == "this is some template\n"
+    assert result.exit_code == 0
+    assert [c[:2] for c in mock_helm.call_args_list] == [
+        ["env"],
+        ["repo", "add"],
+        ["dependency", "update"],
+        ["template", "gafaelfawr"],
+    ]
+
+    # The server should remember that the Helm repositories are prepared.
+    mock_helm.reset_mock()
+    result = run_cli("client", "--socket", socket, *args)
+    assert result.output == "this is some template\n"
+    assert result.exit_code == 0
+    assert [c[:2] for c in mock_helm.call_args_list] == [
+        ["dependency", "update"],
+        ["template", "gafaelfawr"],
+    ]
+
+    # Errors should be passed back to the client.
+    result = run_cli("client", "--socket", socket, "application", "template")
+    assert result.exit_code == 2
+    assert "Missing argument" in result.output
+
+    # Commands the server doesn't run should be run directly.
+    result = run_cli(
+        "client",
+        "--socket",
+        socket,
+        "environment",
+        "schema",
+        needs_config=False,
+    )
+    assert result.exit_code == 0
+    assert result.output.startswith("{")
+
+    # If the server isn't running, commands should be run directly.
+    mock_helm.reset_mock()
+    socket = str(server.socket_path.parent / "missing.sock")
+    result = run_cli("client", "--socket", socket, *args)
+    assert result.output == "this is some template\n"
+    assert result.exit_code == 0
+    assert len(mock_helm.call_args_list) == 2
+
+
+def test_client_invalid_output(
+    server: PhalanxServer, mock_helm: MockHelmCommand
+) -> None:
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = None
+        if command[0] == "template":
+            os.write(1, b"not \xff utf-8\n")
+            output = "this is some template\n"
+        return subprocess.CompletedProcess(
+            returncode=0, args=command, stdout=output, stderr=None
+        )
+
+    # Output that is not valid UTF-8 should be returned with replacement
+    # characters rather than failing the request.
+    mock_helm.set_capture_callback(callback)
+    socket = str(server.socket_path)
+    args = ["application", "template", "gafaelfawr", "idfdev"]
+    result = run_cli("client", "--socket", socket, *args)
+    assert result.exit_code == 0
+    assert result.output == "not \ufffd utf-8\nthis is some template\n"
+
+
+def test_server_running(server: PhalanxServer) -> None:
+    with pytest.raises(RuntimeError):
+        PhalanxServer(server.socket_path)
@@ -2,9 +2,13 @@
 
 from __future__ import annotations
 
+import shutil
 import subprocess
+from collections.abc import Iterator
 from pathlib import Path
 
+import pytest
+
 from ..support.cli import run_cli
 from ..support.data import phalanx_test_path
 from ..support.helm import MockHelmCommand
@@ -103,6 +107,163 @@ def test_lint(mock_helm: MockHelmCommand) -> None:
     assert result.exit_code == 1
 
 
+def test_lint_cache(
+    tmp_path: Path, mock_helm: MockHelmCommand, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.delenv("PHALANX_NO_CACHE")
+    config_path = tmp_path / "phalanx"
+    shutil.copytree(str(phalanx_test_path()), str(config_path))
+
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = None
+        returncode = 0
+        if command[0] == "version":
+            output = "v3.16.2+g13654a5\n"
+        elif command[0] == "lint":
+            output = "==> Linting .\n"
+            if command[-1] == "environments/values-minikube.yaml":
+                returncode = 1
+        return subprocess.CompletedProcess(
+            returncode=returncode, args=command, stdout=output, stderr=None
+        )
+
+    # Environments are linted in parallel, so Helm may be called in any
+    # order.
+    def lint_calls() -> list[str]:
+        return sorted(
+            c[-1] for c in mock_helm.call_args_list if c[0] == "lint"
+        )
+
+    # The first run should lint every environment in parallel.
+    mock_helm.set_capture_callback(callback)
+    args = ["environment", "lint", "--config", str(config_path), "-j", "3"]
+    result = run_cli(*args, needs_config=False)
+    assert result.exit_code == 1
+    expected_output = result.output
+    assert expected_output == (
+        "==> Linting top-level chart for idfdev\n"
+        "==> Linting top-level chart for minikube\n"
+        "Error: Top-level chart for environment minikube has errors\n"
+        "==> Linting top-level chart for usdfdev-prompt-processing\n"
+    )
+    assert len(lint_calls()) == 3
+
+    # The second run should only lint the environment that failed.
+    mock_helm.reset_mock()
+    result = run_cli(*args, needs_config=False)
+    assert result.exit_code == 1
+    assert result.output == expected_output
+    assert lint_calls() == ["environments/values-minikube.yaml"]
+
+    # Changing the values for one environment should only cause that
+    # environment to be linted again.
+    path = config_path / "environments" / "values-idfdev.yaml"
+    with path.open("a") as fh:
+        fh.write("# Some comment\n")
+    mock_helm.reset_mock()
+    result = run_cli(*args, needs_config=False)
+    assert lint_calls() == [
+        "environments/values-idfdev.yaml",
+        "environments/values-minikube.yaml",
+    ]
+
+    # Changing the shared values should cause every environment to be linted.
+    path = config_path / "environments" / "values.yaml"
+    with path.open("a") as fh:
+        fh.write("# Some comment\n")
+    mock_helm.reset_mock()
+    result = run_cli(*args, needs_config=False)
+    assert len(lint_calls()) == 3
+
+
+def test_lint_watch(
+    mock_helm: MockHelmCommand, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    config_path = phalanx_test_path()
+    changes = [
+        {config_path / "environments" / "values-idfdev.yaml"},
+        {config_path / "applications" / "gafaelfawr" / "values.yaml"},
+        {config_path / "environments" / "templates" / "argocd.yaml"},
+    ]
+    monkeypatch.setattr("phalanx.cli._watch_config", lambda _: changes)
+
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = "==> Linting .\n" if command[0] == "lint" else None
+        return subprocess.CompletedProcess(
+            returncode=0, args=command, stdout=output, stderr=None
+        )
+
+    # After the initial lint, changing an environment's values should only
+    # lint that environment, changing an application should do nothing, and
+    # changing the templates should lint every environment again.
+    mock_helm.set_capture_callback(callback)
+    result = run_cli("environment", "lint", "--watch")
+    assert result.exit_code == 0
+    lint_calls = [c[-1] for c in mock_helm.call_args_list if c[0] == "lint"]
+    environments = [
+        "environments/values-idfdev.yaml",
+        "environments/values-minikube.yaml",
+        "environments/values-usdfdev-prompt-processing.yaml",
+    ]
+    assert lint_calls == [
+        *environments,
+        "environments/values-idfdev.yaml",
+        *environments,
+    ]
+    assert result.output.count("==> Passed in ") == 7
+
+    # Watching a single environment should ignore changes to the others.
+    mock_helm.reset_mock()
+    result = run_cli("environment", "lint", "minikube", "--watch")
+    assert result.exit_code == 0
+    lint_calls = [c[-1] for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert lint_calls == ["environments/values-minikube.yaml"] * 2
+
+
+def test_lint_watch_cache(
+    tmp_path: Path, mock_helm: MockHelmCommand, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.delenv("PHALANX_NO_CACHE")
+    config_path = tmp_path / "phalanx"
+    shutil.copytree(str(phalanx_test_path()), str(config_path))
+
+    # Edit the shared template between lints, as a user would while the
+    # watch is running.
+    def changes() -> Iterator[set[Path]]:
+        path = config_path / "environments" / "templates" / "argocd.yaml"
+        with path.open("a") as fh:
+            fh.write("# Some comment\n")
+        yield {path}
+
+    monkeypatch.setattr("phalanx.cli._watch_config", lambda _: changes())
+
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        output = None
+        if command[0] == "version":
+            output = "v3.16.2+g13654a5\n"
+        elif command[0] == "lint":
+            output = "==> Linting .\n"
+        return subprocess.CompletedProcess(
+            returncode=0, args=command, stdout=output, stderr=None
+        )
+
+    # The edited template must not be linted using the cached results from
+    # before the change.
+    mock_helm.set_capture_callback(callback)
+    args = ["environment", "lint", "--config", str(config_path), "--watch"]
+    result = run_cli(*args, needs_config=False)
+    assert result.exit_code == 0
+    lint_calls = [c[-1] for c in mock_helm.call_args_list if c[0] == "lint"]
+    assert sorted(lint_calls) == sorted(
+        [
+            "environments/values-idfdev.yaml",
+            "environments/values-minikube.yaml",
+            "environments/values-usdfdev-prompt-processing.yaml",
+        ]
+        * 2
+    )
+
+
 def test_schema() -> None:
     result = run_cli("environment", "schema", needs_config=False)
     assert result.exit_code == 0
@@ -0,0 +1,79 @@
+"""Tests for the helm command-line subcommand."""
+
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+
+from phalanx.storage.cache import get_cache_path
+
+from ..support.cli import run_cli
+from ..support.data import phalanx_test_path
+from ..support.helm import MockHelmCommand
+
+
+def test_mirror(tmp_path: Path, mock_helm: MockHelmCommand) -> None:
+    config_path = tmp_path / "phalanx"
+    shutil.copytree(str(phalanx_test_path()), str(config_path))
+    mirror = get_cache_path() / "helm-mirror"
+    charts = [
+        (
+            "argoproj",
+            "argo-cd",
+            "5.43.3",
+            "https://argoproj.github.io/argo-helm",
+        ),
+        (
+            "jupyterhub",
+            "jupyterhub",
+            "2.0.0",
+            "https://jupyterhub.github.io/helm-chart/",
+        ),
+        ("lsst-sqre", "redis", "1.0.6", "https://lsst-sqre.github.io/charts/"),
+    ]
+
+    # Every third-party chart should be downloaded once.
+    args = ["helm", "mirror", "--config", str(config_path)]
+    result = run_cli(*args, needs_config=False)
+    assert result.exit_code == 0
+    assert result.output == "".join(
+        f"Downloaded {n} {v} from {u}\n" for _, n, v, u in charts
+    )
+    assert mock_helm.call_args_list == [
+        *(
+            [
+                "pull",
+                name,
+                "--repo",
+                url,
+                "--version",
+                version,
+                "--destination",
+                str(mirror / repo),
+            ]
+            for repo, name, version, url in charts
+        ),
+        ["repo", "index", str(mirror)],
+    ]
+
+    # Charts already in the mirror should not be downloaded again.
+    for repo, name, version, _ in charts:
+        (mirror / repo / f"{name}-{version}.tgz").write_text(name)
+    mock_helm.reset_mock()
+    result = run_cli(*args, needs_config=False)
+    assert result.exit_code == 0
+    assert result.output == ""
+    assert mock_helm.call_args_list == [["repo", "index", str(mirror)]]
+
+    # Linting should now install dependencies from the mirror without adding
+    # repositories or running helm dependency update, and only once.
+    for _ in range(2):
+        mock_helm.reset_mock()
+        args = ["application", "lint", "gafaelfawr", "--env", "idfdev"]
+        result = run_cli(
+            *args, "--config", str(config_path), needs_config=False
+        )
+        assert result.exit_code == 0
+        assert [c[0] for c in mock_helm.call_args_list] == ["lint"]
+    charts_path = config_path / "applications" / "gafaelfawr" / "charts"
+    assert (charts_path / "redis-1.0.6.tgz").read_text() == "redis"
@@ -4,18 +4,24 @@ from __future__ import annotations
 
 import os
 import re
+import shutil
 from base64 import b64decode, b64encode
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Any
 
 import bcrypt
 import click
+import pytest
 import yaml
 from cryptography.fernet import Fernet
 from safir.datetime import current_datetime
 
 from phalanx.factory import Factory
 from phalanx.models.gafaelfawr import Token
+from phalanx.models.secrets import StaticSecrets
+from phalanx.services import secrets as secrets_service
 
 from ..support.cli import run_cli
 from ..support.data import (
@@ -66,6 +72,61 @@ def test_audit(factory: Factory, mock_vault: MockVaultClient) -> None:
     assert result.output == read_output_data("idfdev", "secrets-audit")
 
 
+def test_audit_unresolved(
+    tmp_path: Path, factory: Factory, mock_vault: MockVaultClient
+) -> None:
+    config_path = tmp_path / "phalanx"
+    shutil.copytree(str(phalanx_test_path()), str(config_path))
+    config_storage = factory.create_config_storage()
+    environment = config_storage.load_environment("idfdev")
+    mock_vault.load_test_data(environment.vault_path_prefix, "idfdev")
+
+    # Add secrets that form a dependency cycle or copy from a secret that
+    # doesn't exist.
+    secrets_config = config_path / "applications" / "argocd" / "secrets.yaml"
+    with secrets_config.open("a") as fh:
+        fh.write(
+            "loop-one:\n"
+            "  copy:\n"
+            "    application: argocd\n"
+            "    key: loop-two\n"
+            "loop-two:\n"
+            "  copy:\n"
+            "    application: argocd\n"
+            "    key: loop-one\n"
+            "orphan:\n"
+            "  copy:\n"
+            "    application: unknown\n"
+            "    key: secret\n"
+        )
+
+    secrets_path = config_path / "secrets" / "idfdev.yaml"
+    result = run_cli(
+        "secrets",
+        "audit",
+        "--secrets",
+        str(secrets_path),
+        "--config",
+        str(config_path),
+        "idfdev",
+        env={"VAULT_TOKEN": "sometoken"},
+        needs_config=False,
+    )
+    assert result.exit_code == 1
+    assert result.output == (
+        "Unresolved secrets:\n"
+        "• argocd/loop-one\n"
+        "• argocd/loop-two\n"
+        "• argocd/orphan\n"
+        "\n"
+        "Missing sources of secrets:\n"
+        "• unknown/secret (for argocd/orphan)\n"
+        "\n"
+        "Dependency cycles:\n"
+        "• argocd/loop-one -> argocd/loop-two -> argocd/loop-one\n"
+    )
+
+
 def test_audit_onepassword_missing(
     factory: Factory,
     mock_onepassword: MockOnepasswordClient,
@@ -276,6 +337,109 @@ def test_sync(factory: Factory, mock_vault: MockVaultClient) -> None:
     assert result.output == ""
 
 
+def test_sync_batched(
+    factory: Factory,
+    mock_vault: MockVaultClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    input_path = phalanx_test_path()
+    secrets_path = input_path / "secrets" / "idfdev.yaml"
+    config_storage = factory.create_config_storage()
+    environment = config_storage.load_environment("idfdev")
+    mock_vault.load_test_data(environment.vault_path_prefix, "idfdev")
+    _, base_vault_path = environment.vault_path_prefix.split("/", 1)
+
+    # Record every write to Vault.
+    writes: list[str] = []
+    create_or_update_secret = mock_vault.create_or_update_secret
+    patch = mock_vault.patch
+
+    def record_create(path: str, secret: dict[str, str]) -> None:
+        writes.append(path)
+        create_or_update_secret(path, secret)
+
+    def record_patch(path: str, secret: dict[str, str]) -> None:
+        writes.append(path)
+        patch(path, secret)
+
+    monkeypatch.setattr(mock_vault, "create_or_update_secret", record_create)
+    monkeypatch.setattr(mock_vault, "patch", record_patch)
+
+    # Each application's secret should be written only once, and the report
+    # should be the same as for a serial sync.
+    result = run_cli(
+        "secrets",
+        "sync",
+        "--secrets",
+        str(secrets_path),
+        "--vault-concurrency",
+        "4",
+        "idfdev",
+        env={"VAULT_TOKEN": "sometoken"},
+    )
+    assert result.exit_code == 0
+    assert result.output == read_output_data("idfdev", "sync-output")
+    applications = ["argocd", "gafaelfawr", "nublado", "portal", "postgres"]
+    assert sorted(writes) == [f"{base_vault_path}/{a}" for a in applications]
+    gafaelfawr = _get_app_secret(mock_vault, f"{base_vault_path}/gafaelfawr")
+    assert "cilogon" in gafaelfawr
+    assert "signing-key" in gafaelfawr
+
+    # Regenerating with --delete should combine the updates and deletions
+    # for each application into a single write.
+    writes.clear()
+    result = run_cli(
+        "secrets",
+        "sync",
+        "--regenerate",
+        "--delete",
+        "idfdev",
+        env={"VAULT_TOKEN": "sometoken"},
+    )
+    assert result.exit_code == 0
+    assert "Deleted Vault secret for gafaelfawr cilogon\n" in result.output
+    assert len(writes) == len(set(writes))
+    after = _get_app_secret(mock_vault, f"{base_vault_path}/gafaelfawr")
+    assert "cilogon" not in after
+    assert after["signing-key"] != gafaelfawr["signing-key"]
+
+
+def test_sync_write_failure(
+    factory: Factory,
+    mock_vault: MockVaultClient,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    input_path = phalanx_test_path()
+    secrets_path = input_path / "secrets" / "idfdev.yaml"
+    config_storage = factory.create_config_storage()
+    environment = config_storage.load_environment("idfdev")
+    mock_vault.load_test_data(environment.vault_path_prefix, "idfdev")
+    _, base_vault_path = environment.vault_path_prefix.split("/", 1)
+    monkeypatch.setenv("VAULT_TOKEN", "sometoken")
+
+    # Fail the write of one application's secret.
+    patch = mock_vault.patch
+
+    def failing_patch(path: str, secret: dict[str, str]) -> None:
+        if path == f"{base_vault_path}/nublado":
+            raise RuntimeError("Write failed")
+        patch(path, secret)
+
+    monkeypatch.setattr(mock_vault, "patch", failing_patch)
+
+    # The changes that were made should still be reported.
+    secrets_service = factory.create_secrets_service()
+    static_secrets = StaticSecrets.from_path(secrets_path)
+    with pytest.raises(RuntimeError, match="Write failed"):
+        secrets_service.sync("idfdev", static_secrets)
+    expected = read_output_data("idfdev", "sync-output").splitlines()
+    expected = [line for line in expected if " nublado " not in line]
+    assert capsys.readouterr().out.splitlines() == expected
+    nublado = _get_app_secret(mock_vault, f"{base_vault_path}/nublado")
+    assert "proxy_token" not in nublado
+
+
 def test_sync_onepassword(
     factory: Factory,
     mock_onepassword: MockOnepasswordClient,
@@ -381,7 +545,9 @@ def test_sync_onepassword_errors(
 
 
 def test_sync_regenerate(
-    factory: Factory, mock_vault: MockVaultClient
+    factory: Factory,
+    mock_vault: MockVaultClient,
+    monkeypatch: pytest.MonkeyPatch,
 ) -> None:
     input_path = phalanx_test_path()
     secrets_path = input_path / "secrets" / "idfdev.yaml"
@@ -391,6 +557,17 @@ def test_sync_regenerate(
     _, base_vault_path = environment.vault_path_prefix.split("/", 1)
     before = _get_app_secret(mock_vault, f"{base_vault_path}/gafaelfawr")
 
+    # Record creation of process pools, since there are multiple slow
+    # secrets that should be generated in parallel.
+    pools = []
+
+    class RecordingPool(ProcessPoolExecutor):
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(secrets_service, "ProcessPoolExecutor", RecordingPool)
+
     result = run_cli(
         "secrets",
         "sync",
@@ -403,6 +580,7 @@ def test_sync_regenerate(
     assert result.exit_code == 0
     expected = read_output_data("idfdev", "sync-regenerate-output")
     assert result.output == expected
+    assert len(pools) == 1
 
     # Check that all static secrets were copied over correctly.
     static_secrets = read_input_static_secrets("idfdev")
@@ -0,0 +1,72 @@
+"""Tests for the startup cost of the command-line interface.
+
+The Phalanx command-line interface is run many times by pre-commit hooks and
+CI, so its startup time matters. Most of that time is spent importing
+third-party libraries. These tests enforce a budget of which large libraries
+may be imported by commands that don't need them. Import times themselves
+vary too much between systems to test directly.
+"""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+from ..support.data import phalanx_test_path
+
+_HEAVY_MODULES = {
+    "bcrypt",
+    "cryptography",
+    "git",
+    "hvac",
+    "jinja2",
+    "onepasswordconnectsdk",
+}
+"""Large libraries that must not be imported unless needed."""
+
+
+def _get_imported_modules(code: str) -> set[str]:
+    """Run Python code in a new interpreter and return the modules it loads.
+
+    Parameters
+    ----------
+    code
+        Code to run.
+
+    Returns
+    -------
+    set of str
+        Top-level packages of all modules loaded after running the code.
+    """
+    script = f"{code}\nimport json, sys\nprint(json.dumps(list(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    modules = json.loads(result.stdout.splitlines()[-1])
+    return {m.split(".")[0] for m in modules}
+
+
+def test_help() -> None:
+    code = (
+        "from phalanx.cli import main\n"
+        "try:\n"
+        "    main(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+    )
+    assert _get_imported_modules(code) & _HEAVY_MODULES == set()
+
+
+def test_application_template() -> None:
+    code = (
+        "from pathlib import Path\n"
+        "from phalanx.factory import Factory\n"
+        f"factory = Factory(Path({str(phalanx_test_path())!r}))\n"
+        "factory.create_application_service()\n"
+        "factory.create_config_storage().load_environment('idfdev')\n"
+    )
+    assert _get_imported_modules(code) & _HEAVY_MODULES == set()
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from collections.abc import Iterator
+from pathlib import Path
 
 import jinja2
 import pytest
@@ -27,6 +28,21 @@ def _clear_environment(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.delenv("VAULT_TOKEN", raising=False)
 
 
+@pytest.fixture(autouse=True)
+def _isolate_cache(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Isolate the local cache and disable it and the lint history by default.
+
+    The mock Helm command returns different results for the same inputs in
+    different tests, so caching would produce confusing results, and
+    recording lints in the history runs an extra Helm command. Tests of the
+    cache or history should delete ``PHALANX_NO_CACHE`` or
+    ``PHALANX_NO_HISTORY`` from the environment.
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("PHALANX_NO_CACHE", "1")
+    monkeypatch.setenv("PHALANX_NO_HISTORY", "1")
+
+
 @pytest.fixture
 def factory() -> Factory:
     """Create a factory pointing at the test data."""
@@ -0,0 +1,133 @@
+"""Tests for the Argo CD storage layer."""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from datetime import timedelta
+from threading import Thread
+
+import pytest
+from pydantic import SecretStr
+
+from phalanx.exceptions import ArgoCDError
+from phalanx.models.applications import Project
+from phalanx.storage.argocd import ArgoCDStorage
+
+from ..support.argocd import MockArgoCDServer
+
+
+@pytest.fixture
+def server() -> Iterator[MockArgoCDServer]:
+    server = MockArgoCDServer("some-password")
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_install(server: MockArgoCDServer) -> None:
+    storage = ArgoCDStorage(server.url, poll_interval=timedelta(0))
+    with pytest.raises(ArgoCDError, match="Not logged in"):
+        storage.sync("argocd")
+    with pytest.raises(ArgoCDError, match="Cannot log in"):
+        storage.login("admin", SecretStr("wrong"))
+    server.connections.clear()
+    storage.login("admin", SecretStr("some-password"))
+
+    # Create, sync, and move the app of apps. The first sync fails and
+    # should be retried.
+    server.fail_syncs.add("idfdev")
+    storage.create_environment(
+        "idfdev",
+        "idfdev",
+        git_url="https://github.com/lsst-sqre/phalanx",
+        git_branch="main",
+    )
+    assert not storage.is_synced("idfdev")
+    storage.sync("idfdev")
+    assert storage.is_synced("idfdev")
+    assert not storage.is_synced("unknown")
+    storage.set_project("idfdev", Project.infrastructure)
+    application = server.applications["idfdev"]
+    assert application["spec"]["project"] == "infrastructure"
+    assert application["spec"]["source"]["helm"]["valueFiles"] == [
+        "values.yaml",
+        "values-idfdev.yaml",
+    ]
+    assert application["status"]["operationState"]["phase"] == "Succeeded"
+    assert not server.fail_syncs
+
+    # All of that should have used a single connection.
+    assert len(server.connections) == 1
+
+    # Syncing all applications should only sync those in the app of apps.
+    server.add_application("argocd", "idfdev")
+    server.add_application("gafaelfawr", "idfdev")
+    server.add_application("other", "other")
+    storage.sync_all("idfdev")
+    for name in ("argocd", "gafaelfawr"):
+        status = server.applications[name]["status"]
+        assert status["operationState"]["phase"] == "Succeeded"
+    assert "status" not in server.applications["other"]
+
+    storage.close()
+    with pytest.raises(ArgoCDError, match="Not logged in"):
+        storage.sync("argocd")
+
+
+def test_sync_errors(server: MockArgoCDServer) -> None:
+    storage = ArgoCDStorage(server.url, poll_interval=timedelta(0))
+    storage.login("admin", SecretStr("some-password"))
+    server.add_application("gafaelfawr", "idfdev")
+
+    # Failures of individual syncs are retried once, but failures when
+    # syncing everything are reported.
+    server.fail_syncs.add("gafaelfawr")
+    server.sync_checks = 1
+    storage.sync("gafaelfawr")
+    server.fail_syncs.add("gafaelfawr")
+    with pytest.raises(ArgoCDError, match="some sync error"):
+        storage.sync_all("idfdev")
+
+    # Syncs that don't finish should time out.
+    server.sync_checks = 100
+    with pytest.raises(ArgoCDError, match="did not finish within 0s"):
+        storage.sync("gafaelfawr", timeout=timedelta(0))
+
+    with pytest.raises(ArgoCDError, match="status 404"):
+        storage.sync("unknown")
+    storage.close()
+
+
+def test_reconnect(server: MockArgoCDServer) -> None:
+    storage = ArgoCDStorage(server.url, poll_interval=timedelta(seconds=0.05))
+    storage.login("admin", SecretStr("some-password"))
+    server.add_application("argocd", "idfdev")
+    server.sync_checks = 10
+
+    # Stop the server in the middle of the sync, as happens when Argo CD
+    # syncs itself, and start it again a little later. The sync should
+    # reconnect and finish.
+    errors: list[Exception] = []
+
+    def sync() -> None:
+        try:
+            storage.sync("argocd", timeout=timedelta(seconds=30))
+        except Exception as e:
+            errors.append(e)
+
+    thread = Thread(target=sync)
+    thread.start()
+    start = time.monotonic()
+    while "operation" not in server.applications["argocd"]:
+        assert time.monotonic() < start + 10, "Sync never started"
+        time.sleep(0.01)
+    server.stop()
+    time.sleep(0.5)
+    server.start()
+    thread.join()
+    assert errors == []
+    status = server.applications["argocd"]["status"]
+    assert status["operationState"]["phase"] == "Succeeded"
+    assert storage.is_synced("argocd")
+    storage.close()
@@ -0,0 +1,85 @@
+"""Tests for the on-disk result cache."""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from phalanx.storage.cache import ResultCache
+
+
+def test_eviction(tmp_path: Path) -> None:
+    cache = ResultCache(tmp_path, max_size=25)
+    assert cache.get("one") is None
+    cache.put("one", "a" * 10)
+    cache.put("two", "b" * 10)
+    assert cache.get("one") == "a" * 10
+    assert cache.get("two") == "b" * 10
+
+    # Make the first entry the most recently used, so adding a third entry
+    # that pushes the cache over its limit should evict the second.
+    os.utime(tmp_path / "two", (0, 0))
+    cache.get("one")
+    cache.put("three", "c" * 10)
+    assert cache.get("one") == "a" * 10
+    assert cache.get("two") is None
+    assert cache.get("three") == "c" * 10
+
+
+def test_eviction_throttled(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = ResultCache(tmp_path, max_size=100)
+    listings: list[Path] = []
+    iterdir = Path.iterdir
+
+    def counting_iterdir(path: Path) -> Iterator[Path]:
+        listings.append(path)
+        return iterdir(path)
+
+    # The cache should only be listed on the first write and when the
+    # entries written since may have pushed it over its maximum size.
+    monkeypatch.setattr(Path, "iterdir", counting_iterdir)
+    for i in range(9):
+        cache.put(str(i), "a" * 10)
+    assert listings == [tmp_path]
+    cache.put("9", "a" * 10)
+    cache.put("10", "a" * 10)
+    assert listings == [tmp_path, tmp_path]
+    assert len(list(iterdir(tmp_path))) == 10
+    assert cache.get("0") is None
+
+
+def test_files(tmp_path: Path) -> None:
+    cache = ResultCache(tmp_path / "cache")
+    source = tmp_path / "source"
+    source.write_bytes(b"some data")
+    assert cache.get_file("key") is None
+    cache.put_file("key", source)
+    path = cache.get_file("key")
+    assert path
+    assert path.read_bytes() == b"some data"
+
+
+def test_write_failure(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = ResultCache(tmp_path / "cache")
+
+    # A failed copy should not leave a partial entry behind.
+    with pytest.raises(FileNotFoundError):
+        cache.put_file("key", tmp_path / "missing")
+    assert list((tmp_path / "cache").iterdir()) == []
+
+    # Nor should a failure to move the entry into place.
+    def fail_replace(path: Path, target: Path) -> Path:
+        raise OSError("Disk full")
+
+    monkeypatch.setattr(Path, "replace", fail_replace)
+    with pytest.raises(OSError, match="Disk full"):
+        cache.put("key", "some data")
+    assert list((tmp_path / "cache").iterdir()) == []
+    assert cache.get("key") is None
@@ -0,0 +1,32 @@
+"""Tests for the record of completed installation steps."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from phalanx.storage.checkpoint import InstallCheckpoint
+
+
+def test_checkpoint(tmp_path: Path) -> None:
+    path = tmp_path / "install" / "idfdev.json"
+    checkpoint = InstallCheckpoint(path)
+    assert checkpoint.get("argocd") is None
+
+    # Steps should be remembered by a new object using the same file.
+    checkpoint.record("argocd", "")
+    checkpoint.record("app-of-apps", "https://example.com/phalanx@main")
+    checkpoint = InstallCheckpoint(path)
+    assert checkpoint.get("argocd") == ""
+    assert checkpoint.get("app-of-apps") == "https://example.com/phalanx@main"
+    assert list(path.parent.iterdir()) == [path]
+
+    # A damaged file should be treated as empty.
+    path.write_text("{")
+    assert checkpoint.get("argocd") is None
+    checkpoint.record("argocd", "")
+    assert checkpoint.get("argocd") == ""
+
+    checkpoint.clear()
+    assert checkpoint.get("argocd") is None
+    assert not path.exists()
+    checkpoint.clear()
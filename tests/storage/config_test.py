@@ -0,0 +1,152 @@
+"""Tests for the Phalanx configuration storage layer."""
+
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from git.repo import Repo
+from git.util import Actor
+
+from phalanx.factory import Factory
+from phalanx.storage import config
+from phalanx.storage.config import ConfigStorage
+
+from ..support.data import phalanx_test_path
+
+
+def _count_reads(monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    """Record the paths of all YAML files read by the configuration storage."""
+    parsed: list[Path] = []
+    read_bytes = Path.read_bytes
+
+    def counting_read_bytes(path: Path) -> bytes:
+        if path.suffix == ".yaml":
+            parsed.append(path)
+        return read_bytes(path)
+
+    monkeypatch.setattr(Path, "read_bytes", counting_read_bytes)
+    return parsed
+
+
+def test_parse_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config_path = tmp_path / "phalanx"
+    shutil.copytree(str(phalanx_test_path()), str(config_path))
+    parsed = _count_reads(monkeypatch)
+
+    # Loading the same environment again, even with a separate storage
+    # object, should not read any files.
+    factory = Factory(config_path)
+    config_storage = factory.create_config_storage()
+    environment = config_storage.load_environment("idfdev")
+    assert parsed
+    parsed.clear()
+    config_storage = factory.create_config_storage()
+    assert config_storage.load_environment("idfdev") == environment
+    assert parsed == []
+
+    # Modifying the returned configuration must not affect the cache.
+    environment.applications["gafaelfawr"].values["foo"] = "bar"
+    environment = config_storage.load_environment("idfdev")
+    assert "foo" not in environment.applications["gafaelfawr"].values
+
+    # Changing a file should cause only that file to be read again.
+    path = config_path / "applications" / "gafaelfawr" / "values-idfdev.yaml"
+    with path.open("a") as fh:
+        fh.write("foo: bar\n")
+    environment = config_storage.load_environment("idfdev")
+    assert parsed == [path]
+    assert environment.applications["gafaelfawr"].values["foo"] == "bar"
+
+    # Updating shared chart versions should invalidate the cache.
+    config_storage.update_shared_chart_version("redis", "2.0.0")
+    environment = config_storage.load_environment("idfdev")
+    chart = environment.applications["gafaelfawr"].chart
+    assert chart["dependencies"][0]["version"] == "2.0.0"
+
+
+def test_load_revision(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    config_path = tmp_path / "phalanx"
+    shutil.copytree(str(phalanx_test_path()), str(config_path))
+    repo = Repo.init(str(config_path), initial_branch="main")
+    repo.index.add(["applications", "environments"])
+    actor = Actor("Someone", "someone@example.com")
+    repo.index.commit("Initial commit", author=actor, committer=actor)
+    path = config_path / "environments" / "values-idfdev.yaml"
+    with path.open("a") as fh:
+        fh.write("  tap: true\n")
+
+    # Files of the old revision are parsed through the cache, but must be
+    # dropped from it once their temporary directory has been deleted.
+    parse_cache = config._ParseCache()
+    monkeypatch.setattr(config, "_parse_cache", parse_cache)
+    config_storage = ConfigStorage(config_path)
+    environment = config_storage.load_environment_config("idfdev")
+    with config_storage.load_revision("main") as old_config:
+        old_environment = old_config.load_environment_config("idfdev")
+        old_path = old_config.get_environment_chart_path()
+    assert environment != old_environment
+    assert not old_path.exists()
+    assert parse_cache._yaml
+    assert not [p for p in parse_cache._yaml if p.is_relative_to(old_path)]
+
+
+def test_snapshot(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config_path = tmp_path / "phalanx"
+    shutil.copytree(str(phalanx_test_path()), str(config_path))
+    snapshot = tmp_path / "snapshot"
+    environment = ConfigStorage(config_path).load_environment("idfdev")
+
+    # Building the snapshot in a fresh process must parse every file, but
+    # should not copy the parsed data.
+    monkeypatch.setattr(config, "_parse_cache", config._ParseCache())
+    parsed = _count_reads(monkeypatch)
+    with monkeypatch.context() as m:
+        m.setattr(config, "deepcopy", lambda _: pytest.fail("Data copied"))
+        ConfigStorage(config_path, snapshot=snapshot)
+    assert snapshot.exists()
+    assert len(parsed) > 10
+    mtime = snapshot.stat().st_mtime_ns
+
+    # Loading it in another process should not need to read any files.
+    monkeypatch.setattr(config, "_parse_cache", config._ParseCache())
+    parsed.clear()
+    config_storage = ConfigStorage(config_path, snapshot=snapshot)
+    assert config_storage.load_environment("idfdev") == environment
+    assert parsed == []
+    assert snapshot.stat().st_mtime_ns == mtime
+
+    # Changing a file should only read that file and update the snapshot.
+    path = config_path / "applications" / "gafaelfawr" / "values-idfdev.yaml"
+    with path.open("a") as fh:
+        fh.write("foo: bar\n")
+    monkeypatch.setattr(config, "_parse_cache", config._ParseCache())
+    config_storage = ConfigStorage(config_path, snapshot=snapshot)
+    assert parsed == [path]
+    monkeypatch.setattr(config, "_parse_cache", config._ParseCache())
+    parsed.clear()
+    config_storage = ConfigStorage(config_path, snapshot=snapshot)
+    environment = config_storage.load_environment("idfdev")
+    assert environment.applications["gafaelfawr"].values["foo"] == "bar"
+    assert parsed == []
+
+    # Deleting a file should drop it from the snapshot.
+    path.unlink()
+    ConfigStorage(config_path, snapshot=snapshot)
+    assert snapshot.stat().st_mtime_ns != mtime
+    mtime = snapshot.stat().st_mtime_ns
+
+    # Touching a file without changing it should not require parsing it
+    # again, but the snapshot should record the new modification time.
+    path = config_path / "applications" / "argocd" / "Chart.yaml"
+    os.utime(path, ns=(0, 0))
+    parsed.clear()
+    ConfigStorage(config_path, snapshot=snapshot)
+    assert parsed == [path]
+    parsed.clear()
+    ConfigStorage(config_path, snapshot=snapshot)
+    assert parsed == []
@@ -0,0 +1,104 @@
+"""Tests for the Helm storage layer."""
+
+from __future__ import annotations
+
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Any
+
+from phalanx.factory import Factory
+
+from ..support.data import phalanx_test_path
+from ..support.helm import MockHelmCommand
+
+
+def _mock_dependency_update(mock_helm: MockHelmCommand) -> None:
+    """Make dependency updates write a lock file and a dependency chart."""
+    run = mock_helm.run
+
+    def mock_run(*args: str, cwd: Path | None = None, **kwargs: Any) -> None:
+        run(*args, cwd=cwd, **kwargs)
+        if args[:2] == ("dependency", "update") and cwd:
+            (cwd / "Chart.lock").write_text("dependencies: []\n")
+            (cwd / "charts").mkdir(exist_ok=True)
+            (cwd / "charts" / "redis-1.0.6.tgz").write_bytes(b"redis")
+
+    mock_helm.run = mock_run  # type: ignore[method-assign]
+
+
+def test_dependency_update(tmp_path: Path, mock_helm: MockHelmCommand) -> None:
+    config_path = tmp_path / "phalanx"
+    shutil.copytree(str(phalanx_test_path()), str(config_path))
+    chart_path = config_path / "applications" / "gafaelfawr"
+    _mock_dependency_update(mock_helm)
+    factory = Factory(config_path, use_cache=True)
+    storage = factory.create_helm_storage(factory.create_config_storage())
+
+    # Only the first update should run Helm.
+    storage.dependency_update("gafaelfawr")
+    assert mock_helm.call_args_list == [
+        ["dependency", "update", "--skip-refresh"]
+    ]
+    mock_helm.reset_mock()
+    storage.dependency_update("gafaelfawr")
+    assert mock_helm.call_args_list == []
+
+    # Removing a downloaded chart should restore it from the cache, so Helm
+    # should only be run for the other application.
+    (chart_path / "charts" / "redis-1.0.6.tgz").unlink()
+    storage.prepare_dependencies(["gafaelfawr", "argocd"], jobs=2)
+    assert mock_helm.call_args_list == [
+        ["dependency", "update", "--skip-refresh"]
+    ]
+    assert (chart_path / "charts" / "redis-1.0.6.tgz").read_bytes() == b"redis"
+
+    # Changing Chart.yaml should run Helm again.
+    mock_helm.reset_mock()
+    with (chart_path / "Chart.yaml").open("a") as fh:
+        fh.write("# Some comment\n")
+    storage.dependency_update("gafaelfawr")
+    assert mock_helm.call_args_list == [
+        ["dependency", "update", "--skip-refresh"]
+    ]
+
+
+def test_is_release_current(mock_helm: MockHelmCommand) -> None:
+    factory = Factory(phalanx_test_path())
+    storage = factory.create_helm_storage(factory.create_config_storage())
+    values = {"global.vaultSecretsPath": "secret/phalanx/idfdev"}
+    releases: dict[str, str] = {}
+
+    def callback(*command: str) -> subprocess.CompletedProcess:
+        returncode = 0
+        stdout = None
+        if command[0] == "status":
+            if command[1] in releases:
+                info = {
+                    "status": "deployed",
+                    "description": releases[command[1]],
+                }
+                stdout = json.dumps({"info": info})
+            else:
+                returncode = 1
+        elif command[0] == "version":
+            stdout = "v3.16.2+g13654a5\n"
+        return subprocess.CompletedProcess(
+            returncode=returncode, args=command, stdout=stdout, stderr=None
+        )
+
+    mock_helm.set_capture_callback(callback)
+    assert not storage.is_release_current("argocd", "idfdev", values)
+
+    # Record the description of the installed release.
+    storage.upgrade_application("argocd", "idfdev", values)
+    upgrade = mock_helm.call_args_list[-1]
+    assert upgrade[:2] == ["upgrade", "argocd"]
+    releases["argocd"] = upgrade[upgrade.index("--description") + 1]
+    assert storage.is_release_current("argocd", "idfdev", values)
+
+    # Changing the values or the environment should require an upgrade.
+    other = {"global.vaultSecretsPath": "secret/phalanx/other"}
+    assert not storage.is_release_current("argocd", "idfdev", other)
+    assert not storage.is_release_current("argocd", "minikube", values)
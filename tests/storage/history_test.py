@@ -0,0 +1,37 @@
+"""Tests for the local history of Helm lints."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+from phalanx.models.helm import HelmLintResult
+from phalanx.storage.history import LintHistory
+
+
+def test_history(tmp_path: Path) -> None:
+    history = LintHistory(tmp_path / "history" / "lint.sqlite", max_runs=4)
+    assert history.get_durations() == {}
+    assert history.get_stats() == []
+
+    app = HelmLintResult(application="app", environment="idfdev", success=True)
+    for seconds in (1, 2, 3, 4, 5, 6):
+        history.record(app, timedelta(seconds=seconds), "v3.16.2")
+    top = HelmLintResult(application=None, environment="idfdev", success=False)
+    history.record(top, timedelta(seconds=10), "v3.16.2")
+
+    # Only the four most recent lints of each chart should be kept.
+    assert history.get_durations() == {
+        ("app", "idfdev"): timedelta(seconds=4.5),
+        (None, "idfdev"): timedelta(seconds=10),
+    }
+    stats = history.get_stats()
+    assert [(s.application, s.runs, s.success) for s in stats] == [
+        (None, 1, False),
+        ("app", 4, True),
+    ]
+    assert stats[0].trend is None
+    assert stats[1].last == timedelta(seconds=6)
+    assert stats[1].trend == pytest.approx(2 / 3.5)
@@ -0,0 +1,148 @@
+"""Tests for the Kubernetes storage layer."""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from datetime import timedelta
+from threading import Thread, current_thread, main_thread
+from typing import Any
+
+import pytest
+
+from phalanx.exceptions import KubernetesError
+from phalanx.storage.kubernetes import KubernetesStorage
+
+from ..support.kubernetes import MockKubernetesServer
+
+
+@pytest.fixture
+def server() -> Iterator[MockKubernetesServer]:
+    server = MockKubernetesServer()
+    thread = Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def _deployment(name: str, *, available: int = 1) -> dict[str, Any]:
+    return {
+        "metadata": {"name": name, "generation": 2},
+        "spec": {"replicas": 1},
+        "status": {
+            "observedGeneration": 2,
+            "replicas": 1,
+            "updatedReplicas": 1,
+            "availableReplicas": available,
+        },
+    }
+
+
+def _statefulset(name: str, *, ready: int = 1) -> dict[str, Any]:
+    return {
+        "metadata": {"name": name, "generation": 1},
+        "spec": {"replicas": 1},
+        "status": {
+            "observedGeneration": 1,
+            "readyReplicas": ready,
+            "updatedReplicas": 1,
+            "currentRevision": "rev-1",
+            "updateRevision": "rev-1",
+        },
+    }
+
+
+def test_wait_for_rollouts(server: MockKubernetesServer) -> None:
+    storage = KubernetesStorage(server.url)
+    names = [
+        "deployment/argocd-server",
+        "deployment/argocd-repo-server",
+        "statefulset/argocd-application-controller",
+    ]
+    server.set_object(
+        "deployments", "argocd", _deployment("argocd-server", available=0)
+    )
+    server.set_object("deployments", "argocd", _deployment("other"))
+    server.set_object(
+        "deployments", "argocd", _deployment("argocd-repo-server")
+    )
+    statefulset = _statefulset("argocd-application-controller", ready=0)
+    statefulset["metadata"]["generation"] = 2
+    server.set_object("statefulsets", "argocd", statefulset)
+
+    # Finish each rollout once its waiting status has been reported. The
+    # statefulset isn't updated until the rollout of the server finishes.
+    statuses: dict[str, list[str]] = {}
+
+    def progress(name: str, status: str) -> None:
+        assert current_thread() is main_thread()
+        statuses.setdefault(name, []).append(status)
+        if status.startswith("0 of 1"):
+            if name.startswith("deployment/"):
+                deployment = _deployment(name.split("/")[1])
+                server.set_object("deployments", "argocd", deployment)
+            else:
+                statefulset = _statefulset(name.split("/")[1])
+                server.set_object("statefulsets", "argocd", statefulset)
+        elif name == "deployment/argocd-server":
+            statefulset = _statefulset(
+                "argocd-application-controller", ready=0
+            )
+            server.set_object("statefulsets", "argocd", statefulset)
+
+    storage.wait_for_rollouts(
+        names, "argocd", timeout=timedelta(seconds=10), progress=progress
+    )
+    done = "Successfully rolled out"
+    assert statuses == {
+        "deployment/argocd-server": [
+            "0 of 1 updated replicas are available",
+            done,
+        ],
+        "deployment/argocd-repo-server": [done],
+        "statefulset/argocd-application-controller": [
+            "Waiting for spec update to be observed",
+            "0 of 1 pods are ready",
+            done,
+        ],
+    }
+    assert server.watches == 2
+    storage.close()
+
+
+def test_wait_for_rollouts_errors(server: MockKubernetesServer) -> None:
+    storage = KubernetesStorage(server.url)
+    with pytest.raises(ValueError, match="Unsupported rollout pod/foo"):
+        storage.wait_for_rollouts(["pod/foo"], "argocd")
+
+    # A failed rollout should be reported without waiting for the others.
+    deployment = _deployment("argocd-server", available=0)
+    deployment["status"]["conditions"] = [
+        {"type": "Progressing", "reason": "ProgressDeadlineExceeded"}
+    ]
+    server.set_object("deployments", "argocd", deployment)
+    server.set_object("statefulsets", "argocd", _statefulset("slow", ready=0))
+    names = ["deployment/argocd-server", "statefulset/slow"]
+    with pytest.raises(KubernetesError, match="exceeded its progress"):
+        storage.wait_for_rollouts(names, "argocd")
+
+    # Objects that don't exist should fail without waiting for the timeout,
+    # even if other objects of the same kind exist.
+    server.set_object("deployments", "argocd", _deployment("ready"))
+    names = ["deployment/ready", "deployment/missing"]
+    start = time.monotonic()
+    with pytest.raises(KubernetesError) as excinfo:
+        storage.wait_for_rollouts(names, "argocd")
+    assert str(excinfo.value) == "deployment/missing not found in argocd"
+    assert time.monotonic() - start < 5
+    with pytest.raises(KubernetesError, match="statefulset/missing not found"):
+        storage.wait_for_rollouts(["statefulset/missing"], "argocd")
+
+    # Rollouts that don't finish should time out.
+    with pytest.raises(KubernetesError, match="statefulset/slow did not"):
+        storage.wait_for_rollouts(
+            ["statefulset/slow"], "argocd", timeout=timedelta(seconds=1)
+        )
+    storage.close()
@@ -0,0 +1,54 @@
+"""Tests for the 1Password storage layer."""
+
+from __future__ import annotations
+
+import pytest
+from onepasswordconnectsdk.models import Item
+
+from phalanx.exceptions import MissingOnepasswordSecretsError
+from phalanx.factory import Factory
+
+from ..support.onepassword import MockOnepasswordClient
+
+
+def test_get_secrets(
+    factory: Factory,
+    mock_onepassword: MockOnepasswordClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    config_storage = factory.create_config_storage()
+    environment = config_storage.load_environment("minikube")
+    assert environment.onepassword
+    vault_title = environment.onepassword.vault_title
+    mock_onepassword.load_test_data(vault_title, "minikube")
+    monkeypatch.setenv("OP_CONNECT_TOKEN", "sometoken")
+
+    # Record every item retrieved from 1Password.
+    titles: list[str] = []
+    get_item = mock_onepassword.get_item
+
+    def record_get_item(title: str, vault_id: str) -> Item:
+        titles.append(title)
+        return get_item(title, vault_id)
+
+    monkeypatch.setattr(mock_onepassword, "get_item", record_get_item)
+
+    # Each item should be retrieved exactly once.
+    onepassword_storage = factory.create_onepassword_storage()
+    client = onepassword_storage.get_onepassword_client(environment)
+    query = {"argocd": ["dex.clientSecret"], "unknown": ["secret"]}
+    with pytest.raises(MissingOnepasswordSecretsError):
+        client.get_secrets(query)
+    assert sorted(titles) == [
+        "argocd",
+        "pull-secret",
+        "unknown",
+        "vault-write-token",
+    ]
+
+    # Fields should be found by label.
+    titles.clear()
+    secrets = client.get_secrets({"argocd": ["dex.clientSecret"]})
+    assert sorted(titles) == ["argocd", "pull-secret", "vault-write-token"]
+    secret = secrets.applications["argocd"]["dex.clientSecret"]
+    assert secret.value
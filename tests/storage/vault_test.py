@@ -0,0 +1,48 @@
+"""Tests for the Vault storage layer."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from phalanx.factory import Factory
+from phalanx.storage.vault import VaultStorage
+
+from ..support.vault import MockVaultClient
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_get_environment_secrets(
+    factory: Factory,
+    mock_vault: MockVaultClient,
+    monkeypatch: pytest.MonkeyPatch,
+    concurrency: int,
+) -> None:
+    config_storage = factory.create_config_storage()
+    environment = config_storage.load_environment("idfdev")
+    mock_vault.load_test_data(environment.vault_path_prefix, "idfdev")
+    vault_storage = VaultStorage(concurrency=concurrency)
+    vault_client = vault_storage.get_vault_client(environment)
+    expected = {
+        a: vault_client.get_application_secret(a)
+        for a in vault_client.list_application_secrets()
+    }
+    assert len(expected) > 1
+
+    # Applications that are listed but whose secrets cannot be read should
+    # be skipped.
+    list_secrets = mock_vault.list_secrets
+
+    def list_secrets_with_missing(path: str) -> dict[str, Any]:
+        result = list_secrets(path)
+        result["data"]["keys"].append("missing")
+        return result
+
+    monkeypatch.setattr(mock_vault, "list_secrets", list_secrets_with_missing)
+    secrets = vault_client.get_environment_secrets()
+    assert list(secrets.keys()) == list(expected.keys())
+    for application, values in expected.items():
+        assert {k: v.get_secret_value() for k, v in values.items()} == {
+            k: v.get_secret_value() for k, v in secrets[application].items()
+        }
@@ -0,0 +1,47 @@
+"""Tests for watching the Phalanx configuration for changes."""
+
+from __future__ import annotations
+
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from phalanx.storage.watch import FileWatcher
+
+
+def test_poll(tmp_path: Path) -> None:
+    watched = tmp_path / "applications"
+    (watched / "app").mkdir(parents=True)
+    values = watched / "app" / "values.yaml"
+    values.write_text("foo: bar\n")
+    (tmp_path / "other").write_text("ignored\n")
+    missing = tmp_path / "charts"
+
+    watcher = FileWatcher([watched, missing])
+    assert watcher.poll() == set()
+
+    # Modifications, creations, and deletions, including in directories that
+    # did not exist when the watcher was created, should all be reported
+    # exactly once.
+    os.utime(values, ns=(0, 0))
+    new = watched / "app" / "values-idfdev.yaml"
+    new.write_text("foo: baz\n")
+    (missing / "chart").mkdir(parents=True)
+    (missing / "chart" / "Chart.yaml").write_text("name: chart\n")
+    (tmp_path / "other").write_text("still ignored\n")
+    assert watcher.poll() == {values, new, missing / "chart" / "Chart.yaml"}
+    assert watcher.poll() == set()
+    new.unlink()
+    assert watcher.poll() == {new}
+
+
+def test_wait(tmp_path: Path) -> None:
+    path = tmp_path / "values.yaml"
+    path.write_text("foo: bar\n")
+    watcher = FileWatcher([tmp_path], interval=timedelta(0))
+
+    # Changes made before the watcher checks should be returned as one batch.
+    os.utime(path, ns=(0, 0))
+    other = tmp_path / "values-idfdev.yaml"
+    other.write_text("foo: baz\n")
+    assert next(iter(watcher)) == {path, other}
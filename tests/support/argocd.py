@@ -0,0 +1,258 @@
+"""Mock Argo CD API server for testing."""
+
+from __future__ import annotations
+
+import json
+import socket
+from contextlib import suppress
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+__all__ = ["MockArgoCDServer"]
+
+_TOKEN = "some-session-token"
+"""Session token returned by the mock server."""
+
+
+class MockArgoCDServer(ThreadingHTTPServer):
+    """Mock Argo CD API server for testing.
+
+    Implements only the small part of the Argo CD REST API used by Phalanx.
+    Each sync finishes successfully after its status has been checked a
+    fixed number of times. The server can be stopped and started again on
+    the same port, keeping its applications, to simulate Argo CD being
+    restarted.
+
+    Parameters
+    ----------
+    password
+        Password of the ``admin`` user.
+
+    Attributes
+    ----------
+    applications
+        Argo CD applications, by name.
+    connections
+        Client ports of all of the connections made to the server.
+    fail_syncs
+        Names of applications whose next sync should fail.
+    sync_checks
+        Number of status checks after which a sync finishes.
+    """
+
+    def __init__(self, password: str) -> None:
+        super().__init__(("127.0.0.1", 0), _MockArgoCDHandler)
+        self.applications: dict[str, dict[str, Any]] = {}
+        self.connections: set[int] = set()
+        self.fail_syncs: set[str] = set()
+        self.sync_checks = 2
+        self._password = password
+        self._pending: dict[str, int] = {}
+        self._lock = Lock()
+        self._sockets: set[socket.socket] = set()
+        self._thread: Thread | None = None
+        self._stopped = False
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def add_application(self, name: str, app_of_apps: str) -> None:
+        """Add an application managed by an app of apps.
+
+        Parameters
+        ----------
+        name
+            Name of the application.
+        app_of_apps
+            Name of the app of apps that manages it.
+        """
+        label = {"argocd.argoproj.io/instance": app_of_apps}
+        self.applications[name] = {
+            "metadata": {"name": name, "labels": label},
+            "spec": {"project": "default"},
+        }
+
+    def add_socket(self, connection: socket.socket) -> None:
+        """Record an open client connection so that `stop` can drop it.
+
+        Parameters
+        ----------
+        connection
+            Socket of the connection.
+        """
+        with self._lock:
+            self._sockets.add(connection)
+
+    def dispatch(
+        self, method: str, url: str, authorization: str | None, body: Any
+    ) -> tuple[int, Any]:
+        """Handle an API request.
+
+        Parameters
+        ----------
+        method
+            HTTP method.
+        url
+            Path and query of the request.
+        authorization
+            Value of the ``Authorization`` header, if any.
+        body
+            Parsed JSON body of the request, if any.
+
+        Returns
+        -------
+        tuple
+            HTTP status and JSON body of the response.
+        """
+        parsed = urlparse(url)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        path = parsed.path.removeprefix("/api/v1/").split("/")
+        if path == ["session"] and method == "POST":
+            if body != {"username": "admin", "password": self._password}:
+                return 401, {"message": "Invalid username or password"}
+            return 200, {"token": _TOKEN}
+        if authorization != f"Bearer {_TOKEN}":
+            return 401, {"message": "no session information"}
+        with self._lock:
+            match method, path:
+                case "GET", ["applications"]:
+                    return 200, {"items": self._list(query.get("selector"))}
+                case "POST", ["applications"]:
+                    name = body["metadata"]["name"]
+                    if name in self.applications and "upsert" not in query:
+                        return 400, {"message": f"{name} exists"}
+                    self.applications[name] = body
+                    return 200, body
+            if len(path) < 2 or path[1] not in self.applications:
+                return 404, {"message": "not found"}
+            application = self.applications[path[1]]
+            match method, path[2:]:
+                case "GET", []:
+                    self._check_sync(application)
+                    return 200, application
+                case "PATCH", []:
+                    patch = json.loads(body["patch"])
+                    application["spec"].update(patch["spec"])
+                    return 200, application
+                case "POST", ["sync"]:
+                    application["operation"] = {"sync": {}}
+                    self._pending[path[1]] = self.sync_checks
+                    return 200, application
+        return 405, {"message": "method not allowed"}
+
+    def remove_socket(self, connection: socket.socket) -> None:
+        """Forget a client connection that has been closed.
+
+        Parameters
+        ----------
+        connection
+            Socket of the connection.
+        """
+        with self._lock:
+            self._sockets.discard(connection)
+
+    def start(self) -> None:
+        """Start serving requests in a background thread.
+
+        If the server was stopped, it listens on the same port again.
+        """
+        if self._stopped:
+            self.socket = socket.socket(self.address_family, self.socket_type)
+            self.server_bind()
+            self.server_activate()
+            self._stopped = False
+        self._thread = Thread(target=self.serve_forever)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving requests, dropping all open connections."""
+        self.shutdown()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+        self._stopped = True
+        with self._lock:
+            for connection in self._sockets:
+                with suppress(OSError):
+                    connection.shutdown(socket.SHUT_RDWR)
+            self._sockets.clear()
+
+    def _check_sync(self, application: dict[str, Any]) -> None:
+        """Advance the sync of an application when its status is checked."""
+        name = application["metadata"]["name"]
+        if name not in self._pending:
+            return
+        self._pending[name] -= 1
+        if self._pending[name] > 0:
+            return
+        del self._pending[name]
+        del application["operation"]
+        if name in self.fail_syncs:
+            self.fail_syncs.remove(name)
+            state = {"phase": "Failed", "message": "some sync error"}
+        else:
+            state = {"phase": "Succeeded"}
+        application["status"] = {
+            "operationState": state,
+            "health": {"status": "Healthy"},
+            "sync": {"status": "Synced"},
+        }
+
+    def _list(self, selector: str | None) -> list[dict[str, Any]]:
+        """List the applications matching a label selector."""
+        if not selector:
+            return list(self.applications.values())
+        key, value = selector.split("=", 1)
+        return [
+            a
+            for a in self.applications.values()
+            if a["metadata"].get("labels", {}).get(key) == value
+        ]
+
+
+class _MockArgoCDHandler(BaseHTTPRequestHandler):
+    """Pass requests to the mock Argo CD server."""
+
+    protocol_version = "HTTP/1.1"
+    server: MockArgoCDServer
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.add_socket(self.connection)
+
+    def finish(self) -> None:
+        self.server.remove_socket(self.connection)
+        super().finish()
+
+    def do_GET(self) -> None:
+        self._handle()
+
+    def do_PATCH(self) -> None:
+        self._handle()
+
+    def do_POST(self) -> None:
+        self._handle()
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def _handle(self) -> None:
+        self.server.connections.add(self.client_address[1])
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        authorization = self.headers.get("Authorization")
+        status, result = self.server.dispatch(
+            self.command, self.path, authorization, body
+        )
+        data = json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
@@ -5,6 +5,7 @@ from __future__ import annotations
 import shutil
 import subprocess
 from collections.abc import Iterator
+from datetime import timedelta
 from pathlib import Path
 from shutil import which
 from typing import Protocol
@@ -96,6 +97,7 @@ class MockHelmCommand:
         *args: str,
         cwd: Path | None = None,
         quiet: bool = False,
+        timeout: timedelta | None = None,
     ) -> None:
         """Mock running a Helm command.
 
@@ -111,6 +113,8 @@ class MockHelmCommand:
             (Currently ignored.)
         quiet
             Whether to suppress Helm's standard output. (Currently ignored.)
+        timeout
+            Timeout for the Helm command. (Currently ignored.)
         """
         self.call_args_list.append(list(args))
 
@@ -0,0 +1,194 @@
+"""Mock Kubernetes API server for testing."""
+
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Empty, Queue
+from threading import Event, Lock
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+__all__ = ["MockKubernetesServer"]
+
+
+class MockKubernetesServer(ThreadingHTTPServer):
+    """Mock Kubernetes API server for testing.
+
+    Implements only lists and watches of objects in the ``apps`` API group.
+
+    Attributes
+    ----------
+    watches
+        Number of watch requests that have been made.
+    """
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _MockKubernetesHandler)
+        self.watches = 0
+        self._version = 0
+        self._objects: dict[tuple[str, str], dict[str, dict[str, Any]]] = {}
+        self._events: dict[tuple[str, str], list[tuple[int, Any]]] = {}
+        self._queues: dict[tuple[str, str], list[Queue[dict[str, Any]]]] = {}
+        self._closed = Event()
+        self._lock = Lock()
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def list_objects(self, resource: str, namespace: str) -> dict[str, Any]:
+        """List the objects of one resource in a namespace.
+
+        Parameters
+        ----------
+        resource
+            API resource of the objects, such as ``deployments``.
+        namespace
+            Namespace of the objects.
+
+        Returns
+        -------
+        dict
+            List of the objects, with the resource version from which to
+            watch for changes.
+        """
+        with self._lock:
+            objects = self._objects.get((resource, namespace), {})
+            return {
+                "metadata": {"resourceVersion": str(self._version)},
+                "items": list(objects.values()),
+            }
+
+    def server_close(self) -> None:
+        self._closed.set()
+        super().server_close()
+
+    def set_object(
+        self, resource: str, namespace: str, obj: dict[str, Any]
+    ) -> None:
+        """Create or update an object, notifying any watches.
+
+        Parameters
+        ----------
+        resource
+            API resource of the object, such as ``deployments``.
+        namespace
+            Namespace of the object.
+        obj
+            The object.
+        """
+        key = (resource, namespace)
+        name = obj["metadata"]["name"]
+        with self._lock:
+            self._version += 1
+            objects = self._objects.setdefault(key, {})
+            event = {
+                "type": "MODIFIED" if name in objects else "ADDED",
+                "object": obj,
+            }
+            objects[name] = obj
+            self._events.setdefault(key, []).append((self._version, event))
+            for queue in self._queues.get(key, []):
+                queue.put(event)
+
+    def watch(
+        self,
+        resource: str,
+        namespace: str,
+        timeout: float,
+        resource_version: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Watch the objects of one resource in a namespace.
+
+        Parameters
+        ----------
+        resource
+            API resource of the objects, such as ``deployments``.
+        namespace
+            Namespace of the objects.
+        timeout
+            How long the watch should last in seconds.
+        resource_version
+            If given, start with the changes made after this version.
+
+        Yields
+        ------
+        dict
+            Watch events, starting with an ``ADDED`` event for each existing
+            object if no resource version was given.
+        """
+        key = (resource, namespace)
+        queue: Queue[dict[str, Any]] = Queue()
+        with self._lock:
+            self.watches += 1
+            if resource_version is None:
+                for obj in self._objects.get(key, {}).values():
+                    queue.put({"type": "ADDED", "object": obj})
+            else:
+                for version, event in self._events.get(key, []):
+                    if version > resource_version:
+                        queue.put(event)
+            self._queues.setdefault(key, []).append(queue)
+        deadline = time.monotonic() + timeout
+        try:
+            while not self._closed.is_set() and time.monotonic() < deadline:
+                try:
+                    yield queue.get(timeout=0.1)
+                except Empty:
+                    continue
+        finally:
+            with self._lock:
+                self._queues[key].remove(queue)
+
+
+class _MockKubernetesHandler(BaseHTTPRequestHandler):
+    """Pass requests to the mock Kubernetes API server."""
+
+    server: MockKubernetesServer
+
+    def do_GET(self) -> None:
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        match parsed.path.strip("/").split("/"):
+            case ["apis", "apps", "v1", "namespaces", namespace, resource]:
+                pass
+            case _:
+                self.send_error(404)
+                return
+        if query.get("watch") != "true":
+            body = json.dumps(
+                self.server.list_objects(resource, namespace)
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        timeout = float(query.get("timeoutSeconds", 60))
+        version = query.get("resourceVersion")
+        events = self.server.watch(
+            resource,
+            namespace,
+            timeout,
+            int(version) if version is not None else None,
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        try:
+            for event in events:
+                self.wfile.write(json.dumps(event).encode() + b"\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
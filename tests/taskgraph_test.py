@@ -0,0 +1,147 @@
+"""Tests for running graphs of dependent tasks."""
+
+from __future__ import annotations
+
+import sys
+import threading
+from functools import partial
+
+import pytest
+
+from phalanx.storage.command import Command
+from phalanx.taskgraph import Task, TaskGraph, TaskResult
+
+
+def test_order() -> None:
+    graph = TaskGraph()
+    graph.add("sync", lambda: None, after=["install"])
+    graph.add("install", lambda: None)
+    graph.add("other", lambda: None)
+    graph.add("final", lambda: None, after=["sync", "other"])
+    assert graph.order() == ["install", "other", "sync", "final"]
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        graph.add("sync", lambda: None)
+
+    graph = TaskGraph()
+    graph.add("a", lambda: None, after=["missing"])
+    with pytest.raises(ValueError, match="unknown missing"):
+        graph.order()
+
+    graph = TaskGraph()
+    graph.add("a", lambda: None, after=["b"])
+    graph.add("b", lambda: None, after=["a"])
+    graph.add("c", lambda: None)
+    with pytest.raises(ValueError, match="cycle among tasks a, b"):
+        graph.run()
+
+
+def test_run() -> None:
+    started: list[str] = []
+    barrier = threading.Barrier(2, timeout=10)
+
+    def task(name: str, *, wait: bool = False) -> None:
+        started.append(name)
+        if wait:
+            barrier.wait()
+
+    # The two middle tasks can only both pass the barrier if they run at the
+    # same time.
+    graph = TaskGraph()
+    graph.add("first", lambda: task("first"))
+    graph.add("left", lambda: task("left", wait=True), after=["first"])
+    graph.add("right", lambda: task("right", wait=True), after=["first"])
+    graph.add("last", lambda: task("last"), after=["left", "right"])
+    graph.run()
+    assert started[0] == "first"
+    assert sorted(started[1:3]) == ["left", "right"]
+    assert started[3] == "last"
+
+
+def test_failure() -> None:
+    started: list[str] = []
+
+    def fail() -> None:
+        started.append("fail")
+        raise RuntimeError("some error")
+
+    graph = TaskGraph()
+    graph.add("fail", fail)
+    graph.add("other", lambda: started.append("other"))
+    graph.add("after", lambda: started.append("after"), after=["fail"])
+    with pytest.raises(RuntimeError, match="some error"):
+        graph.run()
+    assert "after" not in started
+
+
+def test_progress() -> None:
+    reports: list[tuple[str, str, threading.Thread]] = []
+
+    def started(task: Task) -> None:
+        reports.append((task.name, "Started", threading.current_thread()))
+
+    def finished(result: TaskResult) -> None:
+        thread = threading.current_thread()
+        reports.append((result.task.name, result.status, thread))
+
+    def fail() -> None:
+        raise RuntimeError("some error")
+
+    graph = TaskGraph()
+    graph.add("first", lambda: None)
+    graph.add("second", fail, after=["first"])
+    with pytest.raises(RuntimeError, match="some error"):
+        graph.run(started=started, finished=finished)
+    statuses = [(n, s.split(" ")[0]) for n, s, _ in reports]
+    assert statuses == [
+        ("first", "Started"),
+        ("first", "Finished"),
+        ("second", "Started"),
+        ("second", "Failed"),
+    ]
+    assert reports[1][1].startswith("Finished in ")
+    assert reports[3][1].startswith("Failed after ")
+    assert all(t is threading.current_thread() for _, _, t in reports)
+
+
+def test_capture(capsys: pytest.CaptureFixture[str]) -> None:
+    barrier = threading.Barrier(2, timeout=10)
+    results: dict[str, TaskResult] = {}
+
+    def finished(result: TaskResult) -> None:
+        results[result.task.name] = result
+
+    def task(name: str) -> None:
+        sys.stdout.write(f"{name} before\n")
+        barrier.wait()
+        Command("sh").run("-c", f"echo {name} out; echo {name} err >&2")
+        sys.stderr.write(f"{name} after\n")
+
+    # Both tasks print at the same time, but their output is kept separate
+    # and handed back to the calling thread.
+    graph = TaskGraph()
+    graph.add("one", partial(task, "one"), title="Task one")
+    graph.add("two", partial(task, "two"))
+    graph.run(capture=True, finished=finished)
+    for name in ("one", "two"):
+        assert results[name].output == (
+            f"{name} before\n{name} out\n{name} err\n{name} after\n"
+        )
+        assert results[name].error is None
+    assert results["one"].task.title == "Task one"
+    assert results["two"].task.title == "two"
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert captured.err == ""
+
+    def fail() -> None:
+        sys.stdout.write("some output\n")
+        raise RuntimeError("some error")
+
+    graph = TaskGraph()
+    graph.add("fail", fail)
+    with pytest.raises(RuntimeError, match="some error"):
+        graph.run(capture=True, finished=finished)
+    assert results["fail"].output == "some output\n"
+    assert isinstance(results["fail"].error, RuntimeError)
+    assert capsys.readouterr().out == ""